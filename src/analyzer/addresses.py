@@ -0,0 +1,110 @@
+import ipaddress
+import socket
+
+import numpy as np
+import pandas as pd
+
+from layers.layer_level import LayerLevel
+
+
+# columns of the addresses as numbers, see PACKED_DTYPES
+IPV4_COLUMNS = {end: f"{LayerLevel.NETWORK}.IP.data.{end}_addr_v4" for end in ("src", "dst")}
+IPV6_COLUMNS = {end: (f"{LayerLevel.NETWORK}.IP.data.{end}_addr_v6_hi",
+                      f"{LayerLevel.NETWORK}.IP.data.{end}_addr_v6_lo") for end in ("src", "dst")}
+UINT64_MAX = (1 << 64) - 1
+
+
+def format_ipv4(values: pd.Series) -> pd.Series:
+    """Format IPv4 addresses stored as numbers back to text, for display.
+
+    Each distinct address is formatted once, however many rows have it.
+
+    Args:
+        values (pd.Series): addresses as uint32, NA for none
+
+    Returns:
+        pd.Series: addresses as text, None for none
+    """
+    present = values.notna().to_numpy()
+    unique, inverse = np.unique(values.to_numpy(dtype=np.uint32, na_value=0)[present],
+                                return_inverse=True)
+    texts = np.array([socket.inet_ntoa(int(value).to_bytes(4)) for value in unique] or [""],
+                     dtype=object)
+    formatted = np.full(len(values), None, dtype=object)
+    formatted[present] = texts[inverse]
+    return pd.Series(formatted, index=values.index, name=values.name)
+
+
+def format_ipv6(high: pd.Series, low: pd.Series) -> pd.Series:
+    """Format IPv6 addresses stored as two numbers back to text, for display.
+
+    Each distinct address is formatted once, however many rows have it.
+
+    Args:
+        high (pd.Series): high halves of the addresses as uint64, NA for none
+        low (pd.Series): low halves of the addresses as uint64
+
+    Returns:
+        pd.Series: addresses as text, None for none
+    """
+    present = high.notna().to_numpy()
+    halves = np.stack([high.to_numpy(dtype=np.uint64, na_value=0)[present],
+                       low.to_numpy(dtype=np.uint64, na_value=0)[present]], axis=1)
+    unique, inverse = np.unique(halves, axis=0, return_inverse=True)
+    texts = np.array([socket.inet_ntop(socket.AF_INET6, int(hi).to_bytes(8) + int(lo).to_bytes(8))
+                      for hi, lo in unique] or [""], dtype=object)
+    formatted = np.full(len(high), None, dtype=object)
+    formatted[present] = texts[inverse.reshape(-1)]
+    return pd.Series(formatted, index=high.index, name=high.name)
+
+
+def in_network(packets: pd.DataFrame, network: str, end: str | None = None) -> np.ndarray:
+    """Find the packets sent from or to a network, like "10.0.0.0/8" or "fe80::/10".
+
+    The prefix is matched with bit masks over the numeric address columns, without handling the
+    addresses as text.
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+        network (str): network address and prefix length
+        end (str | None, optional): "src" or "dst" to match only the source or destination
+            address, None matches either. Defaults to None.
+
+    Raises:
+        ValueError: if network is not an IP network
+
+    Returns:
+        np.ndarray: True for each packet with an address in the network
+    """
+    network = ipaddress.ip_network(network)
+    mask = np.zeros(len(packets), dtype=bool)
+    for address_end in ("src", "dst") if end is None else (end,):
+        if network.version == 4:
+            mask |= _match_ipv4(packets, IPV4_COLUMNS[address_end], network)
+        else:
+            mask |= _match_ipv6(packets, IPV6_COLUMNS[address_end], network)
+    return mask
+
+
+def _match_ipv4(packets: pd.DataFrame, column: str, network: ipaddress.IPv4Network
+                ) -> np.ndarray:
+    if column not in packets:
+        return np.zeros(len(packets), dtype=bool)
+    values = packets[column]
+    addresses = values.to_numpy(dtype=np.uint32, na_value=0)
+    return values.notna().to_numpy() & (
+        addresses & np.uint32(int(network.netmask)) == np.uint32(int(network.network_address)))
+
+
+def _match_ipv6(packets: pd.DataFrame, columns: tuple[str, str],
+                network: ipaddress.IPv6Network) -> np.ndarray:
+    if columns[0] not in packets:
+        return np.zeros(len(packets), dtype=bool)
+    matched = packets[columns[0]].notna().to_numpy()
+    netmask, address = int(network.netmask), int(network.network_address)
+    # the prefix covers the high half, and the low half if it is longer than 64 bits
+    for column, shift in zip(columns, (64, 0)):
+        half_mask = np.uint64(netmask >> shift & UINT64_MAX)
+        half = packets[column].to_numpy(dtype=np.uint64, na_value=0)
+        matched = matched & (half & half_mask == np.uint64(address >> shift & UINT64_MAX))
+    return matched
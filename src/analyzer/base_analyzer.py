@@ -1,12 +1,77 @@
 import pandas as pd
 
 from utils.utils import custom_round
+from analyzer.sampling import (
+    estimate_total, estimate_counts, estimate_sums, weights, is_sampled, describe,
+    SAMPLING_COLUMNS)
 from layers.layer_level import LayerLevel
+from layers.properties import IPVersion
+
+
+CHECKSUM_LAYERS = [
+    (LayerLevel.NETWORK, "IP"),
+    (LayerLevel.TRANSPORT, "TCP"),
+    (LayerLevel.TRANSPORT, "UDP"),
+    (LayerLevel.TRANSPORT, "ICMP")
+]
+
+
+def speed_interval(duration: pd.Timedelta, interval_count_target: int) -> int:
+    """Choose the length of the intervals of the speed graph.
+
+    Args:
+        duration (pd.Timedelta): time from the first packet to the last
+        interval_count_target (int): Preferred number of intervals.
+
+    Returns:
+        int: length of the intervals in seconds
+    """
+    duration_seconds = int(duration.total_seconds())
+
+    # Ensure that the interval count is between 1 and the duration in seconds
+    interval_count_target = max(1, min(duration_seconds, interval_count_target))
+
+    sampling_freq = duration_seconds // interval_count_target
+    sampling_freq = max(1, sampling_freq)
+    return custom_round(sampling_freq)
+
+
+def speed_series(sizes: pd.Series, sampling_freq: int) -> tuple[pd.Series, pd.Series]:
+    """Turn bytes indexed by time into the series of the speed graph.
+
+    Args:
+        sizes (pd.Series): bytes of the packets, or of each second, indexed by time
+        sampling_freq (int): length of the intervals in seconds, see speed_interval
+
+    Returns:
+        tuple[pd.Series, pd.Series]: AVG bytes per second, MAX bytes per second
+    """
+    bytes_per_second = sizes.resample("s").sum().fillna(0)
+    max_bytes_per_second = bytes_per_second.resample(f"{sampling_freq}s").max().fillna(0)
+    bytes_per_interval = sizes.resample(f"{sampling_freq}s").sum().fillna(0)
+    bytes_per_second = bytes_per_interval / sampling_freq
+
+    return bytes_per_second, max_bytes_per_second
 
 
 class BaseAnalyzer:
     """Analyzer for producing basic statistics concerning all packets as a whole, like total size
-    and duration."""
+    and duration.
+
+    Counts and sizes are estimates for the captured traffic if the packets were sampled, see
+    analyzer.sampling. The margins of error are given by the methods ending in _error, and are 0
+    if nothing was sampled.
+
+    The analyzer reads the columns listed in columns, see Context.view.
+    """
+
+    columns = [
+        "packet.time", "packet.size", *(f"{layer_level}.layer_name" for layer_level in LayerLevel),
+        f"{LayerLevel.NETWORK}.IP.data.version",
+        *(f"{layer_level}.{layer_name}.data.checksum_valid"
+          for layer_level, layer_name in CHECKSUM_LAYERS),
+        *SAMPLING_COLUMNS
+    ]
 
     def __init__(self, packets: pd.DataFrame) -> None:
         """Initializes the analyzer with provided packets.
@@ -16,13 +81,37 @@ class BaseAnalyzer:
         """
         self.packets = packets
 
+    def sampled(self) -> bool:
+        """Check whether the counts and sizes are estimates, see is_sampled.
+
+        Returns:
+            bool: True if some packets were sampled
+        """
+        return is_sampled(self.packets)
+
+    def sampling(self) -> str:
+        """Describe how the packets were sampled, see describe.
+
+        Returns:
+            str: sampling rates and modes, empty if nothing was sampled
+        """
+        return describe(self.packets)
+
     def packet_count(self) -> int:
         """Get the number of packets.
 
         Returns:
             int: number of packets
         """
-        return len(self.packets)
+        return int(estimate_total(self.packets).value)
+
+    def packet_count_error(self) -> float:
+        """Get the margin of error of the number of packets.
+
+        Returns:
+            float: margin of packet_count
+        """
+        return estimate_total(self.packets).margin
 
     def time_series_speed(self, interval_count_target: int) -> tuple[pd.Series, pd.Series]:
         """Generate time series for the speed graph.
@@ -33,24 +122,29 @@ class BaseAnalyzer:
         Returns:
             tuple[pd.Series, pd.Series]: AVG bytes per second, MAX bytes per second
         """
-        time_df = self.packets.copy()
-        time_df.set_index("packet.time", inplace=True)
-        _, _, duration = self.time_range_and_duration()
-        duration_seconds = int(duration.total_seconds())
+        # the sizes are indexed by the time column as it is, without copying the packets
+        sizes = self.packets["packet.size"] * weights(self.packets)
+        sizes.index = pd.DatetimeIndex(self.packets["packet.time"])
+        return speed_series(sizes, self._sampling_freq(interval_count_target))
 
-        # Ensure that the interval count is between 1 and the duration in seconds
-        interval_count_target = max(1, min(duration_seconds, interval_count_target))
+    def time_series_speed_error(self, interval_count_target: int) -> pd.Series:
+        """Generate the margins of error of the average speed, see time_series_speed. The maximum
+        speed has none, a sample may miss the busiest second.
 
-        sampling_freq = duration_seconds // interval_count_target
-        sampling_freq = max(1, sampling_freq)
-        sampling_freq = custom_round(sampling_freq)
+        Args:
+            interval_count_target (int): Preferred number of intervals in the resulting series.
 
-        bytes_per_second = time_df["packet.size"].resample("s").sum().fillna(0)
-        max_bytes_per_second = bytes_per_second.resample(f"{sampling_freq}s").max().fillna(0)
-        bytes_per_interval = time_df["packet.size"].resample(f"{sampling_freq}s").sum().fillna(0)
-        bytes_per_second = bytes_per_interval / sampling_freq
+        Returns:
+            pd.Series: margin of AVG bytes per second
+        """
+        sampling_freq = self._sampling_freq(interval_count_target)
+        sums = estimate_sums(
+            self.packets, pd.Grouper(key="packet.time", freq=f"{sampling_freq}s"), "packet.size")
+        return sums["margin"].fillna(0) / sampling_freq
 
-        return bytes_per_second, max_bytes_per_second
+    def _sampling_freq(self, interval_count_target: int) -> int:
+        _, _, duration = self.time_range_and_duration()
+        return speed_interval(duration, interval_count_target)
 
     def total_size(self) -> float:
         """Get total size of all packets.
@@ -58,7 +152,15 @@ class BaseAnalyzer:
         Returns:
             float: total number of bytes
         """
-        return self.packets["packet.size"].sum()
+        return estimate_total(self.packets, "packet.size").value
+
+    def total_size_error(self) -> float:
+        """Get the margin of error of the total size.
+
+        Returns:
+            float: margin of total_size in bytes
+        """
+        return estimate_total(self.packets, "packet.size").margin
 
     def time_range_and_duration(self) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta]:
         """Get time range and total duration of all packets.
@@ -77,14 +179,46 @@ class BaseAnalyzer:
         Returns:
             dict[LayerLevel, pd.Series]: protocol name, count
         """
-        application = self.packets[f"{LayerLevel.APPLICATION}.layer_name"].value_counts()
-        transport = self.packets[f"{LayerLevel.TRANSPORT}.layer_name"].value_counts()
-        network = self.packets[f"{LayerLevel.NETWORK}.layer_name"].value_counts()
-        link = self.packets[f"{LayerLevel.LINK}.layer_name"].value_counts()
-
-        return {
-            LayerLevel.APPLICATION: application,
-            LayerLevel.TRANSPORT: transport,
-            LayerLevel.NETWORK: network,
-            LayerLevel.LINK: link
-        }
+        return {layer_level: counts["count"]
+                for layer_level, counts in self._protocol_counts().items()}
+
+    def protocol_distribution_error(self) -> dict[LayerLevel, pd.Series]:
+        """Get the margins of error of the protocol distribution.
+
+        Returns:
+            dict[LayerLevel, pd.Series]: protocol name, margin of the count
+        """
+        return {layer_level: counts["margin"]
+                for layer_level, counts in self._protocol_counts().items()}
+
+    def _protocol_counts(self) -> dict[LayerLevel, pd.DataFrame]:
+        return {layer_level: estimate_counts(self.packets, f"{layer_level}.layer_name")
+                for layer_level in (LayerLevel.APPLICATION, LayerLevel.TRANSPORT,
+                                    LayerLevel.NETWORK, LayerLevel.LINK)}
+
+    def checksum_summary(self) -> dict[str, dict[str, int]]:
+        """Count valid, invalid and unchecked checksums per protocol.
+
+        A missing checksum_valid value means that the checksum policy skipped the packet, so it
+        is counted as unchecked, not invalid. IPv6 headers have no checksum and are left out.
+
+        Returns:
+            dict[str, dict[str, int]]: protocol name, counts keyed by "valid", "invalid" and
+                "unchecked"
+        """
+        summary = {}
+        for layer_level, layer_name in CHECKSUM_LAYERS:
+            column = f"{layer_level}.{layer_name}.data.checksum_valid"
+            if column not in self.packets:
+                summary[layer_name] = {"valid": 0, "invalid": 0, "unchecked": 0}
+                continue
+            selector = self.packets[f"{layer_level}.layer_name"] == layer_name
+            if layer_name == "IP":
+                selector &= self.packets[f"{layer_level}.IP.data.version"] == IPVersion.IPV4
+            values = self.packets.loc[selector, column]
+            summary[layer_name] = {
+                "valid": int(values.eq(True).sum()),
+                "invalid": int(values.eq(False).sum()),
+                "unchecked": int(values.isna().sum())
+            }
+        return summary
@@ -2,10 +2,23 @@ import pandas as pd
 
 from layers.layer_level import LayerLevel
 from layers.dhcp import DHCPMessageType
+from analyzer.sampling import estimate_counts, is_sampled, SAMPLING_COLUMNS
 
 
 class DHCPAnalyzer:
-    """Analyzer for producing statistics about DHCP packets."""
+    """Analyzer for producing statistics about DHCP packets.
+
+    Counts are estimates if the packets were sampled, see BaseAnalyzer.
+    """
+
+    columns = [
+        f"{LayerLevel.APPLICATION}.layer_name",
+        *(f"{LayerLevel.APPLICATION}.DHCP.data.{key}"
+          for key in ("message_type", "client_hostname", "client_mac", "domain")),
+        f"{LayerLevel.NETWORK}.IP.data.src_addr",
+        f"{LayerLevel.LINK}.Ethernet.data.src_addr",
+        *SAMPLING_COLUMNS
+    ]
 
     def __init__(self, packets: pd.DataFrame) -> None:
         """Initializes the analyzer with provided packets and filters out all but selected DHCP
@@ -16,6 +29,7 @@ class DHCPAnalyzer:
         """
         selector = packets[f"{LayerLevel.APPLICATION}.layer_name"] == "DHCP"
         self.packets = packets[selector]
+        self.acks = self.packets
         if self.packets.empty:
             return
 
@@ -26,6 +40,14 @@ class DHCPAnalyzer:
         )
         self.acks = self.packets[selector]
 
+    def sampled(self) -> bool:
+        """Check whether the counts are estimates, see is_sampled.
+
+        Returns:
+            bool: True if some DHCP packets were sampled
+        """
+        return is_sampled(self.packets)
+
     def most_common_clients(self, n=10) -> dict[tuple[str, str], int]:
         """From the clients that have done DHCP requests, return "n" most common ones.
 
@@ -35,13 +57,27 @@ class DHCPAnalyzer:
         Returns:
             dict[tuple[str, str], int]: (hostname, MAC), count
         """
+        return self._clients()["count"].head(n).to_dict()
+
+    def most_common_clients_error(self, n=10) -> dict[tuple[str, str], float]:
+        """Get the margins of error of the most common clients.
+
+        Args:
+            n (int, optional): How many clients to return. Defaults to 10.
+
+        Returns:
+            dict[tuple[str, str], float]: (hostname, MAC), margin of the count
+        """
+        return self._clients()["margin"].head(n).to_dict()
+
+    def _clients(self) -> pd.DataFrame:
         if self.packets.empty:
-            return {}
+            return pd.DataFrame({"count": [], "margin": []})
         selector = [
             f"{LayerLevel.APPLICATION}.DHCP.data.client_hostname",
             f"{LayerLevel.APPLICATION}.DHCP.data.client_mac"
         ]
-        return self.packets.groupby(selector).size().head(n).to_dict()
+        return estimate_counts(self.packets, selector, sort=False)
 
     def most_common_servers(self, n=10) -> dict[tuple[str, str], int]:
         """From the servers that have returned DHCPACKs, return the "n" most common ones.
@@ -52,13 +88,27 @@ class DHCPAnalyzer:
         Returns:
             dict[str, int]: (IP, MAC), count
         """
+        return self._servers()["count"].head(n).to_dict()
+
+    def most_common_servers_error(self, n=10) -> dict[tuple[str, str], float]:
+        """Get the margins of error of the most common servers.
+
+        Args:
+            n (int, optional): How many servers to return. Defaults to 10.
+
+        Returns:
+            dict[tuple[str, str], float]: (IP, MAC), margin of the count
+        """
+        return self._servers()["margin"].head(n).to_dict()
+
+    def _servers(self) -> pd.DataFrame:
         if self.packets.empty:
-            return {}
+            return pd.DataFrame({"count": [], "margin": []})
         selector = [
             f"{LayerLevel.NETWORK}.IP.data.src_addr",
             f"{LayerLevel.LINK}.Ethernet.data.src_addr"
         ]
-        return self.acks.groupby(selector).size().head(n).to_dict()
+        return estimate_counts(self.acks, selector, sort=False)
 
     def most_common_domains(self, n=10) -> dict[str, int]:
         """From the DHCPACK packets, return the "n" most common domains.
@@ -69,7 +119,21 @@ class DHCPAnalyzer:
         Returns:
             dict[str, int]: domain, count
         """
+        return self._domains()["count"].head(n).to_dict()
+
+    def most_common_domains_error(self, n=10) -> dict[str, float]:
+        """Get the margins of error of the most common domains.
+
+        Args:
+            n (int, optional): How many domains to return. Defaults to 10.
+
+        Returns:
+            dict[str, float]: domain, margin of the count
+        """
+        return self._domains()["margin"].head(n).to_dict()
+
+    def _domains(self) -> pd.DataFrame:
         if self.packets.empty:
-            return {}
+            return pd.DataFrame({"count": [], "margin": []})
         selector = f"{LayerLevel.APPLICATION}.DHCP.data.domain"
-        return self.acks.groupby(selector).size().head(n).to_dict()
+        return estimate_counts(self.acks, selector, sort=False)
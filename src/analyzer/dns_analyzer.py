@@ -3,10 +3,26 @@ import pandas as pd
 from layers.dns import DNSDir
 from layers.layer_level import LayerLevel
 from utils.utils import extract_2ld
+from analyzer.sampling import estimate_counts, is_sampled, SAMPLING_COLUMNS
+
+
+# second level domains of the queried names, see DNSAnalyzer.enrich
+DOMAIN = f"{LayerLevel.APPLICATION}.DNS.data.2LD"
 
 
 class DNSAnalyzer:
-    """Analyzer for producing statistics about DHCP packets."""
+    """Analyzer for producing statistics about DHCP packets.
+
+    Counts are estimates if the packets were sampled, see BaseAnalyzer.
+    """
+
+    columns = [
+        f"{LayerLevel.APPLICATION}.layer_name",
+        f"{LayerLevel.APPLICATION}.DNS.data.qname",
+        f"{LayerLevel.APPLICATION}.DNS.data.direction",
+        f"{LayerLevel.NETWORK}.IP.data.dst_addr",
+        *SAMPLING_COLUMNS
+    ]
 
     def __init__(self, packets: pd.DataFrame) -> None:
         """Initializes the analyzer with provided packets and filters out all but selected DNS
@@ -17,6 +33,7 @@ class DNSAnalyzer:
         """
         selector = packets[f"{LayerLevel.APPLICATION}.layer_name"] == "DNS"
         self.packets = packets[selector]
+        self.domains = pd.Series(dtype="object")
 
         if self.packets.empty:
             return
@@ -26,11 +43,31 @@ class DNSAnalyzer:
     def enrich(self) -> None:
         """Enrich the packet data with new calculated fields.
 
-        Parses Second Level Domain from the queried name and saves it in "2LD" column.
+        Parses Second Level Domain from the queried name and saves it in domains, indexed like
+        the packets, which are left as they are.
+        """
+        qname_series = self.packets[f"{LayerLevel.APPLICATION}.DNS.data.qname"]
+        # a categorical column maps each distinct name once
+        self.domains = qname_series.map(extract_2ld, na_action="ignore").rename(DOMAIN)
+
+    def sampled(self) -> bool:
+        """Check whether the counts are estimates, see is_sampled.
+
+        Returns:
+            bool: True if some DNS packets were sampled
+        """
+        return is_sampled(self.packets)
+
+    def queries(self) -> pd.DataFrame:
+        """Get the DNS queries, the packets sent to the servers.
+
+        Returns:
+            pd.DataFrame: one query per row
         """
-        qname_series = self.packets.loc[:, f"{LayerLevel.APPLICATION}.DNS.data.qname"]
-        sld_series = qname_series.apply(extract_2ld)
-        self.packets.loc[:, f"{LayerLevel.APPLICATION}.DNS.data.2LD"] = sld_series
+        if self.packets.empty:
+            return self.packets
+        selector = self.packets[f"{LayerLevel.APPLICATION}.DNS.data.direction"] == DNSDir.QUERY
+        return self.packets[selector]
 
     def most_queried_domains(self, n=10) -> dict[str, int]:
         """Get the most commonly queried domains, grouped by second level domain.
@@ -41,10 +78,23 @@ class DNSAnalyzer:
         Returns:
             dict[str, int]: domain, count
         """
+        return self._queried_domains()["count"].head(n).to_dict()
+
+    def most_queried_domains_error(self, n=10) -> dict[str, float]:
+        """Get the margins of error of the most commonly queried domains.
+
+        Args:
+            n (int, optional): How many domains to return. Defaults to 10.
+
+        Returns:
+            dict[str, float]: domain, margin of the count
+        """
+        return self._queried_domains()["margin"].head(n).to_dict()
+
+    def _queried_domains(self) -> pd.DataFrame:
         if self.packets.empty:
-            return {}
-        selector = f"{LayerLevel.APPLICATION}.DNS.data.2LD"
-        return self.packets[selector].value_counts().head(n).to_dict()
+            return pd.DataFrame({"count": [], "margin": []})
+        return estimate_counts(self.packets.assign(**{DOMAIN: self.domains}), DOMAIN)
 
     def most_common_servers(self, n=10) -> dict[str, int]:
         """Get the most commonly used DNS servers.
@@ -55,10 +105,21 @@ class DNSAnalyzer:
         Returns:
             dict[str, int]: IP, count
         """
-        if self.packets.empty:
-            return {}
+        return self._servers()["count"].head(n).to_dict()
 
-        selector = self.packets[f"{LayerLevel.APPLICATION}.DNS.data.direction"] == DNSDir.QUERY
-        df = self.packets[selector]
+    def most_common_servers_error(self, n=10) -> dict[str, float]:
+        """Get the margins of error of the most commonly used DNS servers.
+
+        Args:
+            n (int, optional): How many servers to return. Defaults to 10.
+
+        Returns:
+            dict[str, float]: IP, margin of the count
+        """
+        return self._servers()["margin"].head(n).to_dict()
+
+    def _servers(self) -> pd.DataFrame:
+        if self.packets.empty:
+            return pd.DataFrame({"count": [], "margin": []})
         selector = f"{LayerLevel.NETWORK}.IP.data.dst_addr"
-        return df[selector].value_counts().head(n).to_dict()
+        return estimate_counts(self.queries(), selector)
@@ -0,0 +1,231 @@
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from layers.layer_level import LayerLevel
+
+
+SAMPLE_RATE = "packet.sample_rate"
+SAMPLE_MODE = "packet.sample_mode"
+Z_95 = 1.96  # margins are for 95 % confidence
+
+# columns that identify the flow of a packet sampled in the "flow" mode: the protocol, and the
+# address and port of each end
+FLOW_PROTOCOL = f"{LayerLevel.TRANSPORT}.layer_name"
+FLOW_ENDS = tuple(
+    (f"{LayerLevel.NETWORK}.IP.data.{end}_addr",
+     tuple(f"{LayerLevel.TRANSPORT}.{protocol}.data.{end}_port" for protocol in ("TCP", "UDP")))
+    for end in ("src", "dst"))
+
+# columns the estimates read, besides the ones they count or sum
+SAMPLING_COLUMNS = [SAMPLE_RATE, SAMPLE_MODE, FLOW_PROTOCOL,
+                    *(column for address, ports in FLOW_ENDS for column in (address, *ports))]
+
+
+class Estimate(NamedTuple):
+    """Estimate of a total in the captured traffic, and the margin of error of the estimate."""
+    value: float
+    margin: float
+
+
+def is_sampled(packets: pd.DataFrame) -> bool:
+    """Check whether any of the packets were sampled, see Sampler.
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+
+    Returns:
+        bool: True if some packets stand for more than one captured packet
+    """
+    return SAMPLE_RATE in packets and bool(packets[SAMPLE_RATE].notna().any())
+
+
+def weights(packets: pd.DataFrame) -> pd.Series:
+    """Get the number of captured packets each packet stands for.
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+
+    Returns:
+        pd.Series: sampling rate of each packet, 1 for packets that were not sampled
+    """
+    if SAMPLE_RATE not in packets:
+        return pd.Series(1, index=packets.index, dtype="int64")
+    return packets[SAMPLE_RATE].fillna(1).astype("int64")
+
+
+def describe(packets: pd.DataFrame) -> str:
+    """Describe how the packets were sampled, like "1 in 100 packets".
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+
+    Returns:
+        str: sampling rates and modes, empty if nothing was sampled
+    """
+    if not is_sampled(packets):
+        return ""
+    samplings = packets[[SAMPLE_RATE, SAMPLE_MODE]].dropna().drop_duplicates()
+    return describe_samplings(samplings.itertuples(index=False),
+                              bool(packets[SAMPLE_RATE].isna().any()))
+
+
+def describe_samplings(samplings: Iterable[tuple[int, str]], unsampled: bool) -> str:
+    """Describe sampling rates and modes, like "1 in 100 packets", see describe.
+
+    Args:
+        samplings (Iterable[tuple[int, str]]): distinct pairs of sampling rate and mode
+        unsampled (bool): True if some packets were not sampled
+
+    Returns:
+        str: sampling rates and modes, empty if nothing was sampled
+    """
+    parts = [f"1 in {rate} {mode}s" for rate, mode in sorted(samplings)]
+    if parts and unsampled:
+        parts.append("rest in full")
+    return ", ".join(parts)
+
+
+def sample_units(packets: pd.DataFrame) -> pd.Series:
+    """Number the units the packets were sampled in, which are kept or dropped together.
+
+    A packet sampled in the "flow" mode belongs to the unit of its flow, in both directions, any
+    other packet is a unit of its own.
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+
+    Returns:
+        pd.Series: unit of each packet
+    """
+    units = pd.Series(np.arange(len(packets)), index=packets.index)
+    if SAMPLE_MODE not in packets:
+        return units
+    flows = packets[SAMPLE_MODE].eq("flow").fillna(False).astype(bool) \
+        & packets[FLOW_ENDS[0][0]].notna()
+    if not flows.any():
+        return units
+    flow_packets = packets[flows]
+    ends = []
+    for address, port_columns in FLOW_ENDS:
+        ports = pd.Series(pd.NA, index=flow_packets.index, dtype="object")
+        for column in port_columns:
+            if column in flow_packets:
+                ports = ports.fillna(flow_packets[column].astype("object"))
+        ends.append(flow_packets[address].astype(str) + ":" + ports.astype(str))
+    forward = ends[0] < ends[1]
+    key = pd.DataFrame({
+        "protocol": flow_packets[FLOW_PROTOCOL].astype(str),
+        "low": ends[0].where(forward, ends[1]),
+        "high": ends[1].where(forward, ends[0])})
+    units[flows] = len(packets) + key.groupby(list(key), sort=False).ngroup().to_numpy()
+    return units
+
+
+def estimate_total(packets: pd.DataFrame, column: str | None = None) -> Estimate:
+    """Estimate the number of captured packets, or the sum of a column over them.
+
+    The estimate is the Horvitz-Thompson sum, where each packet counts sampling rate times. The
+    margin treats the kept units as drawn independently, which suits the hash of the "flow" mode
+    and is close to the systematic "packet" mode unless the traffic repeats with the same period.
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+        column (str | None, optional): column to sum, None counts the packets. Defaults to None.
+
+    Returns:
+        Estimate: estimated total and its margin of error, which is 0 if nothing was sampled
+    """
+    values = _values(packets, column)
+    value = (values * weights(packets)).sum()
+    if not is_sampled(packets):
+        return Estimate(value, 0.0)
+    return Estimate(value, float(_margins(packets, [], values)))
+
+
+def estimate_counts(packets: pd.DataFrame, by: str | list[str],
+                    sort: bool = True) -> pd.DataFrame:
+    """Estimate the number of captured packets of each value, like value_counts, or of each
+    group of values, like groupby().size(). Packets with a missing value are left out.
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+        by (str | list[str]): column or columns to count the values of
+        sort (bool, optional): True puts the most common first, False sorts by the value.
+            Defaults to True.
+
+    Returns:
+        pd.DataFrame: "count" and "margin" of each value, see estimate_total
+    """
+    keys = [by] if isinstance(by, str) else by
+    # categorical columns count only the values that occur
+    if not is_sampled(packets):
+        counts = packets.groupby(by, observed=True).size()
+        return order_counts(pd.DataFrame({"count": counts, "margin": 0.0}), sort)
+    groups = packets[by] if isinstance(by, str) else [packets[key] for key in by]
+    counts = weights(packets).groupby(groups, observed=True).sum()
+    margins = _margins(packets, keys, _values(packets, None))
+    return order_counts(
+        pd.DataFrame({"count": counts, "margin": margins.reindex(counts.index)}), sort)
+
+
+def order_counts(counts: pd.DataFrame, sort: bool = True) -> pd.DataFrame:
+    """Order counts by the value, and the most common first if sorted. Categorical values are
+    ordered by the value too, not by the order of the categories.
+
+    Args:
+        counts (pd.DataFrame): "count" of each value, in the index
+        sort (bool, optional): True puts the most common first, and equal counts in the order of
+            the value, False orders by the value only. Defaults to True.
+
+    Returns:
+        pd.DataFrame: the counts in order
+    """
+    index = counts.index
+    if isinstance(index, pd.MultiIndex):
+        index = index.set_levels([level.astype(object) for level in index.levels])
+    else:
+        index = index.astype(object)
+    counts = counts.set_axis(index).sort_index()
+    return counts.sort_values("count", ascending=False, kind="stable") if sort else counts
+
+
+def estimate_sums(packets: pd.DataFrame, by: pd.Grouper, column: str) -> pd.DataFrame:
+    """Estimate the sum of a column over the captured packets of each group, like
+    groupby()[column].sum().
+
+    Args:
+        packets (pd.DataFrame): one packet per row
+        by (pd.Grouper): groups, like time intervals
+        column (str): column to sum
+
+    Returns:
+        pd.DataFrame: "sum" and "margin" of each group, see estimate_total
+    """
+    values = _values(packets, column)
+    weighted = packets[[by.key]].assign(_value=values * weights(packets))
+    sums = weighted.groupby(by)["_value"].sum()
+    if not is_sampled(packets):
+        return pd.DataFrame({"sum": sums, "margin": 0.0})
+    return pd.DataFrame({"sum": sums,
+                         "margin": _margins(packets, [by], values).reindex(sums.index)})
+
+
+def _values(packets: pd.DataFrame, column: str | None) -> pd.Series:
+    if column is None:
+        return pd.Series(1, index=packets.index, dtype="int64")
+    return packets[column]
+
+
+def _margins(packets: pd.DataFrame, by: list, values: pd.Series) -> pd.Series | float:
+    # Var = sum of w * (w - 1) * y^2 over the kept units, y being the total of the unit
+    columns = [key if isinstance(key, str) else key.key for key in by]
+    frame = packets[columns].assign(
+        _unit=sample_units(packets), _weight=weights(packets), _value=values)
+    units = frame.groupby([*by, "_unit"], observed=True).agg(
+        weight=("_weight", "first"), total=("_value", "sum"))
+    variances = units["weight"] * (units["weight"] - 1) * units["total"].astype(float) ** 2
+    if not by:
+        return Z_95 * np.sqrt(variances.sum())
+    return Z_95 * np.sqrt(variances.groupby(level=list(range(len(by))), observed=True).sum())
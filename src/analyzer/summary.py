@@ -0,0 +1,486 @@
+import numpy as np
+import pandas as pd
+
+from layers.layer_level import LayerLevel
+from analyzer.base_analyzer import BaseAnalyzer, speed_interval, speed_series
+from analyzer.dns_analyzer import DNSAnalyzer
+from analyzer.dhcp_analyzer import DHCPAnalyzer
+from analyzer.sampling import (
+    Estimate, weights, is_sampled, describe_samplings, order_counts, SAMPLE_RATE, SAMPLE_MODE,
+    Z_95)
+
+
+# names of the count tables besides the protocols, which are named by their layer_name column
+TOTALS = "totals"
+SECONDS = "seconds"
+DNS_DOMAINS = "dns.domains"
+DNS_SERVERS = "dns.servers"
+DHCP_CLIENTS = "dhcp.clients"
+DHCP_SERVERS = "dhcp.servers"
+DHCP_DOMAINS = "dhcp.domains"
+PROTOCOL_LEVELS = (LayerLevel.APPLICATION, LayerLevel.TRANSPORT, LayerLevel.NETWORK,
+                   LayerLevel.LINK)
+
+
+class Summary:
+    """Statistics of packets kept as partial aggregates that merge: the estimated count of each
+    protocol, domain, server and client, the bytes of each second, the time range, the checksum
+    counts and the samplings.
+
+    The summaries of two sets of packets merge into the summary of all of them, so the context
+    summarizes each chunk once as it is added, and the dashboard is refreshed from the merged
+    summary without analyzing the packets again. The summary answers like BaseAnalyzer, and
+    DNSSummary and DHCPSummary like the DNS and DHCP analyzers.
+
+    Each count is kept with its variance, see estimate_total, which adds up over the chunks only
+    if each packet was sampled on its own, so packets sampled in the "flow" mode have no summary.
+    """
+
+    __slots__ = ("tables", "time_range", "checksums", "samplings", "unsampled")
+
+    def __init__(self, tables: dict[str, pd.DataFrame], time_range: tuple[pd.Timestamp, ...],
+                 checksums: pd.DataFrame, samplings: frozenset[tuple[int, str]],
+                 unsampled: bool) -> None:
+        """Initializes the summary, see Summary.of.
+
+        Args:
+            tables (dict[str, pd.DataFrame]): "count" and "variance" of each key, by table name
+            time_range (tuple[pd.Timestamp, ...]): time of the first and the last packet
+            checksums (pd.DataFrame): "valid", "invalid" and "unchecked" counts by protocol, see
+                BaseAnalyzer.checksum_summary
+            samplings (frozenset[tuple[int, str]]): distinct pairs of sampling rate and mode
+            unsampled (bool): True if some packets were not sampled
+        """
+        self.tables = tables
+        self.time_range = time_range
+        self.checksums = checksums
+        self.samplings = samplings
+        self.unsampled = unsampled
+
+    @classmethod
+    def of(cls, packets: pd.DataFrame) -> "Summary | None":
+        """Summarize packets.
+
+        Args:
+            packets (pd.DataFrame): one packet per row, at least one
+
+        Returns:
+            Summary | None: summary of the packets, None if some were sampled in the "flow" mode
+        """
+        if SAMPLE_MODE in packets and packets[SAMPLE_MODE].eq("flow").any():
+            return None
+        # the analyzers select the packets by their layers, which some chunks may not have
+        packets = packets.assign(**{column: None for column in _protocol_columns()
+                                    if column not in packets})
+        base_analyzer = BaseAnalyzer(packets)
+        dns_analyzer = DNSAnalyzer(packets)
+        dhcp_analyzer = DHCPAnalyzer(packets)
+        dns_servers = dns_analyzer.queries()
+        times = packets["packet.time"]
+
+        tables = {
+            TOTALS: _totals(packets),
+            SECONDS: _table(packets, [times.dt.floor("s")], packets["packet.size"]),
+            **{column: _table(packets, [packets[column]]) for column in _protocol_columns()},
+            DNS_DOMAINS: _table(dns_analyzer.packets, [dns_analyzer.domains]),
+            DNS_SERVERS: _table(
+                dns_servers, _keys(dns_servers, f"{LayerLevel.NETWORK}.IP.data.dst_addr")),
+            **_dhcp_tables(dhcp_analyzer)
+        }
+        samplings, unsampled = frozenset(), True
+        if is_sampled(packets):
+            rates = packets[[SAMPLE_RATE, SAMPLE_MODE]].dropna().drop_duplicates()
+            samplings = frozenset(tuple(row) for row in rates.itertuples(index=False))
+            unsampled = bool(packets[SAMPLE_RATE].isna().any())
+        checksums = pd.DataFrame(base_analyzer.checksum_summary()).T
+        return cls(tables, (times.min(), times.max()), checksums, samplings, unsampled)
+
+    def merge(self, other: "Summary") -> "Summary":
+        """Merge with the summary of other packets.
+
+        Args:
+            other (Summary): summary of other packets
+
+        Returns:
+            Summary: summary of the packets of both
+        """
+        tables = {name: _merge_tables(table, other.tables[name])
+                  for name, table in self.tables.items()}
+        time_range = (min(self.time_range[0], other.time_range[0]),
+                      max(self.time_range[1], other.time_range[1]))
+        return Summary(tables, time_range, self.checksums + other.checksums,
+                       self.samplings | other.samplings, self.unsampled or other.unsampled)
+
+    def counts(self, name: str, sort: bool = True) -> pd.DataFrame:
+        """Get the estimated counts of a table, like estimate_counts.
+
+        Args:
+            name (str): name of the table
+            sort (bool, optional): True puts the most common first, False sorts by the value,
+                see order_counts. Defaults to True.
+
+        Returns:
+            pd.DataFrame: "count" and "margin" of each value
+        """
+        table = self.tables[name]
+        margins = Z_95 * np.sqrt(table["variance"])
+        return order_counts(pd.DataFrame({"count": table["count"], "margin": margins}), sort)
+
+    def sampled(self) -> bool:
+        """Check whether the counts and sizes are estimates, see is_sampled.
+
+        Returns:
+            bool: True if some packets were sampled
+        """
+        return bool(self.samplings)
+
+    def sampling(self) -> str:
+        """Describe how the packets were sampled, see describe.
+
+        Returns:
+            str: sampling rates and modes, empty if nothing was sampled
+        """
+        return describe_samplings(self.samplings, self.unsampled)
+
+    def packet_count(self) -> int:
+        """Get the number of packets, see BaseAnalyzer.packet_count.
+
+        Returns:
+            int: number of packets
+        """
+        return int(self._total("packets").value)
+
+    def packet_count_error(self) -> float:
+        """Get the margin of error of the number of packets.
+
+        Returns:
+            float: margin of packet_count
+        """
+        return self._total("packets").margin
+
+    def total_size(self) -> float:
+        """Get total size of all packets, see BaseAnalyzer.total_size.
+
+        Returns:
+            float: total number of bytes
+        """
+        return self._total("size").value
+
+    def total_size_error(self) -> float:
+        """Get the margin of error of the total size.
+
+        Returns:
+            float: margin of total_size in bytes
+        """
+        return self._total("size").margin
+
+    def _total(self, name: str) -> Estimate:
+        totals = self.tables[TOTALS]
+        return Estimate(totals.at[name, "count"],
+                        float(Z_95 * np.sqrt(totals.at[name, "variance"])))
+
+    def time_range_and_duration(self) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta]:
+        """Get time range and total duration of all packets.
+
+        Returns:
+            tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta]: start time, end time, duration
+        """
+        time_earliest, time_latest = self.time_range
+        return time_earliest, time_latest, time_latest - time_earliest
+
+    def time_series_speed(self, interval_count_target: int) -> tuple[pd.Series, pd.Series]:
+        """Generate time series for the speed graph, see BaseAnalyzer.time_series_speed.
+
+        Args:
+            interval_count_target (int): Preferred number of intervals in the resulting series.
+
+        Returns:
+            tuple[pd.Series, pd.Series]: AVG bytes per second, MAX bytes per second
+        """
+        seconds = self.tables[SECONDS].sort_index()
+        return speed_series(seconds["count"], self._sampling_freq(interval_count_target))
+
+    def time_series_speed_error(self, interval_count_target: int) -> pd.Series:
+        """Generate the margins of error of the average speed, see
+        BaseAnalyzer.time_series_speed_error.
+
+        Args:
+            interval_count_target (int): Preferred number of intervals in the resulting series.
+
+        Returns:
+            pd.Series: margin of AVG bytes per second
+        """
+        sampling_freq = self._sampling_freq(interval_count_target)
+        variances = self.tables[SECONDS]["variance"].sort_index()
+        return Z_95 * np.sqrt(variances.resample(f"{sampling_freq}s").sum()) / sampling_freq
+
+    def _sampling_freq(self, interval_count_target: int) -> int:
+        _, _, duration = self.time_range_and_duration()
+        return speed_interval(duration, interval_count_target)
+
+    def protocol_distribution(self) -> dict[LayerLevel, pd.Series]:
+        """Get protocol distribution of all packets.
+
+        Returns:
+            dict[LayerLevel, pd.Series]: protocol name, count
+        """
+        return {layer_level: self.counts(f"{layer_level}.layer_name")["count"]
+                for layer_level in PROTOCOL_LEVELS}
+
+    def protocol_distribution_error(self) -> dict[LayerLevel, pd.Series]:
+        """Get the margins of error of the protocol distribution.
+
+        Returns:
+            dict[LayerLevel, pd.Series]: protocol name, margin of the count
+        """
+        return {layer_level: self.counts(f"{layer_level}.layer_name")["margin"]
+                for layer_level in PROTOCOL_LEVELS}
+
+    def checksum_summary(self) -> dict[str, dict[str, int]]:
+        """Count valid, invalid and unchecked checksums per protocol, see
+        BaseAnalyzer.checksum_summary.
+
+        Returns:
+            dict[str, dict[str, int]]: protocol name, counts keyed by "valid", "invalid" and
+                "unchecked"
+        """
+        return {protocol: {status: int(count) for status, count in counts.items()}
+                for protocol, counts in self.checksums.to_dict(orient="index").items()}
+
+
+class DNSSummary:
+    """Answers like DNSAnalyzer, from a summary."""
+
+    def __init__(self, summary: Summary) -> None:
+        self.summary = summary
+
+    def sampled(self) -> bool:
+        """Check whether the counts are estimates.
+
+        Returns:
+            bool: True if some packets were sampled
+        """
+        return self.summary.sampled()
+
+    def most_queried_domains(self, n=10) -> dict[str, int]:
+        """Get the most commonly queried domains, see DNSAnalyzer.most_queried_domains.
+
+        Args:
+            n (int, optional): How many domains to return. Defaults to 10.
+
+        Returns:
+            dict[str, int]: domain, count
+        """
+        return self.summary.counts(DNS_DOMAINS)["count"].head(n).to_dict()
+
+    def most_queried_domains_error(self, n=10) -> dict[str, float]:
+        """Get the margins of error of the most commonly queried domains.
+
+        Args:
+            n (int, optional): How many domains to return. Defaults to 10.
+
+        Returns:
+            dict[str, float]: domain, margin of the count
+        """
+        return self.summary.counts(DNS_DOMAINS)["margin"].head(n).to_dict()
+
+    def most_common_servers(self, n=10) -> dict[str, int]:
+        """Get the most commonly used DNS servers, see DNSAnalyzer.most_common_servers.
+
+        Args:
+            n (int, optional): How many servers to return. Defaults to 10.
+
+        Returns:
+            dict[str, int]: IP, count
+        """
+        return self.summary.counts(DNS_SERVERS)["count"].head(n).to_dict()
+
+    def most_common_servers_error(self, n=10) -> dict[str, float]:
+        """Get the margins of error of the most commonly used DNS servers.
+
+        Args:
+            n (int, optional): How many servers to return. Defaults to 10.
+
+        Returns:
+            dict[str, float]: IP, margin of the count
+        """
+        return self.summary.counts(DNS_SERVERS)["margin"].head(n).to_dict()
+
+
+class DHCPSummary:
+    """Answers like DHCPAnalyzer, from a summary."""
+
+    def __init__(self, summary: Summary) -> None:
+        self.summary = summary
+
+    def sampled(self) -> bool:
+        """Check whether the counts are estimates.
+
+        Returns:
+            bool: True if some packets were sampled
+        """
+        return self.summary.sampled()
+
+    def most_common_clients(self, n=10) -> dict[tuple[str, str], int]:
+        """Get the most common clients, see DHCPAnalyzer.most_common_clients.
+
+        Args:
+            n (int, optional): How many clients to return. Defaults to 10.
+
+        Returns:
+            dict[tuple[str, str], int]: (hostname, MAC), count
+        """
+        return self.summary.counts(DHCP_CLIENTS, sort=False)["count"].head(n).to_dict()
+
+    def most_common_clients_error(self, n=10) -> dict[tuple[str, str], float]:
+        """Get the margins of error of the most common clients.
+
+        Args:
+            n (int, optional): How many clients to return. Defaults to 10.
+
+        Returns:
+            dict[tuple[str, str], float]: (hostname, MAC), margin of the count
+        """
+        return self.summary.counts(DHCP_CLIENTS, sort=False)["margin"].head(n).to_dict()
+
+    def most_common_servers(self, n=10) -> dict[tuple[str, str], int]:
+        """Get the most common servers, see DHCPAnalyzer.most_common_servers.
+
+        Args:
+            n (int, optional): How many servers to return. Defaults to 10.
+
+        Returns:
+            dict[tuple[str, str], int]: (IP, MAC), count
+        """
+        return self.summary.counts(DHCP_SERVERS, sort=False)["count"].head(n).to_dict()
+
+    def most_common_servers_error(self, n=10) -> dict[tuple[str, str], float]:
+        """Get the margins of error of the most common servers.
+
+        Args:
+            n (int, optional): How many servers to return. Defaults to 10.
+
+        Returns:
+            dict[tuple[str, str], float]: (IP, MAC), margin of the count
+        """
+        return self.summary.counts(DHCP_SERVERS, sort=False)["margin"].head(n).to_dict()
+
+    def most_common_domains(self, n=10) -> dict[str, int]:
+        """Get the most common domains, see DHCPAnalyzer.most_common_domains.
+
+        Args:
+            n (int, optional): How many domains to return. Defaults to 10.
+
+        Returns:
+            dict[str, int]: domain, count
+        """
+        return self.summary.counts(DHCP_DOMAINS, sort=False)["count"].head(n).to_dict()
+
+    def most_common_domains_error(self, n=10) -> dict[str, float]:
+        """Get the margins of error of the most common domains.
+
+        Args:
+            n (int, optional): How many domains to return. Defaults to 10.
+
+        Returns:
+            dict[str, float]: domain, margin of the count
+        """
+        return self.summary.counts(DHCP_DOMAINS, sort=False)["margin"].head(n).to_dict()
+
+
+class IncrementalSummary:
+    """Summary of the chunks of a context, see Chunks, which summarizes only the chunks added
+    since the previous update.
+    """
+
+    __slots__ = ("chunks", "summary")
+
+    def __init__(self) -> None:
+        self.chunks: list[pd.DataFrame] = []
+        self.summary: Summary | None = None
+
+    def update(self, chunks: list[pd.DataFrame]) -> Summary | None:
+        """Fold in the chunks added since the previous update. If the earlier chunks were
+        replaced, everything is summarized again.
+
+        Args:
+            chunks (list[pd.DataFrame]): chunks of the context
+
+        Returns:
+            Summary | None: summary of the chunks, None if there are none, or if some packets
+                were sampled in the "flow" mode, see Summary.of
+        """
+        if len(chunks) < len(self.chunks) \
+                or any(chunk is not seen for chunk, seen in zip(chunks, self.chunks)):
+            self.chunks, self.summary = [], None
+        for chunk in chunks[len(self.chunks):]:
+            # one chunk without a summary leaves all of them without
+            if not self.chunks or self.summary is not None:
+                summary = Summary.of(chunk)
+                self.summary = summary if not self.chunks or summary is None \
+                    else self.summary.merge(summary)
+            self.chunks.append(chunk)
+        return self.summary
+
+
+def _protocol_columns() -> list[str]:
+    return [f"{layer_level}.layer_name" for layer_level in PROTOCOL_LEVELS]
+
+
+def _dhcp_tables(dhcp_analyzer: DHCPAnalyzer) -> dict[str, pd.DataFrame]:
+    packets, acks = dhcp_analyzer.packets, dhcp_analyzer.acks
+    dhcp = f"{LayerLevel.APPLICATION}.DHCP.data"
+    return {
+        DHCP_CLIENTS: _table(packets, _keys(packets, f"{dhcp}.client_hostname",
+                                            f"{dhcp}.client_mac")),
+        DHCP_SERVERS: _table(acks, _keys(acks, f"{LayerLevel.NETWORK}.IP.data.src_addr",
+                                         f"{LayerLevel.LINK}.Ethernet.data.src_addr")),
+        DHCP_DOMAINS: _table(acks, _keys(acks, f"{dhcp}.domain"))
+    }
+
+
+def _keys(packets: pd.DataFrame, *columns: str) -> list[pd.Series]:
+    # a missing column has no keys to count
+    return [packets[column] if column in packets
+            else pd.Series(None, index=packets.index, dtype="object", name=column)
+            for column in columns]
+
+
+def _totals(packets: pd.DataFrame) -> pd.DataFrame:
+    weight = weights(packets)
+    sizes = packets["packet.size"]
+    return pd.DataFrame({
+        "count": [weight.sum(), (sizes * weight).sum()],
+        "variance": [(weight * (weight - 1)).sum(),
+                     (weight * (weight - 1) * sizes.astype(float) ** 2).sum()]
+    }, index=["packets", "size"])
+
+
+def _table(packets: pd.DataFrame, by: list[pd.Series], values: pd.Series | None = None
+           ) -> pd.DataFrame:
+    # estimated count or sum of each group and its variance, each packet being a unit of its own
+    # in the estimate_total formula; packets with a missing key are left out
+    values = pd.Series(1, index=packets.index, dtype="int64") if values is None else values
+    if is_sampled(packets):
+        weight = weights(packets)
+        frame = pd.DataFrame({"count": values * weight,
+                              "variance": weight * (weight - 1) * values.astype(float) ** 2})
+        table = frame.groupby(by, observed=True, sort=False).sum()
+    else:
+        table = values.groupby(by, observed=True, sort=False).sum().to_frame("count")
+        table["variance"] = 0.0
+    # plain keys, categories differ between the chunks
+    if isinstance(table.index, pd.MultiIndex):
+        table.index = pd.MultiIndex.from_tuples(list(table.index), names=table.index.names)
+    elif isinstance(table.index, pd.CategoricalIndex):
+        table.index = pd.Index(np.asarray(table.index), name=table.index.name)
+    return table
+
+
+def _merge_tables(table: pd.DataFrame, other: pd.DataFrame) -> pd.DataFrame:
+    if other.empty:
+        return table
+    if table.empty:
+        return other
+    merged = pd.concat([table, other])
+    return merged.groupby(level=list(range(merged.index.nlevels)), sort=False).sum()
@@ -0,0 +1,120 @@
+"""Measure how many packets per second parse_packet parses, with the layers found by classify and
+by the membership tests it replaced.
+
+Run from the repository root, for example:
+
+    PYTHONPATH=src python3 -m benchmarks.classifier assets/example.pcapng --repeat 5
+"""
+import sys
+import time
+
+from scapy.layers.inet6 import _ICMPv6, _ICMPv6NDGuessPayload
+from scapy.packet import Packet as ScapyPacket
+
+from benchmarks.parse_rate import parse_arguments
+from components.layer import Layer
+from components.packet import Packet
+from layers import layers
+from layers.layer_level import LayerLevel
+from packet_parser.pcap_parser import PcapParser, ParsingError
+from packet_parser.pcap_reader import RecordReader, dissect_record
+
+
+class ScanParser(PcapParser):
+    """PcapParser that finds the layers of each level like the parser did before classify: with
+    a `layer_type in packet` test for each parser in turn, each walking the layer chain again,
+    and by iterating the packet for ICMPv6."""
+
+    def parse_packet(self, packet_number: int, packet: ScapyPacket,
+                     capture_id: int = 0) -> Packet:
+        """Parse a single Scapy packet into a custom packet, see PcapParser.parse_packet.
+
+        Args:
+            packet_number (int): Number of the packet
+            packet (Packet): Scapy packet
+            capture_id (int, optional): id of the capture, see Packet. Defaults to 0.
+
+        Returns:
+            Packet: custom packet
+        """
+        parsed_packet = Packet(
+            round(packet.time * 1_000_000_000), len(packet), packet_number, capture_id)
+
+        for layer_level in LayerLevel:
+            try:
+                layer = self.parse_layer(
+                    packet_number, layer_level, packet, scan(packet, layer_level))
+                parsed_packet.layers[layer_level] = layer
+            except ParsingError as e:
+                parsed_packet.layers[layer_level] = Layer(
+                    layers.RAW(layer_level), len(packet), len(packet.payload))
+                self._log_parsing_error(layer_level, e)
+            finally:
+                packet = packet.payload
+        return parsed_packet
+
+
+def scan(packet: ScapyPacket, layer_level: LayerLevel) -> dict[type, ScapyPacket]:
+    """Find the layers of the first parser of a level whose layer types are in the packet, with
+    the lookups of the parser before classify.
+
+    Args:
+        packet (Packet): Scapy packet, starting at the layer
+        layer_level (LayerLevel): level of the layer
+
+    Returns:
+        dict[type, Packet]: layers of the first matching parser, empty if none matched
+    """
+    for layer_types in PcapParser.layer_parsers[layer_level]:
+        if layer_types == (_ICMPv6,):
+            # the ICMPv6 test iterated the packet, which copies it
+            if any(isinstance(layer, (_ICMPv6, _ICMPv6NDGuessPayload)) for layer in packet):
+                return {_ICMPv6: packet}
+        elif all(layer_type in packet for layer_type in layer_types):
+            return {layer_type: packet[layer_type] for layer_type in layer_types}
+    return {}
+
+
+def measure(filename: str, parser_class: type[PcapParser], repeat: int) -> tuple[int, float]:
+    """Parse the dissected packets of a capture repeatedly and keep the fastest run.
+
+    The packets are dissected first, so only parse_packet is measured.
+
+    Args:
+        filename (str): path to the pcap file
+        parser_class (type[PcapParser]): PcapParser or ScanParser
+        repeat (int): number of runs
+
+    Returns:
+        tuple[int, float]: number of packets, seconds of the fastest run
+    """
+    with open(filename, "rb") as file:
+        packets = [(header.packet_number, dissect_record(header, data))
+                   for header, data in RecordReader(file)]
+    best = float("inf")
+    for _ in range(repeat):
+        parser = parser_class(log_dir=None)
+        start = time.perf_counter()
+        for packet_number, packet in packets:
+            parser.parse_packet(packet_number, packet)
+        best = min(best, time.perf_counter() - start)
+    return len(packets), best
+
+
+def main() -> None:
+    """Print the parse rate of each capture, with the layers found by scanning and by classify."""
+    args = parse_arguments(__doc__.splitlines()[0])
+
+    # config sends stdout to the application log
+    out = sys.__stdout__
+    print(f"{'file':<32} {'lookup':<8} {'packets':>8} {'seconds':>8} {'packets/s':>10}",
+          file=out)
+    for filename in args.files:
+        for lookup, parser_class in (("scan", ScanParser), ("classify", PcapParser)):
+            packets, seconds = measure(filename, parser_class, args.repeat)
+            print(f"{filename:<32} {lookup:<8} {packets:>8} {seconds:>8.3f} "
+                  f"{packets / seconds:>10.0f}", file=out)
+
+
+if __name__ == "__main__":
+    main()
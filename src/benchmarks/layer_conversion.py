@@ -0,0 +1,84 @@
+"""Measure how fast the data of parsed layers is converted, by preprocess_data and by the
+converters of the layer configurations.
+
+Run from the repository root, for example:
+
+    PYTHONPATH=src python3 -m benchmarks.layer_conversion assets/example.pcapng --repeat 5
+"""
+import sys
+import time
+from typing import Callable
+
+from benchmarks.parse_rate import parse_arguments
+from components.layer import Layer
+from layers.layer_config import LayerConfig
+from packet_parser.pcap_parser import PcapParser
+from utils.utils import preprocess_data
+
+
+def collect_configs(filename: str) -> list[LayerConfig]:
+    """Parse a capture and keep the configuration each layer was built from.
+
+    Args:
+        filename (str): path to the pcap file
+
+    Returns:
+        list[LayerConfig]: configurations of the layers
+    """
+    configs = []
+    init = Layer.__init__
+
+    def record(layer: Layer, config: LayerConfig, size_total: int, size_payload: int) -> None:
+        configs.append(config)
+        init(layer, config, size_total, size_payload)
+
+    Layer.__init__ = record
+    try:
+        PcapParser(log_dir=None).parse_pcap(filename)
+    finally:
+        Layer.__init__ = init
+    return configs
+
+
+def measure(configs: list[LayerConfig], convert: Callable[[LayerConfig], dict],
+            repeat: int) -> float:
+    """Convert the data of each configuration repeatedly and keep the fastest run.
+
+    Args:
+        configs (list[LayerConfig]): configurations of the layers
+        convert (Callable[[LayerConfig], dict]): conversion of one configuration
+        repeat (int): number of runs
+
+    Returns:
+        float: seconds of the fastest run
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for config in configs:
+            convert(config)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Print the conversion time per layer of each capture, and check that both agree."""
+    args = parse_arguments(__doc__.splitlines()[0])
+
+    # config sends stdout to the application log
+    out = sys.__stdout__
+    print(f"{'file':<32} {'layers':>8} {'preprocess ns':>14} {'converter ns':>13} {'speedup':>8}"
+          f" {'same':>5}", file=out)
+    for filename in args.files:
+        configs = collect_configs(filename)
+        generic = measure(configs, lambda config: preprocess_data(config.data), args.repeat)
+        compiled = measure(configs, lambda config: config.converter(config.data), args.repeat)
+        same = all(config.converter(config.data) == preprocess_data(config.data)
+                   for config in configs)
+        print(f"{filename:<32} {len(configs):>8} {generic / len(configs) * 1e9:>14.0f}"
+              f" {compiled / len(configs) * 1e9:>13.0f} {generic / compiled:>7.1f}x"
+              f" {str(same):>5}", file=out)
+
+
+if __name__ == "__main__":
+    main()
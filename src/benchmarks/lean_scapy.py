@@ -0,0 +1,58 @@
+"""Measure the import time of the parser and the dissection time per packet, with the lean Scapy
+mode off and on.
+
+Run from the repository root, for example:
+
+    PYTHONPATH=src python3 -m benchmarks.lean_scapy assets/example.pcapng --repeat 5
+"""
+import os
+import subprocess
+import sys
+
+from benchmarks.parse_rate import measure, parse_arguments
+from packet_parser import lean_scapy
+
+
+def measure_import(lean: bool, repeat: int) -> float:
+    """Import the parser in a fresh interpreter repeatedly and keep the fastest run.
+
+    Args:
+        lean (bool): value of SCAPY_LEAN
+        repeat (int): number of runs
+
+    Returns:
+        float: seconds of the fastest import
+    """
+    code = "import time; start = time.perf_counter(); import packet_parser.pcap_parser; " \
+        "print(time.perf_counter() - start, file=sys.__stdout__)"
+    environment = dict(os.environ, SCAPY_LEAN=str(lean).lower())
+    return min(float(subprocess.run(
+        [sys.executable, "-c", f"import sys; {code}"], env=environment, check=True,
+        capture_output=True, text=True).stdout) for _ in range(repeat))
+
+
+def main() -> None:
+    """Print the import time, and the time per packet of each capture parsed with Scapy."""
+    args = parse_arguments(__doc__.splitlines()[0])
+
+    # config sends stdout to the application log
+    out = sys.__stdout__
+    for lean in (False, True):
+        mode = "lean" if lean else "full"
+        print(f"import {mode:<4} {measure_import(lean, args.repeat) * 1000:>8.1f} ms", file=out)
+    print(f"{'file':<32} {'mode':<4} {'packets':>8} {'us/packet':>10}", file=out)
+    for filename in args.files:
+        for lean in (False, True):
+            if lean:
+                lean_scapy.enable()
+            else:
+                lean_scapy.disable()
+            packets, seconds = measure(filename, False, args.repeat)
+            mode = "lean" if lean else "full"
+            print(f"{filename:<32} {mode:<4} {packets:>8} {seconds / packets * 1e6:>10.1f}",
+                  file=out)
+    lean_scapy.disable()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Measure the memory held by each parsed packet, and by its id in the DataFrame index.
+
+Run from the repository root, for example:
+
+    PYTHONPATH=src python3 -m benchmarks.packet_memory assets/example.pcapng
+"""
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.parse_rate import parse_arguments
+from packet_parser.batch_ingest import packets_to_frame
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.pcap_reader import RecordReader
+
+
+def measure(filename: str) -> tuple[int, float, float]:
+    """Parse the records of a capture and measure the memory the parsed packets hold on to.
+
+    Memory allocated while parsing and freed afterwards is not counted, neither are the records.
+
+    Args:
+        filename (str): path to the pcap file
+
+    Returns:
+        tuple[int, float, float]: number of packets, bytes per parsed packet, bytes per id in the
+            index of the flattened packets
+    """
+    with open(filename, "rb") as file:
+        records = list(RecordReader(file))
+    parser = PcapParser(log_dir=None)
+    parser.parse_records(records[:1])  # caches and lazy imports are left out
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed_packets = parser.parse_records(records)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    index = packets_to_frame([parsed_packets]).index
+    return len(parsed_packets), held / len(parsed_packets), \
+        index.memory_usage(deep=True) / len(index)
+
+
+def main() -> None:
+    """Print the memory per packet of each capture."""
+    args = parse_arguments(__doc__.splitlines()[0])
+
+    # config sends stdout to the application log
+    out = sys.__stdout__
+    print(f"{'file':<32} {'packets':>8} {'bytes/packet':>13} {'index bytes/packet':>19}", file=out)
+    for filename in args.files:
+        packets, per_packet, per_id = measure(filename)
+        print(f"{filename:<32} {packets:>8} {per_packet:>13.0f} {per_id:>19.1f}", file=out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure how many packets per second PcapParser parses.
+
+Run from the repository root, for example:
+
+    PYTHONPATH=src python3 -m benchmarks.parse_rate assets/example.pcapng --repeat 5
+"""
+import argparse
+import sys
+import time
+
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.pcap_reader import RecordReader
+
+
+def measure(filename: str, fast_path: bool, repeat: int) -> tuple[int, float]:
+    """Parse the records of a capture repeatedly and keep the fastest run.
+
+    The records are read into memory first, so the file system is left out of the measurement.
+
+    Args:
+        filename (str): path to the pcap file
+        fast_path (bool): passed to PcapParser
+        repeat (int): number of runs
+
+    Returns:
+        tuple[int, float]: number of packets, seconds of the fastest run
+    """
+    with open(filename, "rb") as file:
+        records = list(RecordReader(file))
+    best = float("inf")
+    for _ in range(repeat):
+        parser = PcapParser(fast_path, log_dir=None)
+        start = time.perf_counter()
+        parser.parse_records(records)
+        best = min(best, time.perf_counter() - start)
+    return len(records), best
+
+
+def parse_arguments(description: str) -> argparse.Namespace:
+    """Read the capture files and the number of runs from the command line.
+
+    Args:
+        description (str): description of the benchmark
+
+    Returns:
+        argparse.Namespace: files and repeat
+    """
+    argument_parser = argparse.ArgumentParser(description=description)
+    argument_parser.add_argument("files", nargs="+", help="pcap or pcapng files")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="runs per measurement")
+    return argument_parser.parse_args()
+
+
+def main() -> None:
+    """Print the parse rate of each capture, with and without the fast path."""
+    args = parse_arguments(__doc__.splitlines()[0])
+
+    # config sends stdout to the application log
+    out = sys.__stdout__
+    print(f"{'file':<32} {'path':<6} {'packets':>8} {'seconds':>8} {'packets/s':>10}", file=out)
+    for filename in args.files:
+        for fast_path in (False, True):
+            packets, seconds = measure(filename, fast_path, args.repeat)
+            path = "fast" if fast_path else "scapy"
+            print(f"{filename:<32} {path:<6} {packets:>8} {seconds:>8.3f} "
+                  f"{packets / seconds:>10.0f}", file=out)
+
+
+if __name__ == "__main__":
+    main()
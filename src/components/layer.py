@@ -2,13 +2,15 @@ from typing import Self
 import json
 
 from layers.layer_config import LayerConfig
-from utils.utils import preprocess_data, JSONEncoder
+from utils.utils import JSONEncoder
 
 
 class Layer:
     """Stores a single network layer of a packet.
     """
 
+    __slots__ = ("size_total", "size_payload", "layer_name", "data")
+
     def __init__(self, config: LayerConfig, size_total: int, size_payload: int) -> None:
         """Initializes the layer with provided configuration and size information.
 
@@ -20,7 +22,7 @@ class Layer:
         self.size_total = size_total
         self.size_payload = size_payload
         self.layer_name = config.layer_name
-        self.data = preprocess_data(config.data)
+        self.data = config.converter(config.data)
 
     def __str__(self) -> str:
         """Get the string representation of this layer.
@@ -28,9 +30,7 @@ class Layer:
         Returns:
             str: name, size and other details
         """
-        data = json.dumps(self.data, cls=JSONEncoder, indent=4)
-        return f"name = {self.layer_name}\n" + f"size_total = {self.size_total}\n" + \
-            f"size_payload = {self.size_payload}\n" + f"data = {data}\n"
+        return format_layer(self.layer_name, self.size_total, self.size_payload, self.data)
 
     def __eq__(self, value: Self) -> bool:
         """Check if this layer equals another layer.
@@ -47,3 +47,20 @@ class Layer:
             self.data == value.data and \
             self.size_total == value.size_total and \
             self.size_payload == value.size_payload
+
+
+def format_layer(layer_name: str, size_total: int, size_payload: int, data: dict) -> str:
+    """Format the details of a layer, see Layer.__str__.
+
+    Args:
+        layer_name (str): name of the layer
+        size_total (int): total size of the layer in bytes
+        size_payload (int): size of the layer's payload in bytes
+        data (dict): fields of the layer
+
+    Returns:
+        str: name, size and other details
+    """
+    data = json.dumps(data, cls=JSONEncoder, indent=4)
+    return f"name = {layer_name}\n" + f"size_total = {size_total}\n" + \
+        f"size_payload = {size_payload}\n" + f"data = {data}\n"
@@ -1,19 +1,62 @@
-from datetime import datetime
 from typing import Self
-from uuid import uuid4
 
+import numpy as np
+import pandas as pd
+
+from components.layer import format_layer
+from layers.layer_level import LayerLevel
 from utils.utils import flatten_dict
 
 
+# a packet id holds the capture id in the high bits and the packet number in the low bits
+PACKET_NUMBER_BITS = 32
+
+
+def make_packet_id(capture_id: int | np.ndarray, packet_number: int | np.ndarray) -> int:
+    """Combine the id of a capture and the number of a packet in it into an int64 packet id.
+
+    Args:
+        capture_id (int | np.ndarray): capture id, below 2**31
+        packet_number (int | np.ndarray): packet number, below 2**32
+
+    Returns:
+        int: packet id, or an array of them
+    """
+    return capture_id << PACKET_NUMBER_BITS | packet_number
+
+
+def split_packet_id(packet_id: int | np.ndarray) -> tuple[int, int]:
+    """Split packet ids back into capture ids and packet numbers, see make_packet_id.
+
+    Args:
+        packet_id (int | np.ndarray): packet id, or an array of them
+
+    Returns:
+        tuple[int, int]: capture id, packet number
+    """
+    return packet_id >> PACKET_NUMBER_BITS, packet_id & ((1 << PACKET_NUMBER_BITS) - 1)
+
+
 class Packet:
-    """Stores a single network packet, containing all its different layers."""
+    """Stores a single network packet, containing all its different layers.
+
+    The packet id is unique among the packets of a capture. Context gives each capture its own
+    capture id, which makes the ids unique in the application context. The time is in
+    nanoseconds since the epoch, as in the record header.
+    """
 
-    def __init__(self, time: datetime, size: int, packet_number: int) -> None:
-        self.packet_uid = uuid4()
+    __slots__ = ("packet_id", "time", "size", "layers", "packet_number", "sample_rate",
+                 "sample_mode")
+
+    def __init__(self, time: int, size: int, packet_number: int,
+                 capture_id: int = 0) -> None:
+        self.packet_id = make_packet_id(capture_id, packet_number)
         self.time = time
         self.size = size
         self.layers = {}
         self.packet_number = packet_number
+        self.sample_rate = 1
+        self.sample_mode = None
 
     def flatten(self) -> dict:
         """Flatten the packet into dictionary with max depth 1.
@@ -24,19 +67,26 @@ class Packet:
         For example source IP address on network layer will be assigned a key:
         NETWORK.IP.data.src_addr
 
+        A sampled packet also gets packet.sample_rate and packet.sample_mode, see Sampler.
+
         Returns:
             dict: flattened packet
         """
         d = {
-            "packet.uid": self.packet_uid,
+            "packet.id": self.packet_id,
             "packet.time": self.time,
             "packet.size": self.size,
         }
+        if self.sample_rate > 1:
+            d["packet.sample_rate"] = self.sample_rate
+            d["packet.sample_mode"] = self.sample_mode
         for layer_type, layer in self.layers.items():
-            contents = layer.__dict__.copy()
-            contents[f"{layer.layer_name}.data"] = contents["data"]
-            del contents["data"]
-            d.update({f"{layer_type}": contents})
+            d[f"{layer_type}"] = {
+                "size_total": layer.size_total,
+                "size_payload": layer.size_payload,
+                "layer_name": layer.layer_name,
+                f"{layer.layer_name}.data": layer.data
+            }
         return flatten_dict(d)
 
     def __str__(self) -> str:
@@ -45,13 +95,8 @@ class Packet:
         Returns:
             str: details of the packet and all its layers.
         """
-        out = f"number = {self.packet_number}\n" + \
-            f"time = {self.time}\n" + f"size = {self.size}\n\n"
-        for layer_type, layer in self.layers.items():
-            out += f"{layer_type}\n"
-            out += f"{layer}\n"
-
-        return f"### PACKET START ###\n{out.strip()}\n### PACKET END ###\n"
+        return format_packet(self.packet_number, pd.Timestamp(self.time, tz="UTC"), self.size,
+                             {layer_type: str(layer) for layer_type, layer in self.layers.items()})
 
     def __eq__(self, value: Self) -> bool:
         """Check if a packet equals another packet.
@@ -64,6 +109,93 @@ class Packet:
         """
         if not isinstance(value, Packet):
             return False
-        return self.time == value.time and \
+        return self.packet_id == value.packet_id and \
+            self.time == value.time and \
             self.size == value.size and \
             self.layers == value.layers
+
+
+def format_packet(packet_number: int, time: pd.Timestamp, size: int,
+                  layers: dict[str, str]) -> str:
+    """Format the details of a packet, see Packet.__str__.
+
+    Args:
+        packet_number (int): number of the packet in its capture
+        time (pd.Timestamp): time of the packet
+        size (int): size of the packet in bytes
+        layers (dict[str, str]): details of each layer, by layer level
+
+    Returns:
+        str: details of the packet and all its layers
+    """
+    out = f"number = {packet_number}\n" + f"time = {time}\n" + f"size = {size}\n\n"
+    for layer_type, layer in layers.items():
+        out += f"{layer_type}\n"
+        out += f"{layer}\n"
+    return f"### PACKET START ###\n{out.strip()}\n### PACKET END ###\n"
+
+
+def format_details(rows: pd.DataFrame) -> str:
+    """Format the details of flattened packets from their columns, like Packet.__str__ does.
+
+    The details are not stored with the packets, they are formatted when the packets are viewed.
+    Nested fields that were flattened, like the answers of DNS, are nested again, see _nest.
+
+    Args:
+        rows (pd.DataFrame): flattened packets, indexed by packet id
+
+    Returns:
+        str: details of the packets, one after another
+    """
+    _, packet_numbers = split_packet_id(rows.index.to_numpy())
+    layer_columns = {}
+    for column in rows:
+        layer_type, _, field = column.partition(".")
+        layer_name, data, key = field.partition(".data.")
+        if layer_type in LayerLevel.__members__ and data:
+            layer_columns.setdefault((layer_type, layer_name), []).append((column, key))
+    details = []
+    for packet_number, row in zip(packet_numbers, rows.to_dict("records")):
+        layers = {}
+        for layer_type in LayerLevel:
+            layer_name = _plain(row.get(f"{layer_type}.layer_name"))
+            if layer_name is None:
+                continue
+            data = _nest({key: _plain(row[column])
+                          for column, key in layer_columns.get((layer_type, layer_name), [])})
+            layers[layer_type] = format_layer(layer_name, _plain(row[f"{layer_type}.size_total"]),
+                                              _plain(row[f"{layer_type}.size_payload"]), data)
+        details.append(format_packet(packet_number, row["packet.time"], row["packet.size"],
+                                     layers))
+    return "\n".join(details)
+
+
+def _nest(data: dict) -> dict:
+    # undoes flatten_dict one level down: a list of dicts was flattened into a list per key, and
+    # a dict into a key per item. Missing flattened keys belong to other packets and are left out.
+    nested = {}
+    for key, value in data.items():
+        parent, dot, sub = key.partition(".")
+        if not dot:
+            if value is not None or key not in nested:
+                nested[key] = value
+        elif isinstance(value, list):
+            items = nested.get(parent)
+            if not isinstance(items, list):
+                items = nested[parent] = [{} for _ in value]
+            for item, item_value in zip(items, value):
+                item[sub] = item_value
+        elif value is not None:
+            if not isinstance(nested.get(parent), dict):
+                nested[parent] = {}
+            nested[parent][sub] = value
+    return nested
+
+
+def _plain(value):
+    # a value of a DataFrame as a plain Python value, None if it is missing
+    if isinstance(value, (list, dict)):
+        return value
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
@@ -46,4 +46,17 @@ configure_logging()
 load_dotenv()  # handles searching for .env file and gracefully handles if it doesn't exist
 DB_PATH = os.getenv("DB_PATH", "database.db")
 TIMEOUT_SECONDS = int(os.getenv("TIMEOUT_SECONDS", "30"))
-FILESIZE_LIMIT_BYTES = int(os.getenv("FILESIZE_LIMIT_BYTES", "100000000"))  # 100 MB
+CHECKSUM_POLICY = os.getenv("CHECKSUM_POLICY", "full")  # full, sampled or off
+CHECKSUM_SAMPLE_RATE = int(os.getenv("CHECKSUM_SAMPLE_RATE", "100"))  # 1-in-N with "sampled"
+FILESIZE_LIMIT_BYTES = int(os.getenv("FILESIZE_LIMIT_BYTES", "0"))  # 0 disables the limit
+PARSE_BATCH_SIZE = int(os.getenv("PARSE_BATCH_SIZE", "10000"))  # packets held in memory at once
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))  # >1 parses a file in a process pool
+FOLLOW_INTERVAL_SECONDS = float(os.getenv("FOLLOW_INTERVAL_SECONDS", "2"))  # between follow polls
+DETAILS_PAGE_SIZE = int(os.getenv("DETAILS_PAGE_SIZE", "100"))  # packets per details page
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "cache")
+PARSE_CACHE_LIMIT_BYTES = int(os.getenv("PARSE_CACHE_LIMIT_BYTES", "500000000"))  # 0 disables
+PARSER_LOG_VERBOSE_LIMIT = int(os.getenv("PARSER_LOG_VERBOSE_LIMIT", "100"))  # packet dumps per log
+PARSE_MAX_LAYER = os.getenv("PARSE_MAX_LAYER", "APPLICATION")  # levels after it are left RAW
+PARSE_PROTOCOLS = [protocol.strip() for protocol in os.getenv("PARSE_PROTOCOLS", "").split(",")
+                   if protocol.strip()] or None  # comma-separated, empty dissects all protocols
+SCAPY_LEAN = os.getenv("SCAPY_LEAN", "false").lower() == "true"  # unbind layers not parsed
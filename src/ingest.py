@@ -0,0 +1,71 @@
+"""Parse a directory or glob of captures in parallel and save them, merged by time, to a slot.
+
+Run from the repository root, for example:
+
+    python3 src/ingest.py incident/ --slot incident --workers 8
+
+With --sample 100, only one packet in a hundred is parsed, or one flow with --sample-by flow.
+
+The saved analysis can then be loaded in the application.
+"""
+import argparse
+import os
+import sys
+
+from main import Context
+from packet_parser.batch_ingest import FileResult, find_captures
+from packet_parser.sampler import Sampler, SAMPLING_MODES
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Read the command line arguments.
+
+    Returns:
+        argparse.Namespace: source, slot, workers, sample and sample_by
+    """
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument("source", help="directory of pcap or pcapng files, or a glob")
+    argument_parser.add_argument("--slot", required=True, help="name of the save slot")
+    argument_parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                                 help="worker processes, defaults to the number of CPUs")
+    argument_parser.add_argument("--sample", type=int, default=1, metavar="N",
+                                 help="keep one packet or flow in N, the analysis gives estimates")
+    argument_parser.add_argument("--sample-by", choices=SAMPLING_MODES, default="packet",
+                                 help="sample packets, or whole flows in both directions")
+    return argument_parser.parse_args()
+
+
+def main() -> int:
+    """Ingest the captures and print the progress of each file.
+
+    Returns:
+        int: exit status, 1 if no file could be parsed
+    """
+    args = parse_arguments()
+
+    # config sends stdout to the application log
+    out = sys.__stdout__
+    file_paths = find_captures(args.source)
+    if not file_paths:
+        print(f"No capture files found: {args.source}", file=out)
+        return 1
+
+    def progress(result: FileResult, done: int, total: int) -> None:
+        status = f"failed, {result.error}" if result.error else f"{result.packets} packets"
+        print(f"[{done}/{total}] {result.path}: {status}", file=out, flush=True)
+
+    context = Context()
+    sampler = Sampler(args.sample, args.sample_by) if args.sample > 1 else None
+    results = context.append_many(file_paths, args.workers, progress, sampler)
+    failed = [result for result in results if result.error]
+    print(f"{len(context)} packets from {len(results) - len(failed)} files, "
+          f"{len(failed)} failed", file=out)
+    if len(failed) == len(results):
+        return 1
+    context.save(args.slot)
+    print(f"Saved to slot: {args.slot}", file=out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
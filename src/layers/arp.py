@@ -74,6 +74,7 @@ class ARP(LayerConfig):
     layer_type = LayerLevel.NETWORK
     layer_name = "ARP"
     data: dict[str, Any]
+    fields = {"hwsrc": str, "hwdst": str, "psrc": str, "pdst": str}
     dtypes = {
         "hwtype": HardwareType,
         "opcode": ARPOpCode
@@ -34,6 +34,18 @@ class DHCP(LayerConfig):
     layer_type = LayerLevel.APPLICATION
     layer_name = "DHCP"
     data: dict[str, Any]
+    fields = {
+        "transaction_id": int,
+        "client_ip_current": str,
+        "client_ip_assigned": str,
+        "client_mac": str,
+        "client_hostname": bytes,
+        "server_ip": str,
+        "server_hostname": bytes,
+        "domain": bytes,
+        "name_server": object,  # one address or a list of them
+        "router": object
+    }
     dtypes = {
         "operation": BOOTPOpCode,
         "message_type": DHCPMessageType
@@ -130,6 +130,7 @@ class DNS(LayerConfig):
     layer_type = LayerLevel.APPLICATION
     layer_name = "DNS"
     data: dict[str, Any]
+    fields = {"transaction_id": int, "qname": bytes, "answers": list}
     dtypes = {
         "direction": DNSDir,
         "opcode": DNSOpCode,
@@ -245,6 +245,7 @@ class ICMP(LayerConfig):
     layer_type = LayerLevel.TRANSPORT
     layer_name = "ICMP"
     data: dict[str, Any]
+    fields = {"seq": int, "identifier": int, "checksum_valid": bool}
     dtypes = {
         "icmp_type_v4": ICMPType,
         "icmp_code_v4": ICMPCode,
@@ -260,7 +261,7 @@ class ICMP(LayerConfig):
             icmp_code: ICMPCode | ICMPv6Code,
             seq: int | None,
             identifier: int | None,
-            checksum_valid: bool) -> None:
+            checksum_valid: bool | None) -> None:
         """Initializes ICMP configuration object with provided details.
 
         Args:
@@ -269,7 +270,8 @@ class ICMP(LayerConfig):
             icmp_code (ICMPCode | ICMPv6Code): Low level category
             seq (int | None): Sequence number
             identifier (int | None): Identifier number
-            checksum_valid (bool): True if checksum is valid, False otherwise
+            checksum_valid (bool | None): True if checksum is valid, False otherwise,
+                None if it was not checked
         """
 
         self.data = {
@@ -1,3 +1,4 @@
+import socket
 from typing import Any
 
 from layers.layer_config import LayerConfig
@@ -13,12 +14,43 @@ class IPVersion(EnumProperty):
     IPV6 = 6
 
 
+# the addresses as numbers: IPv4 as one uint32, IPv6 as its high and low uint64 halves
+PACKED_DTYPES = {
+    "src_addr_v4": "UInt32",
+    "dst_addr_v4": "UInt32",
+    "src_addr_v6_hi": "UInt64",
+    "src_addr_v6_lo": "UInt64",
+    "dst_addr_v6_hi": "UInt64",
+    "dst_addr_v6_lo": "UInt64"
+}
+
+
+def pack_address(address: bytes) -> dict[str, int]:
+    """Split the bytes of an address into the numbers of PACKED_DTYPES.
+
+    Args:
+        address (bytes): 4 bytes of an IPv4 or 16 bytes of an IPv6 address
+
+    Returns:
+        dict[str, int]: "v4", or "v6_hi" and "v6_lo", and their numbers
+    """
+    if len(address) == 4:
+        return {"v4": int.from_bytes(address)}
+    return {"v6_hi": int.from_bytes(address[:8]), "v6_lo": int.from_bytes(address[8:])}
+
+
 class IP(LayerConfig):
-    """Configuration for IP layer."""
+    """Configuration for IP layer.
+
+    The addresses are kept as text, and as numbers for subnet matching, see PACKED_DTYPES and
+    analyzer.addresses.
+    """
 
     layer_type = LayerLevel.NETWORK
     layer_name = "IP"
     data: dict[str, Any]
+    fields = {"src_addr": str, "dst_addr": str, "checksum_valid": bool,
+              **{key: int for key in PACKED_DTYPES}}
     dtypes = {
         "version": IPVersion
     }
@@ -28,14 +60,21 @@ class IP(LayerConfig):
             version: IPVersion,
             src_addr: str,
             dst_addr: str,
-            checksum_valid: bool | None) -> None:
+            checksum_valid: bool | None,
+            src_packed: bytes | None = None,
+            dst_packed: bytes | None = None) -> None:
         """Initializes IP configuration object with provided details.
 
         Args:
             version (IPVersion): either v4 or v6
             src_addr (str): source address
             dst_addr (str): destination address
-            checksum_valid (bool | None): True if checksum is valid, False otherwise (only for v4).
+            checksum_valid (bool | None): True if checksum is valid, False otherwise. None for v6
+                and if it was not checked.
+            src_packed (bytes | None, optional): source address as in the header, None packs
+                src_addr. Defaults to None.
+            dst_packed (bytes | None, optional): destination address as in the header, None
+                packs dst_addr. Defaults to None.
         """
 
         self.data = {
@@ -44,3 +83,10 @@ class IP(LayerConfig):
             "version": version,
             "checksum_valid": checksum_valid
         }
+        family = socket.AF_INET if version == IPVersion.IPV4 else socket.AF_INET6
+        for direction, address, packed in [("src", src_addr, src_packed),
+                                           ("dst", dst_addr, dst_packed)]:
+            if packed is None:
+                packed = socket.inet_pton(family, address)
+            for key, value in pack_address(packed).items():
+                self.data[f"{direction}_addr_{key}"] = value
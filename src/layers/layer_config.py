@@ -1,15 +1,26 @@
 from abc import ABC, abstractmethod
 
 from layers.layer_level import LayerLevel
+from utils.utils import FieldConverter
 
 
 class LayerConfig(ABC):
-    """Base class for layer configuration objects."""
+    """Base class for layer configuration objects.
+
+    Each configuration declares the type of each field of its data in fields, the enum fields in
+    dtypes. The converter of the data is built from them once per class, see FieldConverter.
+    """
 
     layer_type: LayerLevel
     layer_name: str
     data: str
+    fields: dict[str, type] = {}
     dtypes: dict[str, type]
+    converter: FieldConverter
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.converter = FieldConverter({**cls.fields, **cls.dtypes})
 
     @abstractmethod
     def __init__(self) -> None:
@@ -25,6 +25,7 @@ class SLL(LayerConfig):
     layer_type = LayerLevel.LINK
     layer_name = "SLL"
     data: dict[str, Any]
+    fields = {"src_addr": str, "protocol_type": str}
     dtypes = {
         "packet_type": CookedPacketType
     }
@@ -10,14 +10,16 @@ class TCP(LayerConfig):
     layer_type = LayerLevel.TRANSPORT
     layer_name = "TCP"
     data: dict[str, Any]
+    fields = {"src_port": int, "dst_port": int, "checksum_valid": bool}
     dtypes = {}
 
-    def __init__(self, src_port: int, dst_port: int, checksum_valid: bool) -> None:
+    def __init__(self, src_port: int, dst_port: int, checksum_valid: bool | None) -> None:
         """Initializes TCP configuration object with provided details.
 
         Args:
             src_port (int): source port
             dst_port (int): destination port
-            checksum_valid (bool): True if checksum is valid, False otherwise
+            checksum_valid (bool | None): True if checksum is valid, False otherwise,
+                None if it was not checked
         """
         self.data = {"src_port": src_port, "dst_port": dst_port, "checksum_valid": checksum_valid}
@@ -1,30 +1,68 @@
+from itertools import batched
+from typing import Callable, Iterable
+
 import pandas as pd
 
 import config
 from packet_parser.pcap_parser import PcapParser
+from packet_parser.follower import CaptureFollower
+from packet_parser.batch_ingest import (
+    FileResult, packets_to_frame, parse_file, parse_files, merge_by_time)
+from packet_parser.record_filter import RecordFilter
 from analyzer.dns_analyzer import DNSAnalyzer
 from analyzer.dhcp_analyzer import DHCPAnalyzer
 from analyzer.base_analyzer import BaseAnalyzer
+from analyzer.summary import Summary, DNSSummary, DHCPSummary, IncrementalSummary
 from ui import ui
 from ui.figure_config import FigureConfig
-from utils.utils import scale_bits, convert_to_bits
+from utils.utils import scale_bits, convert_to_bits, BIT_UNITS
 from storage.database import DBStorage
+from storage.chunks import Chunks
+from storage.parse_cache import ParseCache
 from layers.layer_level import LayerLevel
+from components.packet import make_packet_id, split_packet_id, format_details
 
 
 pd.set_option('future.no_silent_downcasting', True)
+# frames taken from the packets share their memory until either one is written, see Context.view
+pd.set_option('mode.copy_on_write', True)
 
 
-class Context:
+class Context:  # pylint: disable=too-many-instance-attributes
     """Holds the context of the application and provides methods for interacting with the
-    storage backend."""
+    storage backend.
+
+    The packets are kept in chunks, see Chunks, so adding a file does not touch the packets
+    already in the context.
+    """
 
     def __init__(self, reset_db=False) -> None:
-        self.df = pd.DataFrame()
+        self.packets = Chunks()
+        self.summaries = IncrementalSummary()
         self.storage = DBStorage(config.DB_PATH, reset=reset_db)
+        self.parse_cache = ParseCache()
+        self.follower = None
+        self.follow_parser = None
+        # capture ids handed out, and those of the followed files by their id in the follower
+        self.captures = 0
+        self.follow_captures = {}
 
     def __len__(self):
-        return len(self.df)
+        return len(self.packets)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """All the packets, the chunks concatenated once after each change.
+
+        Returns:
+            pd.DataFrame: Pandas DataFrame with packets
+        """
+        return self.packets.frame()
+
+    @df.setter
+    def df(self, df: pd.DataFrame) -> None:
+        # an adjusted DataFrame replaces the chunks
+        self.packets = Chunks(df)
 
     def get_df(self) -> pd.DataFrame:
         """Get the DataFrame, which holds all the packets.
@@ -37,12 +75,54 @@ class Context:
         """
         return self.df.copy()
 
+    def details(self, start: int, count: int) -> str:
+        """Format the details of some of the packets, see format_details.
+
+        Args:
+            start (int): position of the first packet
+            count (int): number of packets
+
+        Returns:
+            str: details of the packets
+        """
+        return format_details(self.packets.rows(start, count))
+
+    def summary(self) -> Summary | None:
+        """Get the summary of the packets, see Summary. Only the chunks added since the previous
+        call are summarized.
+
+        Returns:
+            Summary | None: summary of the packets, None if there are none, or if some were
+                sampled in the "flow" mode
+        """
+        return self.summaries.update(self.packets.chunks)
+
+    def view(self, columns: Iterable[str] | None = None) -> pd.DataFrame:
+        """Get a snapshot of the packets for reading, like analyzers do.
+
+        Unlike get_df, the snapshot is not a copy: it shares the memory of the columns with the
+        context. Writing to it copies the written data first (pandas copy-on-write), so the
+        context never changes through it.
+
+        Args:
+            columns (Iterable[str] | None, optional): columns to include, those that the packets
+                do not have are left out. None includes all of them. Defaults to None.
+
+        Returns:
+            pd.DataFrame: packets, one per row
+        """
+        if columns is None:
+            return self.df[:]
+        return self.df[[column for column in dict.fromkeys(columns) if column in self.df]]
+
     def reset(self) -> None:
-        """Clears the application context.
+        """Clears the application context and stops following captures.
 
         Database is left untouched.
         """
         self.df = pd.DataFrame()
+        self.captures = 0
+        self.unfollow()
 
     def save(self, name: str) -> None:
         """The current application context is saved to the storage backend.
@@ -59,6 +139,8 @@ class Context:
             name (str): name of the save slot
         """
         self.df = self.storage.load(name)
+        capture_ids, _ = split_packet_id(self.df.index.to_numpy())
+        self.captures = int(capture_ids.max()) + 1 if len(capture_ids) else 0
 
     def list_slots(self) -> list[str]:
         """Lists all available save slots.
@@ -76,29 +158,147 @@ class Context:
         """
         self.storage.del_slot(name)
 
-    def append(self, file_path: str) -> None:
+    def append(self, file_path: str, record_filter: RecordFilter | None = None) -> None:
         """Parse the pcap file and append the packets to the application context.
 
+        The file is parsed in batches of config.PARSE_BATCH_SIZE packets, so only one batch of
+        parsed packets is held in memory at a time. With config.PARSE_WORKERS above one, the file
+        is parsed in that many worker processes.
+
+        A file that has been parsed before, by the same version of the parser, is loaded from the
+        parse cache instead. Filtered files are always parsed. Either way, the file gets a new
+        capture id, which makes the ids of its packets unique in the context.
+
         Args:
             file_path (str): location of the pcap file
+            record_filter (RecordFilter | None, optional): selects the packets to parse, the
+                others are skipped before they are dissected. A Sampler keeps a sample of them,
+                and the analysis then gives estimates. Defaults to None.
         """
-        parsed_packets = PcapParser().parse_pcap(file_path)
+        cache_key = self._cache_key(file_path) if record_filter is None else None
+        df = self._load_cached(cache_key)
+        if df is None:
+            df = parse_file(file_path, record_filter=record_filter)
+            if df is None:
+                return
+            if cache_key:
+                self.parse_cache.put(cache_key, df)
+        self.packets.append(self._assign_captures(df, {}))
+
+    def append_many(self, file_paths: list[str], workers: int = 1,
+                    progress: Callable[[FileResult, int, int], None] | None = None,
+                    record_filter: RecordFilter | None = None) -> list[FileResult]:
+        """Parse several pcap files in parallel and append their packets to the application
+        context, merged into one dataset ordered by packet.time.
+
+        Files found in the parse cache are not parsed again, unless they are filtered. A file that
+        cannot be parsed is reported in the results and left out, the other files are appended all
+        the same.
+
+        Args:
+            file_paths (list[str]): locations of the pcap files
+            workers (int, optional): number of worker processes, see parse_files. Defaults to 1.
+            progress (Callable[[FileResult, int, int], None] | None, optional): called as each
+                file is finished, see parse_files. Defaults to None.
+            record_filter (RecordFilter | None, optional): selects the packets to parse, see
+                append. Defaults to None.
 
-        flat_packets = []
-        for packet in parsed_packets:
-            flat_packet = packet.flatten()
-            flat_packet.update({"packet.str": str(packet)})
-            flat_packets.append(flat_packet)
-        df = pd.DataFrame(flat_packets).set_index("packet.uid")
-        self.df = pd.concat([self.df, df])
-        self.df = DBStorage.adjust_dtypes(self.df)
+        Returns:
+            list[FileResult]: results of the files in the order they were given
+        """
+        cache_keys = {file_path: self._cache_key(file_path) if record_filter is None else None
+                      for file_path in file_paths}
+        frames = {}
+        for file_path in file_paths:
+            df = self._load_cached(cache_keys[file_path])
+            if df is not None:
+                frames[file_path] = df
+                if progress:
+                    progress(FileResult(file_path, len(df)), len(frames), len(file_paths))
+
+        def report(result: FileResult, done: int, _total: int) -> None:
+            if progress:
+                progress(result, len(frames) + done, len(file_paths))
+
+        todo = [file_path for file_path in file_paths if file_path not in frames]
+        parsed, results = parse_files(todo, workers, progress=report, record_filter=record_filter)
+        for file_path, df in parsed.items():
+            if cache_keys[file_path]:
+                self.parse_cache.put(cache_keys[file_path], df)
+        frames.update(parsed)
+
+        df = merge_by_time([self._assign_captures(frames[file_path], {})
+                            for file_path in file_paths if file_path in frames])
+        if df is not None:
+            self.packets.append(df)
+        results = dict(zip(todo, results))
+        return [results.get(file_path) or FileResult(file_path, len(frames[file_path]))
+                for file_path in file_paths]
+
+    def follow(self, pattern: str) -> None:
+        """Start following capture files that are still being written, see poll.
 
+        Args:
+            pattern (str): glob pattern of the capture files, rotated files included
+        """
+        self.follower = CaptureFollower(pattern)
+        self.follow_parser = PcapParser()
+        self.follow_captures = {}
 
-def _configure_speed_graph(base_analyzer: BaseAnalyzer) -> FigureConfig:
+    def unfollow(self) -> None:
+        """Stop following capture files."""
+        self.follower = None
+        self.follow_parser = None
+
+    def poll(self) -> pd.DataFrame:
+        """Parse the packets appended to the followed capture files since the previous poll and
+        append them to the application context.
+
+        Only the new rows are flattened and adjusted, they are added as a chunk of their own.
+
+        Raises:
+            PcapFormatError: if a followed file is not a pcap or pcapng file
+
+        Returns:
+            pd.DataFrame: the appended rows, empty if there were none
+        """
+        if self.follower is None:
+            return pd.DataFrame()
+        df = packets_to_frame(batched(
+            self.follow_parser.follow(self.follower), config.PARSE_BATCH_SIZE))
+        if df is None:
+            return pd.DataFrame()
+        return self.packets.append(self._assign_captures(df, self.follow_captures))
+
+    def _cache_key(self, file_path: str) -> str | None:
+        if not self.parse_cache.enabled:
+            return None
+        try:
+            return self.parse_cache.key(file_path)
+        except OSError:
+            return None  # the parser reports the error
+
+    def _load_cached(self, cache_key: str | None) -> pd.DataFrame | None:
+        return self.parse_cache.get(cache_key) if cache_key else None
+
+    def _assign_captures(self, df: pd.DataFrame, captures: dict[int, int]) -> pd.DataFrame:
+        # the parser numbers the captures of a file or a follower from 0, they are given the
+        # next free capture ids of the context, remembered in captures
+        capture_ids, packet_numbers = split_packet_id(df.index.to_numpy())
+        for capture_id in pd.unique(capture_ids):
+            if capture_id not in captures:
+                captures[capture_id] = self.captures
+                self.captures += 1
+        capture_ids = pd.Series(capture_ids).map(captures).to_numpy()
+        df.index = pd.Index(make_packet_id(capture_ids, packet_numbers), name=df.index.name)
+        return df
+
+
+def _configure_speed_graph(base_analyzer: BaseAnalyzer | Summary) -> FigureConfig:
     """Configure the speed graph, given already initialized base analyzer.
 
     Args:
-        base_analyzer (BaseAnalyzer): initialized base analyzer
+        base_analyzer (BaseAnalyzer | Summary): initialized base analyzer, or summary
 
     Returns:
         FigureConfig: configuration for the speed graph
@@ -121,14 +321,31 @@ def _configure_speed_graph(base_analyzer: BaseAnalyzer) -> FigureConfig:
         f"Max Speed ({unit_max} per second)",
         "tab:red")
 
+    if base_analyzer.sampled():
+        speed_error = convert_to_bits(base_analyzer.time_series_speed_error(100))
+        speed_config.title = "Traffic speed (estimated from a sample)"
+        speed_config.error1 = speed_error / BIT_UNITS[unit]
+
     return speed_config
 
 
-def _configure_dns_most_queried_domains(dns_analyzer: DNSAnalyzer) -> FigureConfig:
+def _count_label(sampled: bool) -> str:
+    """Get the axis label of counts, which are estimates if the packets were sampled.
+
+    Args:
+        sampled (bool): True if the analyzed packets were sampled
+
+    Returns:
+        str: axis label
+    """
+    return "Estimated count" if sampled else "Count"
+
+
+def _configure_dns_most_queried_domains(dns_analyzer: DNSAnalyzer | DNSSummary) -> FigureConfig:
     """Configure the most queried domains graph, given already initialized DNS analyzer.
 
     Args:
-        dns_analyzer (DNSAnalyzer): initialized DNS analyzer
+        dns_analyzer (DNSAnalyzer | DNSSummary): initialized DNS analyzer, or summary
 
     Returns:
         FigureConfig: configuration for the most queried domains graph
@@ -138,16 +355,17 @@ def _configure_dns_most_queried_domains(dns_analyzer: DNSAnalyzer) -> FigureConf
         "Most Queried Domains",
         dns_most_queried_domains,
         "Domain",
-        "Count",
-        "tab:blue")
+        _count_label(dns_analyzer.sampled()),
+        "tab:blue",
+        error1=dns_analyzer.most_queried_domains_error())
     return dns1_config
 
 
-def _configure_dns_most_common_servers(dns_analyzer: DNSAnalyzer) -> FigureConfig:
+def _configure_dns_most_common_servers(dns_analyzer: DNSAnalyzer | DNSSummary) -> FigureConfig:
     """Configure the most common servers graph, given already initialized DNS analyzer.
 
     Args:
-        dns_analyzer (DNSAnalyzer): initialized DNS analyzer
+        dns_analyzer (DNSAnalyzer | DNSSummary): initialized DNS analyzer, or summary
 
     Returns:
         FigureConfig: configuration for the most common servers graph
@@ -157,16 +375,17 @@ def _configure_dns_most_common_servers(dns_analyzer: DNSAnalyzer) -> FigureConfi
         "Most Common Servers",
         dns_most_common_servers,
         "Server",
-        "Count",
-        "tab:red")
+        _count_label(dns_analyzer.sampled()),
+        "tab:red",
+        error1=dns_analyzer.most_common_servers_error())
     return dns2_config
 
 
-def _configure_dhcp_most_common_clients(dhcp_analyzer: DHCPAnalyzer) -> FigureConfig:
+def _configure_dhcp_most_common_clients(dhcp_analyzer: DHCPAnalyzer | DHCPSummary) -> FigureConfig:
     """Configure the most common clients graph, given already initialized DHCP analyzer.
 
     Args:
-        dhcp_analyzer (DHCPAnalyzer): initialized DHCP analyzer
+        dhcp_analyzer (DHCPAnalyzer | DHCPSummary): initialized DHCP analyzer, or summary
 
     Returns:
         FigureConfig: configuration for the most common clients graph
@@ -176,16 +395,17 @@ def _configure_dhcp_most_common_clients(dhcp_analyzer: DHCPAnalyzer) -> FigureCo
         "Most Common Clients",
         dhcp_most_common_clients,
         "Client",
-        "Count",
-        "tab:green")
+        _count_label(dhcp_analyzer.sampled()),
+        "tab:green",
+        error1=dhcp_analyzer.most_common_clients_error())
     return dhcp_config
 
 
-def _configure_dhcp_most_common_servers(dhcp_analyzer: DHCPAnalyzer) -> FigureConfig:
+def _configure_dhcp_most_common_servers(dhcp_analyzer: DHCPAnalyzer | DHCPSummary) -> FigureConfig:
     """Configure the most common servers graph, given already initialized DHCP analyzer.
 
     Args:
-        dhcp_analyzer (DHCPAnalyzer): initialized DHCP analyzer
+        dhcp_analyzer (DHCPAnalyzer | DHCPSummary): initialized DHCP analyzer, or summary
 
     Returns:
         FigureConfig: configuration for the most common servers graph
@@ -195,16 +415,17 @@ def _configure_dhcp_most_common_servers(dhcp_analyzer: DHCPAnalyzer) -> FigureCo
         "Most Common Servers",
         dhcp_most_common_servers,
         "Server",
-        "Count",
-        "tab:orange")
+        _count_label(dhcp_analyzer.sampled()),
+        "tab:orange",
+        error1=dhcp_analyzer.most_common_servers_error())
     return dhcp_config
 
 
-def _configure_dhcp_most_common_domains(dhcp_analyzer: DHCPAnalyzer) -> FigureConfig:
+def _configure_dhcp_most_common_domains(dhcp_analyzer: DHCPAnalyzer | DHCPSummary) -> FigureConfig:
     """Configure the most common domains graph, given already initialized DHCP analyzer.
 
     Args:
-        dhcp_analyzer (DHCPAnalyzer): initialized DHCP analyzer
+        dhcp_analyzer (DHCPAnalyzer | DHCPSummary): initialized DHCP analyzer, or summary
 
     Returns:
         FigureConfig: configuration for the most common domains graph
@@ -214,28 +435,35 @@ def _configure_dhcp_most_common_domains(dhcp_analyzer: DHCPAnalyzer) -> FigureCo
         "Most Common Domains",
         dhcp_most_common_domains,
         "Domain",
-        "Count",
-        "tab:purple")
+        _count_label(dhcp_analyzer.sampled()),
+        "tab:purple",
+        error1=dhcp_analyzer.most_common_domains_error())
     return dhcp_config
 
 
-def _configure_protocol_distribution(base_analyzer: BaseAnalyzer) -> dict:
+def _configure_protocol_distribution(base_analyzer: BaseAnalyzer | Summary) -> dict:
     """Configure the protocol distribution graph, given already initialized base analyzer.
 
     Args:
-        base_analyzer (BaseAnalyzer): initialized base analyzer
+        base_analyzer (BaseAnalyzer | Summary): initialized base analyzer, or summary
 
     Returns:
         dict: configuration for the protocol distribution graph
     """
     protocol_distribution = base_analyzer.protocol_distribution()
+    errors = base_analyzer.protocol_distribution_error()
     app_config = FigureConfig(
-        "Application", protocol_distribution[LayerLevel.APPLICATION], None, None, None)
+        "Application", protocol_distribution[LayerLevel.APPLICATION], None, None, None,
+        error1=errors[LayerLevel.APPLICATION])
     transport_config = FigureConfig(
-        "Transport", protocol_distribution[LayerLevel.TRANSPORT], None, None, None)
+        "Transport", protocol_distribution[LayerLevel.TRANSPORT], None, None, None,
+        error1=errors[LayerLevel.TRANSPORT])
     network_config = FigureConfig(
-        "Network", protocol_distribution[LayerLevel.NETWORK], None, None, None)
-    link_config = FigureConfig("Link", protocol_distribution[LayerLevel.LINK], None, None, None)
+        "Network", protocol_distribution[LayerLevel.NETWORK], None, None, None,
+        error1=errors[LayerLevel.NETWORK])
+    link_config = FigureConfig(
+        "Link", protocol_distribution[LayerLevel.LINK], None, None, None,
+        error1=errors[LayerLevel.LINK])
     return {
         LayerLevel.APPLICATION: app_config,
         LayerLevel.TRANSPORT: transport_config,
@@ -244,10 +472,50 @@ def _configure_protocol_distribution(base_analyzer: BaseAnalyzer) -> dict:
     }
 
 
+def _count_checksums(base_analyzer: BaseAnalyzer | Summary) -> dict[str, int]:
+    """Count invalid and unchecked checksums of all protocols, given already initialized base
+    analyzer.
+
+    Args:
+        base_analyzer (BaseAnalyzer | Summary): initialized base analyzer, or summary
+
+    Returns:
+        dict[str, int]: checksum indicators
+    """
+    summary = base_analyzer.checksum_summary().values()
+    return {
+        "checksum_invalid": sum(counts["invalid"] for counts in summary),
+        "checksum_unchecked": sum(counts["unchecked"] for counts in summary)
+    }
+
+
+def _analyzers(ctx: Context) -> tuple[BaseAnalyzer | Summary, DNSAnalyzer | DNSSummary,
+                                      DHCPAnalyzer | DHCPSummary]:
+    """Get the analyzers of the context, answered from its summary if it has one.
+
+    Args:
+        ctx (Context): application context
+
+    Returns:
+        tuple: base, DNS and DHCP analyzer, or summary
+    """
+    summary = ctx.summary()
+    if summary is not None:
+        return summary, DNSSummary(summary), DHCPSummary(summary)
+    return (BaseAnalyzer(ctx.view(BaseAnalyzer.columns)),
+            DNSAnalyzer(ctx.view(DNSAnalyzer.columns)),
+            DHCPAnalyzer(ctx.view(DHCPAnalyzer.columns)))
+
+
 def analyze_pcap(ctx: Context) -> dict:
     """Analyze the pcap file and return the results.
 
     This method is typically called by the UI every time the application context has been updated.
+    If the packets were sampled, the counts and sizes are estimates, the "sampling" indicator
+    describes the sampling and the margins of error are given alongside, see BaseAnalyzer.
+
+    The results come from the summary of the context, which folds in only the packets added since
+    the previous call. Packets sampled in the "flow" mode have no summary and are analyzed in full.
 
     Args:
         ctx (Context): application context
@@ -256,9 +524,7 @@ def analyze_pcap(ctx: Context) -> dict:
         dict: results of the analysis
     """
 
-    base_analyzer = BaseAnalyzer(ctx.get_df())
-    dns_analyzer = DNSAnalyzer(ctx.get_df())
-    dhcp_analyzer = DHCPAnalyzer(ctx.get_df())
+    base_analyzer, dns_analyzer, dhcp_analyzer = _analyzers(ctx)
 
     start_time, end_time, duration = base_analyzer.time_range_and_duration()
     speed_config = _configure_speed_graph(base_analyzer)
@@ -269,11 +535,15 @@ def analyze_pcap(ctx: Context) -> dict:
     dhcp_domains = _configure_dhcp_most_common_domains(dhcp_analyzer)
     protocol_distribution = _configure_protocol_distribution(base_analyzer)
     indicators = {
+        "sampling": base_analyzer.sampling(),
         "packet_count": base_analyzer.packet_count(),
+        "packet_count_error": base_analyzer.packet_count_error(),
         "data_amount": base_analyzer.total_size(),
+        "data_amount_error": base_analyzer.total_size_error(),
         "duration": duration.total_seconds(),
-        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
-        "end_time": end_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S %Z"),
+        "end_time": end_time.strftime("%Y-%m-%d %H:%M:%S %Z"),
+        **_count_checksums(base_analyzer)
     }
 
     return {
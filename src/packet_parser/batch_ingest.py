@@ -0,0 +1,187 @@
+import glob
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from config import PARSE_BATCH_SIZE, PARSE_WORKERS
+from components.packet import Packet
+from packet_parser.frame_builder import FrameBuilder
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.record_filter import RecordFilter
+from storage.database import CATEGORY_COLUMNS, PACKED_COLUMNS, TIME_DTYPE, concat_frames
+
+# rotated captures get a running number after the suffix, like tcpdump -C does, and archived
+# captures may be compressed
+CAPTURE_NAME = re.compile(r"\.pcap(ng)?\d*(\.(gz|xz|bz2))?$")
+
+
+class FileResult(NamedTuple):
+    """Outcome of parsing one file of a batch."""
+    path: str
+    packets: int
+    error: str | None = None
+
+
+def find_captures(source: str) -> list[str]:
+    """List the capture files of a directory, or the files matching a glob pattern.
+
+    Files of a directory are included if their name ends in .pcap or .pcapng, optionally followed
+    by the number of a rotated file and .gz, .xz or .bz2. Files matching a pattern are included as
+    they are.
+
+    Args:
+        source (str): directory or glob pattern
+
+    Returns:
+        list[str]: paths of the files, sorted by name
+    """
+    if os.path.isdir(source):
+        paths = [str(path) for path in Path(source).iterdir()
+                 if path.is_file() and CAPTURE_NAME.search(path.name)]
+    else:
+        paths = [path for path in glob.glob(source) if os.path.isfile(path)]
+    return sorted(paths)
+
+
+def packets_to_frame(batches: Iterable[Iterable[Packet]]) -> pd.DataFrame | None:
+    """Flatten batches of custom packets into a DataFrame indexed by packet.id.
+
+    The packets are added to the columns of a FrameBuilder as they come, and the DataFrame is
+    built once at the end. The columns of CATEGORY_COLUMNS come out as categoricals, those of
+    PACKED_COLUMNS as unsigned integers, and packet.time as UTC times from the nanoseconds of the
+    record headers.
+
+    Args:
+        batches (Iterable[Iterable[Packet]]): custom packets
+
+    Returns:
+        pd.DataFrame | None: flattened packets, None if there were none
+    """
+    builder = FrameBuilder(CATEGORY_COLUMNS, {**PACKED_COLUMNS, "packet.time": TIME_DTYPE})
+    for parsed_packets in batches:
+        for packet in parsed_packets:
+            builder.append(packet)
+    return builder.build()
+
+
+def parse_file(file_path: str, log_dir: str | None = "logs", workers: int = PARSE_WORKERS,
+               record_filter: RecordFilter | None = None) -> pd.DataFrame | None:
+    """Parse a pcap file into a flattened DataFrame, PARSE_BATCH_SIZE packets at a time.
+
+    Args:
+        file_path (str): path to the pcap file
+        log_dir (str | None, optional): directory of the parser logs, see PcapParser.
+            Defaults to "logs".
+        workers (int, optional): number of worker processes, see PcapParser.iter_pcap.
+            Defaults to PARSE_WORKERS from config.
+        record_filter (RecordFilter | None, optional): selects the packets to parse, None parses
+            all of them. Defaults to None.
+
+    Returns:
+        pd.DataFrame | None: flattened packets, None if the file has no matching packets
+    """
+    return packets_to_frame(PcapParser(log_dir=log_dir).iter_batches(
+        file_path, PARSE_BATCH_SIZE, workers, record_filter))
+
+
+def merge_by_time(frames: list[pd.DataFrame]) -> pd.DataFrame | None:
+    """Merge the packets of several captures into one dataset ordered by packet.time.
+
+    The order is found from the times alone, with one stable argsort: packets with the same time
+    keep the order of the frames and their order within a frame. NumPy's stable sort of 64-bit
+    integers is a timsort, which takes the time-ordered run of each capture as it is and merges
+    the runs. When the captures follow each other in time, like rotated files, the packets are
+    already in order and are not reordered at all.
+
+    Args:
+        frames (list[pd.DataFrame]): flattened packets of each capture
+
+    Returns:
+        pd.DataFrame | None: merged packets, None if there were no frames
+    """
+    if not frames:
+        return None
+    times = np.concatenate([frame["packet.time"].to_numpy(dtype=np.int64) for frame in frames])
+    order = np.argsort(times, kind="stable")
+    merged = concat_frames(frames)
+    if (order == np.arange(len(order))).all():
+        return merged
+    return merged.iloc[order]
+
+
+def parse_files(paths: list[str], workers: int = 1, log_dir: str | None = "logs",
+                progress: Callable[[FileResult, int, int], None] | None = None,
+                record_filter: RecordFilter | None = None
+                ) -> tuple[dict[str, pd.DataFrame], list[FileResult]]:
+    """Parse several pcap files, each one in its own worker process.
+
+    A file that cannot be parsed is reported in the results, the other files are parsed all the
+    same. The parser logs of each file are written to a directory named after the file under
+    log_dir/batch, which is emptied first.
+
+    Args:
+        paths (list[str]): paths to the pcap files
+        workers (int, optional): number of worker processes, 1 parses the files one after
+            another in this process. Defaults to 1.
+        log_dir (str | None, optional): directory of the parser logs, None keeps the logs in
+            memory. Defaults to "logs".
+        progress (Callable[[FileResult, int, int], None] | None, optional): called with the
+            result, the number of finished files and the number of all files as each file is
+            finished. Defaults to None.
+        record_filter (RecordFilter | None, optional): selects the packets to parse, None parses
+            all of them. Defaults to None.
+
+    Returns:
+        tuple[dict[str, pd.DataFrame], list[FileResult]]: flattened packets of the files that
+            had packets, by path, and the results of all files in the order they were given
+    """
+    if log_dir is not None:
+        shutil.rmtree(Path(log_dir, "batch"), ignore_errors=True)
+    frames = {}
+    results = {}
+    for path, df, error in _parse_each(paths, workers, log_dir, record_filter):
+        if df is not None:
+            frames[path] = df
+        results[path] = FileResult(path, 0 if df is None else len(df), error)
+        if progress:
+            progress(results[path], len(results), len(paths))
+    return frames, [results[path] for path in paths]
+
+
+def _parse_each(paths: list[str], workers: int, log_dir: str | None,
+                record_filter: RecordFilter | None
+                ) -> Iterator[tuple[str, pd.DataFrame | None, str | None]]:
+    # yields path, flattened packets and error of each file in the order they are finished
+    file_log_dirs = {path: _file_log_dir(log_dir, i, path) for i, path in enumerate(paths)}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(
+                parse_file, path, file_log_dirs[path], 1, record_filter): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    yield futures[future], None, _describe(e)
+    else:
+        for path in paths:
+            try:
+                df = parse_file(path, file_log_dirs[path], 1, record_filter)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                yield path, None, _describe(e)
+            else:
+                yield path, df, None
+
+
+def _file_log_dir(log_dir: str | None, number: int, path: str) -> str | None:
+    # the number keeps apart files with the same name in different directories
+    return None if log_dir is None else str(Path(log_dir, "batch", f"{number}-{Path(path).name}"))
+
+
+def _describe(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"
@@ -0,0 +1,205 @@
+import socket
+import struct
+from enum import StrEnum
+from typing import NamedTuple, Sequence
+
+import numpy as np
+from scapy.packet import Packet as ScapyPacket
+from scapy.layers.inet import IP, TCP, UDP, ICMP, IPOption_LSRR, IPOption_SSRR, in4_pseudoheader
+from scapy.layers.inet6 import (
+    IPv6, IPv6ExtHdrRouting, IPv6ExtHdrSegmentRouting, IPv6ExtHdrDestOpt, in6_pseudoheader
+)
+
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+
+
+class ChecksumPolicy(StrEnum):
+    """Which packets get their checksums verified."""
+
+    FULL = "full"
+    SAMPLED = "sampled"  # every Nth packet
+    OFF = "off"
+
+
+class ChecksumJob(NamedTuple):
+    """Checksum to verify: a segment of raw bytes and where its checksum field is."""
+
+    data: bytes  # header and payload, without padding
+    position: int  # offset of the 16-bit checksum field in data, must be even
+    pseudo_header: bytes = b""  # prepended to data, must have an even length
+    zero_as_ffff: bool = False  # UDP transmits a computed checksum of zero as 0xFFFF
+
+
+def verify(job: ChecksumJob) -> bool:
+    """Verify a checksum in place, without copying the data to zero the checksum field.
+
+    Because 2**16 is 1 modulo 0xFFFF, the ones' complement sum of the 16-bit words is congruent
+    to the whole buffer read as one big-endian integer, so the sum is a single big integer
+    operation instead of a loop over the words.
+
+    Args:
+        job (ChecksumJob): checksum to verify
+
+    Returns:
+        bool: True if the checksum field matches the checksum computed over the job
+    """
+    data, position, pseudo_header, zero_as_ffff = job
+    if len(data) < position + 2:
+        return False
+    original = (data[position] << 8) | data[position + 1]
+    # the field is a whole word, so it contributes its own value to the sum
+    value = (int.from_bytes(pseudo_header, "big") % 0xFFFF
+             + (int.from_bytes(data, "big") << (8 * (len(data) & 1))) % 0xFFFF
+             - original) % 0xFFFF
+    if value == 0 and (any(pseudo_header) or any(data[:position]) or any(data[position + 2:])):
+        value = 0xFFFF
+    computed = 0xFFFF - value
+    if zero_as_ffff and computed == 0:
+        computed = 0xFFFF
+    return computed == original
+
+
+def verify_many(jobs: Sequence[ChecksumJob]) -> np.ndarray:
+    """Verify many checksums at once with NumPy.
+
+    The jobs are joined into one buffer of big-endian words, the checksum fields are zeroed and
+    the words of each job are summed with a single reduceat. Gives the same results as calling
+    verify on every job.
+
+    Args:
+        jobs (Sequence[ChecksumJob]): checksums to verify
+
+    Returns:
+        np.ndarray: boolean array, True where the checksum is valid
+    """
+    valid = np.zeros(len(jobs), dtype=bool)
+    jobs = [(index, job) for index, job in enumerate(jobs) if len(job.data) >= job.position + 2]
+    if not jobs:
+        return valid
+    words, starts, fields = _join_words([job for _, job in jobs])
+    originals = words[fields]
+    words[fields] = 0
+    sums = np.add.reduceat(words, starts)
+    while (sums > 0xFFFF).any():
+        sums = (sums & 0xFFFF) + (sums >> 16)
+
+    computed = 0xFFFF - sums
+    zero_as_ffff = np.fromiter((job.zero_as_ffff for _, job in jobs), dtype=bool, count=len(jobs))
+    computed[zero_as_ffff & (computed == 0)] = 0xFFFF
+    valid[[index for index, _ in jobs]] = computed == originals
+    return valid
+
+
+def _join_words(jobs: list[ChecksumJob]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Join the pseudo headers and data of the jobs into one array of 16-bit words.
+
+    Returns:
+        words, index of the first word of each job and index of each checksum field
+    """
+    parts = []
+    sizes = np.empty(len(jobs), dtype=np.int64)
+    fields = np.empty(len(jobs), dtype=np.int64)
+    for i, (data, position, pseudo_header, _) in enumerate(jobs):
+        parts += (pseudo_header, data, b"\x00" * (len(data) & 1))
+        sizes[i] = len(pseudo_header) + len(data) + (len(data) & 1)
+        fields[i] = len(pseudo_header) + position
+    starts = np.zeros(len(jobs), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=starts[1:])
+    words = np.frombuffer(b"".join(parts), dtype=">u2").astype(np.int64)
+    return words, starts // 2, (starts + fields) // 2
+
+
+def ipv4_pseudo_header(header: bytes, protocol: int) -> bytes:
+    """Build the TCP/UDP pseudo header from a raw IPv4 header.
+
+    The upper layer length comes from the total length field, as Scapy computes it.
+
+    Args:
+        header (bytes): IPv4 header, at least 20 bytes
+        protocol (int): IP protocol number
+
+    Returns:
+        bytes: pseudo header
+    """
+    ihl = (header[0] & 0x0F) * 4
+    total_length = struct.unpack_from("!H", header, 2)[0]
+    return bytes(header[12:20]) + struct.pack("!HH", protocol, max(total_length - ihl, 0))
+
+
+def ipv6_pseudo_header(addresses: bytes, next_header: int, length: int) -> bytes:
+    """Build the upper layer pseudo header from the raw IPv6 source and destination.
+
+    Args:
+        addresses (bytes): source and destination address, 32 bytes
+        next_header (int): upper layer protocol number
+        length (int): upper layer length
+
+    Returns:
+        bytes: pseudo header
+    """
+    return bytes(addresses) + struct.pack("!IxxxB", length, next_header)
+
+
+def verify_layer(layer: ScapyPacket) -> bool:
+    """Verify the checksum of a dissected Scapy layer from its raw bytes.
+
+    Covers the same bytes as the checksum Scapy computes when building the layer: the IP header,
+    or the layer and its payload without padding, with the pseudo header of the IP layer below
+    for TCP, UDP and ICMPv6.
+
+    Args:
+        layer: IP, TCP, UDP, ICMP or ICMPv6 layer
+
+    Returns:
+        bool: True if the checksum is valid or was cut off by the capture, False if it is
+            invalid or the layer has no checksum
+    """
+    if isinstance(layer, (IP, ICMP, TCP, UDP)):
+        field = "chksum"
+    elif "cksum" in layer.fieldtype:
+        field = "cksum"
+    else:
+        return False
+    if layer.fields.get(field) is None:
+        # truncated before the checksum, there is nothing to compare against
+        return True
+    if isinstance(layer, IP):
+        return verify(ChecksumJob(layer.self_build(), 10))
+    data = layer.do_build()
+    if isinstance(layer, ICMP):
+        return verify(ChecksumJob(data, 2))
+    if isinstance(layer, TCP):
+        protocol, position = IPPROTO_TCP, 16
+    elif isinstance(layer, UDP):
+        protocol, position = IPPROTO_UDP, 6
+    else:
+        protocol, position = IPPROTO_ICMPV6, 2
+    pseudo_header = _pseudo_header(layer, protocol, len(data))
+    if pseudo_header is None:
+        # Scapy leaves the checksum zero without an IP layer below
+        return layer.fields[field] == 0
+    return verify(ChecksumJob(data, position, pseudo_header, protocol == IPPROTO_UDP))
+
+
+def _pseudo_header(layer: ScapyPacket, protocol: int, length: int) -> bytes | None:
+    underlayer = layer.underlayer
+    if isinstance(underlayer, IP):
+        if any(isinstance(option, (IPOption_LSRR, IPOption_SSRR))
+               for option in underlayer.options):
+            # checksummed against the final destination, let Scapy find it
+            return in4_pseudoheader(protocol, underlayer, length)
+        return socket.inet_aton(underlayer.src) + socket.inet_aton(underlayer.dst) + \
+            struct.pack("!HH", protocol, max(underlayer.len - underlayer.ihl * 4, 0))
+    while underlayer is not None and not isinstance(underlayer, IPv6):
+        if isinstance(underlayer, (IPv6ExtHdrRouting, IPv6ExtHdrSegmentRouting,
+                                   IPv6ExtHdrDestOpt)):
+            return bytes(in6_pseudoheader(protocol, layer.underlayer, length))
+        underlayer = underlayer.underlayer
+    if underlayer is None:
+        return None
+    return ipv6_pseudo_header(
+        socket.inet_pton(socket.AF_INET6, underlayer.src)
+        + socket.inet_pton(socket.AF_INET6, underlayer.dst), protocol, length)
@@ -0,0 +1,202 @@
+from scapy.config import conf
+from scapy.packet import Packet as ScapyPacket
+from scapy.layers.inet import IP, TCP, UDP, ICMP
+from scapy.layers.inet6 import IPv6, _ICMPv6, _ICMPv6NDGuessPayload
+from scapy.layers.l2 import Ether, ARP, CookedLinux, MPacketPreamble, Dot1Q, Dot1AD
+from scapy.layers.dns import DNS
+from scapy.layers.dhcp import DHCP, BOOTP
+
+from packet_parser.pcap_reader import RecordHeader, dissect_record
+from packet_parser.header_decoder import HeaderDecoder, DecodedPacket
+from layers.layer_level import LayerLevel
+from layers import layers
+
+
+# Scapy classes of each parsed protocol, by the name of its layer. The parser reads through VLAN
+# tags and the 802.3br preamble of some captures, so they count as Ethernet.
+PROTOCOL_CLASSES = {
+    layers.Ethernet.layer_name: (Ether, MPacketPreamble, Dot1Q, Dot1AD),
+    layers.SLL.layer_name: (CookedLinux,),
+    layers.IP.layer_name: (IP, IPv6),
+    layers.ARP.layer_name: (ARP,),
+    layers.TCP.layer_name: (TCP,),
+    layers.UDP.layer_name: (UDP,),
+    layers.ICMP.layer_name: (ICMP, _ICMPv6, _ICMPv6NDGuessPayload),
+    layers.DNS.layer_name: (DNS,),
+    layers.DHCP.layer_name: (BOOTP, DHCP)
+}
+APPLICATION_PROTOCOLS = (layers.DNS.layer_name, layers.DHCP.layer_name)
+
+
+class DissectionLimit:
+    """Stops the dissection of packets at a layer level, or at a protocol that is not needed.
+
+    Scapy dissects the whole payload of a layer as soon as the layer is built. Here the layers of
+    the first levels are built one at a time instead, and the payload after the limit is left as
+    a single Raw layer, which the parser records as RAW layers with sizes only. The layers that
+    are dissected come out exactly as Scapy would dissect them, and so do the paddings.
+
+    The application layer is always dissected with everything it contains, since its parsers need
+    the layers under it, like DHCP under BOOTP.
+    """
+
+    def __init__(self, max_layer: LayerLevel | str = LayerLevel.APPLICATION,
+                 protocols: list[str] | None = None) -> None:
+        """Initializes the limit.
+
+        Args:
+            max_layer (LayerLevel | str, optional): last level to dissect.
+                Defaults to LayerLevel.APPLICATION.
+            protocols (list[str] | None, optional): names of the protocols to dissect, like
+                "Ethernet" or "TCP", see PROTOCOL_CLASSES. A layer of any other protocol is left
+                as Raw with everything after it. None dissects all protocols. Defaults to None.
+
+        Raises:
+            ValueError: if the level or a protocol is unknown
+        """
+        self.max_layer = LayerLevel(max_layer)
+        self.depth = list(LayerLevel).index(self.max_layer) + 1
+        self.protocols = None if protocols is None else frozenset(protocols)
+        unknown = sorted((self.protocols or set()) - PROTOCOL_CLASSES.keys())
+        if unknown:
+            raise ValueError(f"Unknown protocols: {', '.join(unknown)}")
+        self.classes = None if self.protocols is None else tuple(
+            layer_class for protocol in self.protocols
+            for layer_class in PROTOCOL_CLASSES[protocol])
+        self.decoder_depth = self.depth
+        if self.depth == len(LayerLevel) and self.protocols is not None \
+                and not self.protocols & set(APPLICATION_PROTOCOLS):
+            # the application layer is RAW anyway, so the decoder need not leave bound ports
+            # to Scapy
+            self.decoder_depth -= 1
+
+    @property
+    def unlimited(self) -> bool:
+        """True if every layer is dissected."""
+        return self.depth == len(LayerLevel) and self.protocols is None
+
+    def allows(self, position: int, layer_class: type) -> bool:
+        """Check whether a layer is dissected.
+
+        Args:
+            position (int): position of the layer in the packet, 0 for the link layer
+            layer_class (type): Scapy class of the layer
+
+        Returns:
+            bool: True if the layer is within the limit
+        """
+        return position < self.depth and (self.classes is None
+                                          or issubclass(layer_class, self.classes))
+
+    def decode(self, header: RecordHeader, data: bytes) -> DecodedPacket | None:
+        """Decode a packet record without Scapy, within the limit, see HeaderDecoder.
+
+        Args:
+            header (RecordHeader): record header
+            data (bytes): packet data
+
+        Returns:
+            DecodedPacket | None: decoded layers, or None if Scapy is needed
+        """
+        decoded = HeaderDecoder.decode(header, data, self.decoder_depth)
+        if decoded is None or self.protocols is None:
+            return decoded
+        for layer_level in list(LayerLevel)[:self.decoder_depth]:
+            if decoded.layers[layer_level].layer_name not in self.protocols:
+                return None
+        return decoded
+
+    def dissect(self, header: RecordHeader, data: bytes) -> ScapyPacket:
+        """Dissect a packet record with Scapy, within the limit, see dissect_record.
+
+        Args:
+            header (RecordHeader): record header
+            data (bytes): packet data
+
+        Returns:
+            Packet: Scapy packet
+        """
+        if self.unlimited:
+            return dissect_record(header, data)
+        return dissect_record(header, data, self._dissect_chain)
+
+    def _dissect_chain(self, layer_class: type, data: bytes) -> ScapyPacket:
+        """Build the layers of a packet one at a time, like the nested calls of
+        Packet.do_dissect_payload.
+
+        A layer that fails to dissect becomes Raw, like in Scapy. The link layer is built like
+        any other, so the caller turns its failures into a Raw packet.
+
+        Args:
+            layer_class (type): Scapy class of the link layer
+            data (bytes): packet data
+
+        Returns:
+            Packet: Scapy packet
+        """
+        top = layer = None
+        paddings = []
+        position = 0
+        while data:
+            try:
+                next_layer, payload, padding, layer_class = self._dissect_layer(
+                    position, layer_class, data, layer)
+                paddings.append(padding)
+            except Exception:  # pylint: disable=broad-exception-caught
+                if layer is None:
+                    raise
+                next_layer, payload = conf.raw_layer(data, _internal=1, _underlayer=layer), b""
+            if layer is None:
+                top = next_layer
+            else:
+                layer.add_payload(next_layer)
+            layer, data, position = next_layer, payload, position + 1
+        if conf.padding:
+            # each layer adds its padding after its payload, so the innermost comes first
+            for padding in reversed(paddings):
+                if padding:
+                    top.add_payload(conf.padding_layer(padding))
+        top.dissection_done(top)
+        return top
+
+    def _dissect_layer(self, position: int, layer_class: type, data: bytes,
+                       underlayer: ScapyPacket | None) -> tuple[ScapyPacket, bytes, bytes, type]:
+        # returns the layer, the payload left to dissect, the padding and the class of the payload
+        layer_class = _dispatch(layer_class, data, underlayer)
+        if not self.allows(position, layer_class):
+            return conf.raw_layer(data, _internal=1, _underlayer=underlayer), b"", b"", None
+        if position == len(LayerLevel) - 1 or not _dissects_by_steps(layer_class):
+            return _construct(layer_class, data, underlayer), b"", b"", None
+        layer = _construct(layer_class, b"", underlayer)
+        layer.original = data
+        # one step at a time, do_dissect may replace post_dissect
+        rest = layer.pre_dissect(data)
+        rest = layer.do_dissect(rest)
+        rest = layer.post_dissect(rest)
+        payload, padding = layer.extract_padding(rest)
+        return layer, payload, padding, layer.guess_payload_class(payload) if payload else None
+
+
+def _dispatch(layer_class: type, data: bytes, underlayer: ScapyPacket | None) -> type:
+    # the class Scapy's packet metaclass would instantiate
+    if "dispatch_hook" not in layer_class.__dict__:
+        return layer_class
+    try:
+        return layer_class.dispatch_hook(data, _internal=1, _underlayer=underlayer)
+    except Exception:  # pylint: disable=broad-exception-caught
+        return conf.raw_layer
+
+
+def _construct(layer_class: type, data: bytes, underlayer: ScapyPacket | None) -> ScapyPacket:
+    # instantiate without dispatching again, the top layer is finished by the caller
+    layer = layer_class.__new__(layer_class, layer_class.__name__, layer_class.__bases__,
+                                layer_class.__dict__)
+    # pylint: disable-next=unnecessary-dunder-call
+    layer.__init__(data, _internal=1, _underlayer=underlayer)
+    return layer
+
+
+def _dissects_by_steps(layer_class: type) -> bool:
+    # a few layers, like TLS records, dissect their payload in their own way and are left whole
+    return layer_class.dissect is ScapyPacket.dissect \
+        and layer_class.do_dissect_payload is ScapyPacket.do_dissect_payload
@@ -0,0 +1,107 @@
+import glob
+import os
+from typing import Iterator
+
+from packet_parser.pcap_reader import PcapFormatError, RecordHeader, RecordReader
+
+
+class FollowedFile:
+    """How far a followed capture file has been read."""
+
+    def __init__(self) -> None:
+        self.capture_id = None
+        self.inode = None
+        self.reader: RecordReader | None = None
+
+    def start(self, reader: RecordReader, inode: int, capture_id: int) -> None:
+        """Start reading the file from the beginning.
+
+        Args:
+            reader (RecordReader): reader positioned after the file header
+            inode (int): inode of the file
+            capture_id (int): capture id of the packets, see CaptureFollower.poll
+        """
+        self.reader = reader
+        self.inode = inode
+        self.capture_id = capture_id
+
+
+class CaptureFollower:
+    """Follows capture files that are still being written, like the output of tcpdump -w with -C
+    or -G rotation, and reads only the records appended since the previous poll.
+
+    The pattern is matched again on every poll, so rotated files are picked up as they appear,
+    and new files are read in order of modification time. A file that has been replaced or
+    truncated, like when tcpdump -W reuses a name, is read again from the start.
+    """
+
+    def __init__(self, pattern: str) -> None:
+        """Initializes the follower. Nothing is read before the first poll.
+
+        Args:
+            pattern (str): glob pattern of the capture files
+        """
+        self.pattern = pattern
+        self.files: dict[str, FollowedFile] = {}
+        self.polls = 0
+        self.captures = 0
+
+    def poll(self) -> Iterator[tuple[RecordHeader, bytes]]:
+        """Read the records appended to the capture files since the previous poll.
+
+        Packet numbers run from 1 in each file, like when the files are parsed one by one, and
+        the headers get the capture id of their file, numbered from 0 in the order the files are
+        started.
+
+        Raises:
+            PcapFormatError: if a file other than the newest one is not a pcap or pcapng capture.
+                The newest file may still be waiting for its header to be written.
+
+        Yields:
+            tuple[RecordHeader, bytes]: record header, packet data
+        """
+        paths = []
+        for path in glob.glob(self.pattern):
+            try:
+                paths.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                continue
+        paths = [path for _, path in sorted(paths)]
+        for path in set(self.files) - set(paths):
+            del self.files[path]
+        for path in paths:
+            self.files.setdefault(path, FollowedFile())
+
+        for path, followed in list(self.files.items()):
+            for header, data in self._read_new(path, followed, path == paths[-1]):
+                yield header._replace(capture_id=followed.capture_id), data
+        self.polls += 1
+
+    def _read_new(self, path: str, followed: FollowedFile,
+                  newest: bool) -> Iterator[tuple[RecordHeader, bytes]]:
+        try:
+            stat = os.stat(path)
+            file = open(path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            return
+        with file:
+            reader = followed.reader
+            if reader is not None and (stat.st_ino != followed.inode
+                                       or stat.st_size < reader.offset):
+                reader = None
+            if reader is None:
+                try:
+                    reader = RecordReader(file)
+                except PcapFormatError:
+                    if newest:
+                        return
+                    raise
+                # a file read from the start again is a new capture, its packet numbers restart
+                followed.start(reader, stat.st_ino, self._new_capture_id())
+            else:
+                reader.resume(file)
+            yield from reader
+
+    def _new_capture_id(self) -> int:
+        self.captures += 1
+        return self.captures - 1
@@ -0,0 +1,183 @@
+from array import array
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from components.layer import Layer
+from components.packet import Packet
+from utils.utils import flatten_dict
+
+
+class Codes:
+    """Dictionary encoded column: each distinct value is kept once, and each row has the code of
+    its value, -1 for a missing one.
+    """
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self) -> None:
+        self.codes = array("i")
+        self.values: dict = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, value) -> None:
+        """Add the value of the next row.
+
+        Args:
+            value: value, None or NaN for a missing one
+        """
+        if value is None or value != value:  # pylint: disable=comparison-with-itself
+            self.codes.append(-1)
+            return
+        code = self.values.get(value)
+        if code is None:
+            code = self.values[value] = len(self.values)
+        self.codes.append(code)
+
+    def pad(self, count: int) -> None:
+        """Add rows with a missing value.
+
+        Args:
+            count (int): number of rows
+        """
+        self.codes.extend([-1] * count)
+
+    def categorical(self) -> pd.Categorical:
+        """Build the column.
+
+        Returns:
+            pd.Categorical: values of the rows, the categories in the order they were first seen
+        """
+        return pd.Categorical.from_codes(np.frombuffer(self.codes, dtype=np.int32),
+                                         categories=list(self.values))
+
+
+class FrameBuilder:
+    """Builds a DataFrame of custom packets one column at a time.
+
+    Gives the same columns and values as a DataFrame of Packet.flatten rows, but each value goes
+    straight into the buffer of its column, so no dict is built per packet and the DataFrame is
+    built once from whole columns. Columns that start out with an integer in the first packet,
+    like the ids, the times and the sizes, are kept in int64 arrays, the rest in lists. A packet
+    without a value for a column gets NaN, like a missing key of a row.
+
+    Columns named in categories are dictionary encoded as they are built, see Codes, and come out
+    as pandas Categoricals. Columns named in dtypes come out as that pandas dtype, with NA for the
+    missing values.
+    """
+
+    def __init__(self, categories: Iterable[str] = (), dtypes: dict[str, str] | None = None
+                 ) -> None:
+        """Initializes the builder.
+
+        Args:
+            categories (Iterable[str], optional): names of the columns to encode as categoricals.
+                Defaults to ().
+            dtypes (dict[str, str] | None, optional): dtypes of columns by name, like "UInt64".
+                Defaults to None.
+        """
+        self.rows = 0
+        self.columns: dict[str, array | list | Codes] = {}
+        self.categories = frozenset(categories)
+        self.dtypes = dict(dtypes or {})
+        # column names of each layer by level and name, and of its data fields by key
+        self._layer_names: dict[tuple[str, str], tuple[str, str, str, str]] = {}
+        self._field_names: dict[tuple[str, str], str] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def append(self, packet: Packet) -> None:
+        """Add a packet as the next row.
+
+        Args:
+            packet (Packet): custom packet
+        """
+        self._put("packet.id", packet.packet_id, typed=True)
+        self._put("packet.time", packet.time, typed=True)
+        self._put("packet.size", packet.size, typed=True)
+        if packet.sample_rate > 1:
+            self._put("packet.sample_rate", packet.sample_rate)
+            self._put("packet.sample_mode", packet.sample_mode)
+        for layer_type, layer in packet.layers.items():
+            self._append_layer(layer_type, layer)
+        self.rows += 1
+
+    def build(self) -> pd.DataFrame | None:
+        """Build the DataFrame of the added packets, indexed by packet.id. The builder is empty
+        afterwards.
+
+        Returns:
+            pd.DataFrame | None: flattened packets, None if there were none
+        """
+        if not self.rows:
+            return None
+        # the index is built on its own, set_index would copy every column
+        index = pd.Index(self._values("packet.id"), name="packet.id")
+        data = {name: self._values(name, index) for name in list(self.columns)}
+        self.rows = 0
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def _append_layer(self, layer_type: str, layer: Layer) -> None:
+        names = self._layer_names.get((layer_type, layer.layer_name))
+        if names is None:
+            names = self._layer_names[(layer_type, layer.layer_name)] = (
+                f"{layer_type}.size_total", f"{layer_type}.size_payload",
+                f"{layer_type}.layer_name", f"{layer_type}.{layer.layer_name}.data")
+        size_total, size_payload, layer_name, data = names
+        self._put(size_total, layer.size_total, typed=True)
+        self._put(size_payload, layer.size_payload, typed=True)
+        self._put(layer_name, layer.layer_name)
+        for key, value in layer.data.items():
+            if isinstance(value, (dict, list)):
+                # nested values are flattened like Packet.flatten does
+                for name, item in flatten_dict({key: value}, data).items():
+                    self._put(name, item)
+                continue
+            name = self._field_names.get((data, key))
+            if name is None:
+                name = self._field_names[(data, key)] = f"{data}.{key}"
+            self._put(name, value)
+
+    def _values(self, name: str, index: pd.Index | None = None) -> pd.Series | np.ndarray:
+        # converts a column and lets go of its buffer
+        column = self._column(name, self.rows)
+        del self.columns[name]
+        if isinstance(column, array):
+            values = np.frombuffer(column, dtype=np.int64).copy()
+            if name not in self.dtypes:
+                return values
+            return pd.Series(pd.array(values, dtype=self.dtypes[name]), index=index, name=name)
+        if isinstance(column, Codes):
+            return pd.Series(column.categorical(), index=index, name=name)
+        if name in self.dtypes:
+            return pd.Series(pd.array(column, dtype=self.dtypes[name]), index=index, name=name)
+        return pd.Series(column, index=index, name=name)
+
+    def _put(self, name: str, value, typed: bool = False) -> None:
+        column = self.columns.get(name)
+        if column is None or len(column) < self.rows:
+            column = self._column(name, self.rows, typed)
+        if isinstance(column, array) and not isinstance(value, int):
+            column = self.columns[name] = column.tolist()
+        column.append(value)
+
+    def _column(self, name: str, length: int, typed: bool = False) -> array | list | Codes:
+        # the column padded with NaN up to length, an array turns into a list to hold them
+        column = self.columns.get(name)
+        if column is None:
+            if name in self.categories:
+                column = self.columns[name] = Codes()
+            else:
+                column = self.columns[name] = array("q") if typed and length == 0 else []
+        if len(column) < length:
+            if isinstance(column, Codes):
+                column.pad(length - len(column))
+                return column
+            if isinstance(column, array):
+                column = self.columns[name] = column.tolist()
+            column.extend([np.nan] * (length - len(column)))
+        return column
@@ -0,0 +1,338 @@
+import socket
+import struct
+from functools import partial
+
+from scapy.layers.inet import IP, TCP, UDP
+from scapy.layers.l2 import ETHER_TYPES
+
+from utils.utils import convert_mac
+from components.layer import Layer
+from layers.layer_level import LayerLevel
+from layers import layers, properties
+from packet_parser.pcap_reader import RecordHeader
+from packet_parser.checksum import ChecksumJob, ipv4_pseudo_header, ipv6_pseudo_header
+
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_LINUX_SLL = 113
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+ETHERTYPE_MIN = 0x0600  # smaller values are 802.3 lengths, which Scapy dissects as Dot3
+
+
+def _bound_ports(layer_class) -> set[int]:
+    """Collect the ports on which Scapy dissects the payload of a transport layer as something
+    other than Raw."""
+    ports = set()
+    for fields, _ in layer_class.payload_guess:
+        ports.update(value for key, value in fields.items() if key in ("sport", "dport"))
+    return ports
+
+
+class DecodedPacket:
+    """Layers of a packet decoded by HeaderDecoder."""
+
+    __slots__ = ("layers", "checksums")
+
+    def __init__(self) -> None:
+        self.layers = {}
+        # (layer level, Scapy class, job) per checksum, the layers have checksum_valid None
+        # until the caller has verified the jobs
+        self.checksums = []
+
+
+class HeaderDecoder:
+    """Decodes Ethernet/SLL, IPv4/IPv6 and TCP/UDP headers straight from the record bytes.
+
+    Produces the same layers as dissecting the record with Scapy and running the PcapParser
+    chain, but only for packets where that is cheap to guarantee. decode returns None for
+    everything else (other protocols, fragments, extension headers, malformed headers, and
+    ports on which Scapy would dissect an application layer), and the caller falls back to
+    Scapy.
+
+    Checksums are not verified here, they are collected in DecodedPacket.checksums so that the
+    caller can verify the checksums of many packets in one batch.
+
+    With a depth of less than four levels, the levels past the depth are sized as RAW, like
+    Scapy leaves them when it is stopped there (see DissectionLimit), and the headers that would
+    only be needed for those levels are not required.
+    """
+
+    tcp_ports = _bound_ports(TCP)
+    udp_ports = _bound_ports(UDP)
+
+    @classmethod
+    def decode(cls, header: RecordHeader, data: bytes,
+               depth: int = len(LayerLevel)) -> DecodedPacket | None:
+        """Decode a packet record.
+
+        Args:
+            header (RecordHeader): record header
+            data (bytes): packet data
+            depth (int, optional): number of levels to decode, the rest are RAW.
+                Defaults to all four.
+
+        Returns:
+            DecodedPacket | None: decoded layers, or None if Scapy is needed
+        """
+        decoded = DecodedPacket()
+        view = memoryview(data)
+        link = cls.decode_link(header.linktype, view)
+        if link is None:
+            return None
+        config, ethertype, offset = link
+        decoded.layers[LayerLevel.LINK] = Layer(config, len(view), len(view) - offset)
+        if depth == 1:
+            cls.size_raw(decoded, 1, [len(view) - offset])
+            return decoded
+        if not cls.decode_network(ethertype, view[offset:], decoded, depth):
+            return None
+        return decoded
+
+    @classmethod
+    def decode_network(cls, ethertype: int, view: memoryview, decoded: DecodedPacket,
+                       depth: int) -> bool:
+        """Decode the network layer and the levels after it, up to depth.
+
+        Args:
+            ethertype (int): ethertype from the link layer
+            view (memoryview): bytes starting at the network header
+            decoded (DecodedPacket): receives the layers
+            depth (int): number of levels to decode, see decode
+
+        Returns:
+            bool: False if Scapy is needed
+        """
+        if ethertype == ETHERTYPE_IPV4:
+            network = cls.decode_ipv4(view, decoded, depth > 2)
+        elif ethertype == ETHERTYPE_IPV6:
+            network = cls.decode_ipv6(view, depth > 2)
+        else:
+            network = None
+        if network is None:
+            return False
+        config, protocol, offset, length, pseudo_header = network
+        decoded.layers[LayerLevel.NETWORK] = Layer(config, len(view), len(view) - offset)
+
+        # bytes after the network payload are Ethernet padding
+        segment = view[offset:offset + length]
+        padding = len(view) - offset - len(segment)
+        if depth == 2:
+            cls.size_raw(decoded, 2, [len(segment), padding])
+            return True
+        return cls.decode_transport(protocol, segment, pseudo_header, decoded, padding, depth > 3)
+
+    @staticmethod
+    def size_raw(decoded: DecodedPacket, level: int, chain: list[int]) -> None:
+        """Size the levels from level on as RAW.
+
+        Scapy chains the bytes that were not dissected as Raw, followed by the padding of each
+        dissected layer, innermost first, and leaves out the empty ones.
+
+        Args:
+            decoded (DecodedPacket): receives the layers
+            level (int): index of the first RAW level
+            chain (list[int]): sizes of the undissected bytes and the paddings
+        """
+        chain = [part for part in chain if part]
+        for i, layer_level in enumerate(list(LayerLevel)[level:]):
+            decoded.layers[layer_level] = Layer(
+                layers.RAW(layer_level), sum(chain[i:]), sum(chain[i + 1:]))
+
+    @classmethod
+    def decode_link(cls, linktype: int, view: memoryview):
+        """Decode the link layer header of a supported link type.
+
+        Args:
+            linktype (int): link type of the record
+            view (memoryview): packet data
+
+        Returns:
+            parsed link layer, ethertype and header length, or None if Scapy is needed
+        """
+        if linktype == LINKTYPE_ETHERNET:
+            return cls.decode_ether(view)
+        if linktype == LINKTYPE_LINUX_SLL:
+            return cls.decode_sll(view)
+        return None
+
+    @classmethod
+    def decode_transport(cls, protocol: int, segment: memoryview, pseudo_header,
+                         decoded: DecodedPacket, padding: int, application: bool = True) -> bool:
+        """Decode the transport layer and size the application layer as RAW.
+
+        Args:
+            protocol (int): IP protocol number
+            segment (memoryview): transport header and payload, without padding
+            pseudo_header: pseudo header builder from decode_ipv4 or decode_ipv6
+            decoded (DecodedPacket): receives the layers
+            padding (int): number of padding bytes after the segment
+            application (bool, optional): False if the application layer is not dissected, so
+                ports bound to application layers are decoded too. Defaults to True.
+
+        Returns:
+            bool: False if Scapy is needed
+        """
+        if protocol == IPPROTO_TCP:
+            transport = cls.decode_tcp(segment, pseudo_header, decoded, application)
+        else:
+            transport = cls.decode_udp(segment, pseudo_header, decoded, application)
+        if transport is None:
+            return False
+        config, offset, trailing = transport
+        total = len(segment) + padding
+        decoded.layers[LayerLevel.TRANSPORT] = Layer(config, total, total - offset)
+
+        # Scapy chains the payload as Raw, then UDP padding, then network padding
+        cls.size_raw(decoded, 3, [*trailing, padding])
+        return True
+
+    @staticmethod
+    def decode_ether(view: memoryview) -> tuple[layers.Ethernet, int, int] | None:
+        """Decode an Ethernet header.
+
+        Args:
+            view (memoryview): bytes starting at the Ethernet header
+
+        Returns:
+            tuple[Ethernet, int, int] | None: parsed Ethernet layer, ethertype, header length
+        """
+        if len(view) < 14:
+            return None
+        ethertype = struct.unpack_from("!H", view, 12)[0]
+        if ethertype < ETHERTYPE_MIN:
+            return None
+        config = layers.Ethernet(bytes(view[6:12]).hex(":"), bytes(view[0:6]).hex(":"))
+        return config, ethertype, 14
+
+    @staticmethod
+    def decode_sll(view: memoryview) -> tuple[layers.SLL, int, int] | None:
+        """Decode a Linux cooked capture header.
+
+        Args:
+            view (memoryview): bytes starting at the SLL header
+
+        Returns:
+            tuple[SLL, int, int] | None: parsed SLL layer, ethertype, header length
+        """
+        if len(view) < 16:
+            return None
+        pkttype, _, _, src, ethertype = struct.unpack_from("!HHH8sH", view)
+        if ethertype not in ETHER_TYPES:
+            return None
+        config = layers.SLL(
+            convert_mac(src), properties.CookedPacketType(pkttype), ETHER_TYPES[ethertype])
+        return config, ethertype, 16
+
+    @staticmethod
+    def decode_ipv4(view: memoryview, decoded: DecodedPacket, transport: bool = True):
+        """Decode an IPv4 header.
+
+        Args:
+            view (memoryview): bytes starting at the IPv4 header
+            decoded (DecodedPacket): collects the header checksum
+            transport (bool, optional): False if the transport layer is not decoded, so
+                fragments and other protocols than TCP and UDP are decoded too. Defaults to True.
+
+        Returns:
+            parsed IP layer, protocol, header length, payload length and a function returning
+            the TCP/UDP pseudo header for a segment length, or None if Scapy is needed
+        """
+        if len(view) < 20:
+            return None
+        version_ihl, total_length, flags_fragment, protocol = struct.unpack_from(
+            "!BxHxxHxB", view)
+        ihl = (version_ihl & 0x0F) * 4
+        if version_ihl >> 4 != 4 or ihl < 20 or len(view) < ihl:
+            return None
+        if transport and (flags_fragment & 0x3FFF or protocol not in (IPPROTO_TCP, IPPROTO_UDP)):
+            return None
+        header = view[:ihl]
+        decoded.checksums.append((LayerLevel.NETWORK, IP, ChecksumJob(header, 10)))
+        # Scapy only splits off padding when the length field is sane
+        payload_length = total_length - ihl if total_length >= ihl else len(view)
+        pseudo_header = ipv4_pseudo_header(header, protocol)
+        src, dst = bytes(header[12:16]), bytes(header[16:20])
+        config = layers.IP(properties.IPVersion.IPV4, socket.inet_ntoa(src),
+                           socket.inet_ntoa(dst), None, src, dst)
+        return config, protocol, ihl, payload_length, lambda _: pseudo_header
+
+    @staticmethod
+    def decode_ipv6(view: memoryview, transport: bool = True):
+        """Decode an IPv6 header without extension headers.
+
+        Args:
+            view (memoryview): bytes starting at the IPv6 header
+            transport (bool, optional): False if the transport layer is not decoded, so
+                extension headers and other protocols than TCP and UDP are decoded too.
+                Defaults to True.
+
+        Returns:
+            parsed IP layer, next header, header length, payload length and a function returning
+            the TCP/UDP pseudo header for a segment length, or None if Scapy is needed
+        """
+        if len(view) < 40:
+            return None
+        version, payload_length, next_header = struct.unpack_from("!BxxxHB", view)
+        if version >> 4 != 6 or payload_length == 0 \
+                or transport and next_header not in (IPPROTO_TCP, IPPROTO_UDP):
+            return None
+        addresses = bytes(view[8:40])
+        src, dst = addresses[:16], addresses[16:]
+        config = layers.IP(properties.IPVersion.IPV6, socket.inet_ntop(socket.AF_INET6, src),
+                           socket.inet_ntop(socket.AF_INET6, dst), None, src, dst)
+        pseudo_header = partial(ipv6_pseudo_header, addresses, next_header)
+        return config, next_header, 40, payload_length, pseudo_header
+
+    @classmethod
+    def decode_tcp(cls, segment: memoryview, pseudo_header, decoded: DecodedPacket,
+                   application: bool = True):
+        """Decode a TCP header.
+
+        Args:
+            segment (memoryview): TCP header and payload, without padding
+            pseudo_header: pseudo header builder from decode_ipv4 or decode_ipv6
+            decoded (DecodedPacket): collects the checksum
+            application (bool, optional): see decode_transport. Defaults to True.
+
+        Returns:
+            parsed TCP layer, header length and payload sizes, or None if Scapy is needed
+        """
+        if len(segment) < 20:
+            return None
+        src_port, dst_port, data_offset = struct.unpack_from("!HH8xB", segment)
+        offset = (data_offset >> 4) * 4
+        if offset < 20 or len(segment) < offset or application \
+                and (src_port in cls.tcp_ports or dst_port in cls.tcp_ports):
+            return None
+        decoded.checksums.append((LayerLevel.TRANSPORT, TCP,
+                                  ChecksumJob(segment, 16, pseudo_header(len(segment)))))
+        return layers.TCP(src_port, dst_port, None), offset, (len(segment) - offset,)
+
+    @classmethod
+    def decode_udp(cls, segment: memoryview, pseudo_header, decoded: DecodedPacket,
+                   application: bool = True):
+        """Decode a UDP header.
+
+        Args:
+            segment (memoryview): UDP header and payload, without padding
+            pseudo_header: pseudo header builder from decode_ipv4 or decode_ipv6
+            decoded (DecodedPacket): collects the checksum
+            application (bool, optional): see decode_transport. Defaults to True.
+
+        Returns:
+            parsed UDP layer, header length and payload sizes, or None if Scapy is needed
+        """
+        if len(segment) < 8:
+            return None
+        src_port, dst_port, length = struct.unpack_from("!HHH", segment)
+        if length < 8 or application \
+                and (src_port in cls.udp_ports or dst_port in cls.udp_ports):
+            return None
+        datagram = segment[:length]
+        decoded.checksums.append((LayerLevel.TRANSPORT, UDP, ChecksumJob(
+            datagram, 6, pseudo_header(len(datagram)), zero_as_ffff=True)))
+        return layers.UDP(src_port, dst_port, None), 8, \
+            (len(datagram) - 8, len(segment) - len(datagram))
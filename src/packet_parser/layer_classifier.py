@@ -0,0 +1,35 @@
+from scapy.packet import Packet as ScapyPacket, NoPayload
+from scapy.layers.inet6 import _ICMPv6, _ICMPv6NDGuessPayload
+
+
+def classify(packet: ScapyPacket, depth: int) -> list[dict[type, ScapyPacket]]:
+    """Find the layers at or below each of the first positions of a packet, in a single walk down
+    the layer chain.
+
+    At position i, a layer type maps to the first layer of exactly that type found at or after
+    the position, which is what `layer_type in packet` and `packet[layer_type]` would find i
+    payloads down, without walking the chain again for every lookup. Any kind of ICMPv6 message
+    is also mapped under _ICMPv6, but only at its own position.
+
+    Args:
+        packet (Packet): Scapy packet
+        depth (int): number of positions to classify
+
+    Returns:
+        list[dict[type, Packet]]: layers by type for each position, empty past the last layer
+    """
+    chain = []
+    while not isinstance(packet, NoPayload):
+        chain.append(packet)
+        packet = packet.payload
+
+    found = [{} for _ in range(depth)]
+    below = {}
+    for position in reversed(range(len(chain))):
+        layer = chain[position]
+        below[type(layer)] = layer
+        if position < depth:
+            found[position] = dict(below)
+            if isinstance(layer, (_ICMPv6, _ICMPv6NDGuessPayload)):
+                found[position][_ICMPv6] = layer
+    return found
@@ -0,0 +1,55 @@
+from scapy.config import conf
+
+from packet_parser.dissection_limit import PROTOCOL_CLASSES
+
+
+# payload_guess lists replaced by enable, by class
+_original_bindings = {}
+
+
+def understood(layer_class: type) -> bool:
+    """Check whether PcapParser turns a Scapy layer into something other than RAW.
+
+    Args:
+        layer_class (type): Scapy class of the layer
+
+    Returns:
+        bool: True if the layer belongs to one of PROTOCOL_CLASSES
+    """
+    return any(issubclass(layer_class, classes) for classes in PROTOCOL_CLASSES.values())
+
+
+def enable() -> None:
+    """Unbind the Scapy layers that PcapParser does not understand.
+
+    Scapy tries the payload bindings of a layer one by one to find the class of its payload. After
+    this, only the bindings to understood layers are left, so there are fewer to try, and a
+    payload that would have needed any other binding falls through to Raw. The change is global to
+    the process, and is undone by disable.
+
+    The Scapy modules are not touched otherwise: the parser imports only the few it needs.
+    """
+    if _original_bindings:
+        return
+    for layer_class in conf.layers:
+        bindings = layer_class.__dict__.get("payload_guess")
+        if bindings and not all(understood(payload_class) for _, payload_class in bindings):
+            _original_bindings[layer_class] = bindings
+            layer_class.payload_guess = [(fields, payload_class) for fields, payload_class
+                                         in bindings if understood(payload_class)]
+
+
+def disable() -> None:
+    """Restore the bindings removed by enable."""
+    for layer_class, bindings in _original_bindings.items():
+        layer_class.payload_guess = bindings
+    _original_bindings.clear()
+
+
+def enabled() -> bool:
+    """Check whether the lean mode is on.
+
+    Returns:
+        bool: True if enable has been called and not undone
+    """
+    return bool(_original_bindings)
@@ -0,0 +1,115 @@
+from collections import Counter
+from pathlib import Path
+from typing import Callable, TextIO
+
+from config import PARSER_LOG_VERBOSE_LIMIT
+
+
+class ParserLog:
+    """Diagnostic log of the parser, written out entry by entry instead of kept in memory.
+
+    Every entry is also counted by (layer level, exception type, layer name). Entries may carry
+    verbose details, like a dump of the packet, which are rendered only for the first
+    verbose_limit entries, so a noisy capture costs little more than the counting.
+
+    Without a path, the entries are kept in memory. Worker processes use this to hand their
+    entries over to the parent, which merges them into its own log. A worker is given only the
+    verbose budget its parent has left, see remaining, so it does not render details the parent
+    would drop.
+    """
+
+    def __init__(self, path: str | None, verbose_limit: int = PARSER_LOG_VERBOSE_LIMIT) -> None:
+        """Initializes the log.
+
+        Args:
+            path (str | None): file to write to, None to keep the entries in memory
+            verbose_limit (int, optional): how many entries get their details rendered.
+                Defaults to PARSER_LOG_VERBOSE_LIMIT from config.
+        """
+        self.path = path
+        self.verbose_limit = verbose_limit
+        self.verbose_count = 0
+        self.counts = Counter()
+        self.entries = []  # (message, details) when path is None
+        self._file: TextIO | None = None
+
+    def write(self, key: tuple[str, str, str], message: str,
+              details: Callable[[], str] | None = None) -> None:
+        """Count an entry and write it.
+
+        Args:
+            key (tuple[str, str, str]): layer level, exception type, layer name
+            message (str): one line message
+            details (Callable[[], str] | None, optional): renders the verbose details, called
+                only while under the verbose limit. Defaults to None.
+        """
+        self.counts[key] += 1
+        self._write(message, self._render(details))
+
+    def merge(self, entries: list[tuple[str, str | None]], counts: Counter) -> None:
+        """Append the entries and counts of another log, like one kept by a worker process.
+
+        Details beyond this log's verbose limit are dropped.
+
+        Args:
+            entries (list[tuple[str, str | None]]): (message, details) of the other log
+            counts (Counter): counts of the other log
+        """
+        self.counts.update(counts)
+        for message, details in entries:
+            self._write(message, self._render(None if details is None else lambda d=details: d))
+
+    def remaining(self) -> int:
+        """Get the number of entries that still get their details rendered.
+
+        Returns:
+            int: verbose entries left under the limit
+        """
+        return max(0, self.verbose_limit - self.verbose_count)
+
+    def open(self) -> None:
+        """Start the log over: the file, the counts and the verbose budget. Writes without open
+        append to the file."""
+        self.close()
+        self.verbose_count = 0
+        self.counts = Counter()
+        self.entries = []
+        if self.path is not None:
+            self._open("w")
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _render(self, details: Callable[[], str] | None) -> str | None:
+        if details is None or self.verbose_count >= self.verbose_limit:
+            return None
+        self.verbose_count += 1
+        return details()
+
+    def _write(self, message: str, details: str | None) -> None:
+        if self.path is None:
+            self.entries.append((message, details))
+            return
+        if self._file is None:
+            self._open("a")
+        self._file.write(f"{message}\n" if details is None else f"{message}\n{details}\n")
+
+    def _open(self, mode: str) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, mode, encoding="utf-8")  # pylint: disable=consider-using-with
+
+
+def format_summary(counts: Counter) -> str:
+    """Format entry counts as a table, most common first.
+
+    Args:
+        counts (Counter): counts keyed by (layer level, exception type, layer name)
+
+    Returns:
+        str: one line per key
+    """
+    return "".join(f"{count:>8}  {layer_level:<12} {exception:<24} {layer_name}\n"
+                   for (layer_level, exception, layer_name), count in counts.most_common())
@@ -1,22 +1,44 @@
-from datetime import datetime
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from scapy.utils import rdpcap
 from scapy.packet import Packet as ScapyPacket, Raw, NoPayload
 from scapy.layers.inet import IP, TCP, UDP, ICMP
-from scapy.layers.inet6 import IPv6, _ICMPv6, _ICMPv6NDGuessPayload
+from scapy.layers.inet6 import IPv6, _ICMPv6
 from scapy.layers.l2 import Ether, ARP, CookedLinux, ETHER_TYPES
 from scapy.layers.dns import DNS
 from scapy.layers.dhcp import DHCP, BOOTP
 
+from config import (
+    PARSE_BATCH_SIZE, PARSE_WORKERS, CHECKSUM_POLICY, CHECKSUM_SAMPLE_RATE, PARSE_MAX_LAYER,
+    PARSE_PROTOCOLS, SCAPY_LEAN
+)
 from utils.utils import convert_mac
 from components.packet import Packet
 from components.layer import Layer
-from packet_parser import parsers
+from packet_parser import parsers, checksum
+from packet_parser.pcap_reader import (
+    RecordHeader, RecordReader, index_records, read_records, dissect_record, is_compressed,
+    open_capture
+)
+from packet_parser.header_decoder import DecodedPacket
+from packet_parser.dissection_limit import DissectionLimit, PROTOCOL_CLASSES
+from packet_parser import lean_scapy
+from packet_parser.parser_log import ParserLog, format_summary
+from packet_parser.layer_classifier import classify
+from packet_parser.record_filter import RecordFilter
+from packet_parser.sampler import Sampler
+from packet_parser.follower import CaptureFollower
 from layers.layer_level import LayerLevel
 from layers import layers, properties
 
 
+if SCAPY_LEAN:
+    lean_scapy.enable()
+
+
 class ParsingError(Exception):
     """Failed to parse a packet."""
 
@@ -55,18 +77,111 @@ class UnsupportedLayerError(Exception):
         self.packet = layer
 
 
-class PcapParser:
+def _parse_shard(filename: str, headers: list[RecordHeader], options: dict,
+                 record_filter: RecordFilter | None, verbose_limits: list[int]
+                 ) -> tuple[list[Packet], list[tuple[list, Counter]]]:
+    """Parse a contiguous range of records in a worker process.
+
+    Args:
+        filename (str): path to the pcap file
+        headers (list[RecordHeader]): records to parse
+        options (dict): keyword arguments for PcapParser
+        record_filter (RecordFilter | None): records to skip, see PcapParser.iter_pcap
+        verbose_limits (list[int]): verbose budgets of the checksum, error and support logs,
+            what the parent has left of its own, see ParserLog.remaining
+
+    Returns:
+        tuple[list[Packet], list[tuple[list, Counter]]]: parsed packets, entries and counts of
+            the checksum, error and support logs
+    """
+    parser = PcapParser(**options, log_dir=None)
+    logs = (parser.checksum_log, parser.error_log, parser.support_log)
+    for log, verbose_limit in zip(logs, verbose_limits):
+        log.verbose_limit = verbose_limit
+    records = read_records(filename, headers)
+    if record_filter is not None:
+        records = record_filter.select(records)
+    parsed_packets = parser.parse_records(records)
+    return parsed_packets, [(log.entries, log.counts) for log in logs]
+
+
+def _mark_sampled(parsed_packets: Iterable[Packet], sampler: Sampler) -> Iterator[Packet]:
+    for parsed_packet in parsed_packets:
+        parsed_packet.sample_rate = sampler.rate
+        parsed_packet.sample_mode = sampler.mode
+        yield parsed_packet
+
+
+class PcapParser:  # pylint: disable=too-many-instance-attributes
     """Parses pcap files into custom packets."""
 
-    def __init__(self) -> None:
-        self.raw_packets = []
+    shard_size = 1000  # records per task in parallel mode
+    chunk_size = 256  # records whose checksums are verified in one batch
+
+    def __init__(self, fast_path: bool = True, checksum_policy: str = CHECKSUM_POLICY,
+                 checksum_sample_rate: int = CHECKSUM_SAMPLE_RATE,
+                 log_dir: str | None = "logs", max_layer: LayerLevel | str = PARSE_MAX_LAYER,
+                 protocols: list[str] | None = PARSE_PROTOCOLS) -> None:
+        """Initializes the parser.
+
+        Args:
+            fast_path (bool, optional): decode common headers without Scapy, see HeaderDecoder.
+                Defaults to True.
+            checksum_policy (str, optional): "full" verifies the checksums of every packet,
+                "sampled" of every checksum_sample_rate:th packet and "off" of none. Defaults
+                to CHECKSUM_POLICY from config.
+            checksum_sample_rate (int, optional): sampling interval for the "sampled" policy.
+                Defaults to CHECKSUM_SAMPLE_RATE from config.
+            log_dir (str | None, optional): directory of the checksum, error, support and
+                summary logs, None keeps the logs in memory. Defaults to "logs".
+            max_layer (LayerLevel | str, optional): last level to dissect, the levels after it
+                are RAW. Defaults to PARSE_MAX_LAYER from config.
+            protocols (list[str] | None, optional): protocols to dissect, a layer of any other
+                protocol is RAW with the levels after it, see DissectionLimit. None dissects all
+                protocols, or only the ones the parser understands if lean_scapy is enabled.
+                Defaults to PARSE_PROTOCOLS from config.
+
+        Raises:
+            ValueError: if the policy, the level or a protocol is unknown, or the sample rate is
+                not positive
+        """
+        if checksum_sample_rate < 1:
+            raise ValueError(f"Checksum sample rate must be positive, not {checksum_sample_rate}")
+        self.fast_path = fast_path
+        self.checksum_policy = checksum.ChecksumPolicy(checksum_policy)
+        self.checksum_sample_rate = checksum_sample_rate
+        if protocols is None and lean_scapy.enabled():
+            protocols = list(PROTOCOL_CLASSES)
+        self.limit = DissectionLimit(max_layer, protocols)
         self.parsed_packets = []
-        self.checksum_log = ""
-        self.error_log = ""
-        self.support_log = ""
-        Path("logs").mkdir(parents=True, exist_ok=True)
+        self.log_dir = log_dir
+        self.checksum_log = ParserLog(self._log_path("checksum.log"))
+        self.error_log = ParserLog(self._log_path("error.log"))
+        self.support_log = ParserLog(self._log_path("support.log"))
+
+    def _log_path(self, name: str) -> str | None:
+        return None if self.log_dir is None else str(Path(self.log_dir, name))
+
+    def _logs(self) -> tuple[ParserLog, ParserLog, ParserLog]:
+        return self.checksum_log, self.error_log, self.support_log
+
+    def _checks_packet(self, packet_number: int) -> bool:
+        """Check whether the checksum policy selects a packet for verification.
+
+        Sampling is based on the packet number, so the same packets are selected however the
+        file is parsed.
+
+        Args:
+            packet_number (int): Number of the packet
 
-    def verify_checksum(self, packet_number: int, layer) -> bool:
+        Returns:
+            bool: True if the checksums of the packet should be verified
+        """
+        if self.checksum_policy == checksum.ChecksumPolicy.SAMPLED:
+            return (packet_number - 1) % self.checksum_sample_rate == 0
+        return self.checksum_policy == checksum.ChecksumPolicy.FULL
+
+    def verify_checksum(self, packet_number: int, layer) -> bool | None:
         """Verify checksum of a layer.
 
         Logs a message if checksum verification fails.
@@ -76,72 +191,298 @@ class PcapParser:
             layer: a Scapy layer object
 
         Returns:
-            bool: True if checksum is valid, False otherwise
+            bool | None: True if checksum is valid, False otherwise, None if the checksum policy
+                skipped the packet
         """
-
-        if hasattr(layer, "chksum"):
-            checksum_attribute = "chksum"
-        elif hasattr(layer, "cksum"):
-            checksum_attribute = "cksum"
-        else:
-            return False
-
-        original_checksum = getattr(layer, checksum_attribute)
-        delattr(layer, checksum_attribute)
-        if not getattr(layer.__class__(bytes(layer)), checksum_attribute) == original_checksum:
-            msg = f"Packet {packet_number}: Checksum verification failed for {layer.summary()}\n"
-            self.checksum_log += msg
+        if not self._checks_packet(packet_number):
+            return None
+        if not checksum.verify_layer(layer):
+            layer_level = LayerLevel.NETWORK if isinstance(layer, IP) else LayerLevel.TRANSPORT
+            self.checksum_log.write(
+                (layer_level, "InvalidChecksum", layer.name),
+                f"Packet {packet_number}: Checksum verification failed for {layer.summary()}")
             return False
         return True
 
-    def parse_pcap(self, filename: str) -> list[Packet]:
+    def parse_pcap(self, filename: str, workers: int = 1,
+                   record_filter: RecordFilter | None = None) -> list[Packet]:
         """Parse pcap file into custom packets.
 
+        All packets are kept in memory, use iter_pcap or iter_batches for large files.
+
         Args:
             filename (str): path to the pcap file
+            workers (int, optional): number of worker processes, see iter_pcap. Defaults to 1.
+            record_filter (RecordFilter | None, optional): records to skip, see iter_pcap.
+                Defaults to None.
 
         Returns:
             list[Packet]: list of custom packets
         """
-
-        self.raw_packets = rdpcap(filename)
-        for packet_number, packet in enumerate(self.raw_packets, start=1):
-
-            parsed_packet = Packet(
-                datetime.fromtimestamp(
-                    float(
-                        packet.time)),
-                len(packet),
-                packet_number)
-
-            for layer_level, layer_parser in [
-                (LayerLevel.LINK, self.parse_link),
-                (LayerLevel.NETWORK, self.parse_network),
-                (LayerLevel.TRANSPORT, self.parse_transport),
-                (LayerLevel.APPLICATION, self.parse_application)
-            ]:
-                try:
-                    layer = layer_parser(packet_number, packet)
-                    parsed_packet.layers[layer_level] = layer
-                except ParsingError as e:
-                    parsed_packet.layers[layer_level] = Layer(
-                        layers.RAW(layer_level), len(packet), len(
-                            packet.payload))
-                    if isinstance(e.__cause__, UnsupportedLayerError):
-                        e.verbose = False
-                        self.support_log += f"{e}\n"
-                        self.support_log += f"PAYLOAD: {e.packet.payload.show(dump=True)}\n"
-                    else:
-                        self.error_log += f"{e}\n"
-                finally:
-                    packet = packet.payload
-            self.parsed_packets.append(parsed_packet)
-
-        Path("logs/support.log").write_text(self.support_log, encoding="utf-8")
-        Path("logs/checksum.log").write_text(self.checksum_log, encoding="utf-8")
-        Path("logs/error.log").write_text(self.error_log, encoding="utf-8")
+        self.parsed_packets = list(self.iter_pcap(filename, workers, record_filter))
         return self.parsed_packets
 
+    def iter_pcap(self, filename: str, workers: int = 1,
+                  record_filter: RecordFilter | None = None) -> Iterator[Packet]:
+        """Parse pcap file into custom packets, one record at a time.
+
+        Each Scapy packet is dropped as soon as it has been converted, so memory usage does not
+        depend on the size of the capture. The logs are started over and written as the parsing
+        goes, the summary is written when the generator is exhausted or closed.
+
+        With more than one worker, record boundaries are indexed first and the records are
+        dissected in a process pool, shard_size records per task. Packets are still yielded in
+        packet_number order. Compressed captures are decompressed as a stream, see open_capture,
+        and always parsed in this process.
+
+        Records that do not pass record_filter are skipped before they are decoded or dissected.
+        The packets keep their packet numbers from the capture. If record_filter is a Sampler,
+        the packets are marked with its rate and mode.
+
+        Args:
+            filename (str): path to the pcap file
+            workers (int, optional): number of worker processes. Defaults to 1.
+            record_filter (RecordFilter | None, optional): selects the records to parse, None
+                parses all of them. Defaults to None.
+
+        Yields:
+            Packet: custom packets in capture order
+        """
+        for log in self._logs():
+            log.open()
+        try:
+            if workers > 1 and not is_compressed(filename):
+                parsed_packets = self._iter_parallel(filename, workers, record_filter)
+            else:
+                parsed_packets = self._iter_serial(filename, record_filter)
+            if isinstance(record_filter, Sampler) and record_filter.rate > 1:
+                parsed_packets = _mark_sampled(parsed_packets, record_filter)
+            yield from parsed_packets
+        finally:
+            self.write_logs()
+
+    def follow(self, follower: CaptureFollower) -> Iterator[Packet]:
+        """Parse the records appended to followed capture files since the previous poll.
+
+        The logs are started over on the first poll of the follower and appended to after that.
+
+        Args:
+            follower (CaptureFollower): followed capture files
+
+        Yields:
+            Packet: custom packets in the order they were read
+        """
+        if follower.polls == 0:
+            for log in self._logs():
+                log.open()
+        try:
+            for records in batched(follower.poll(), self.chunk_size):
+                yield from self.parse_records(records)
+        finally:
+            self.write_logs()
+
+    def _iter_serial(self, filename: str,
+                     record_filter: RecordFilter | None) -> Iterator[Packet]:
+        with open_capture(filename) as file:
+            records = RecordReader(file)
+            if record_filter is not None:
+                records = record_filter.select(records)
+            for chunk in batched(records, self.chunk_size):
+                yield from self.parse_records(chunk)
+
+    def _iter_parallel(self, filename: str, workers: int,
+                       record_filter: RecordFilter | None) -> Iterator[Packet]:
+        headers = index_records(filename)
+        if record_filter is not None:
+            # the time is in the record header, the data of those records is not even read
+            headers = [header for header in headers if record_filter.matches_time(header)]
+        shards = [headers[i:i + self.shard_size] for i in range(0, len(headers), self.shard_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for shard in shards:
+                # the budget left now is an upper bound for what is left when the shard is
+                # merged, so the details kept are the same as in serial parsing
+                verbose_limits = [log.remaining() for log in self._logs()]
+                pending.append(executor.submit(
+                    _parse_shard, filename, shard, self._options(), record_filter,
+                    verbose_limits))
+                # keep a bounded number of shards in flight, results are consumed in order
+                if len(pending) >= 2 * workers:
+                    yield from self._merge_shard(*pending.popleft().result())
+            while pending:
+                yield from self._merge_shard(*pending.popleft().result())
+
+    def _options(self) -> dict:
+        # arguments for a parser with the same settings in a worker process
+        return {"fast_path": self.fast_path, "checksum_policy": self.checksum_policy,
+                "checksum_sample_rate": self.checksum_sample_rate,
+                "max_layer": self.limit.max_layer,
+                "protocols": None if self.limit.protocols is None else list(self.limit.protocols)}
+
+    def _merge_shard(self, parsed_packets: list[Packet],
+                     logs: list[tuple[list, Counter]]) -> list[Packet]:
+        for log, (entries, counts) in zip(self._logs(), logs):
+            log.merge(entries, counts)
+        return parsed_packets
+
+    def iter_batches(self, filename: str, batch_size: int = PARSE_BATCH_SIZE,
+                     workers: int = PARSE_WORKERS,
+                     record_filter: RecordFilter | None = None) -> Iterator[list[Packet]]:
+        """Parse pcap file into lists of custom packets, holding at most batch_size packets at a
+        time.
+
+        Args:
+            filename (str): path to the pcap file
+            batch_size (int, optional): maximum number of packets per batch.
+                Defaults to PARSE_BATCH_SIZE from config.
+            workers (int, optional): number of worker processes, see iter_pcap.
+                Defaults to PARSE_WORKERS from config.
+            record_filter (RecordFilter | None, optional): records to skip, see iter_pcap.
+                Defaults to None.
+
+        Raises:
+            ValueError: if batch_size is not positive
+
+        Yields:
+            list[Packet]: custom packets in capture order
+        """
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be positive, not {batch_size}")
+        batch = []
+        for parsed_packet in self.iter_pcap(filename, workers, record_filter):
+            batch.append(parsed_packet)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def parse_record(self, header: RecordHeader, data: bytes) -> Packet:
+        """Parse a single pcap record into a custom packet.
+
+        Common Ethernet/SLL, IP and TCP/UDP packets are decoded straight from the record bytes,
+        everything else is dissected with Scapy. Either way, the layers past the dissection limit
+        are RAW.
+
+        Args:
+            header (RecordHeader): record header
+            data (bytes): packet data
+
+        Returns:
+            Packet: custom packet
+        """
+        decoded = self.limit.decode(header, data) if self.fast_path else None
+        if decoded is None:
+            return self.parse_packet(
+                header.packet_number, self.limit.dissect(header, data), header.capture_id)
+        if self._checks_packet(header.packet_number):
+            results = [checksum.verify(job) for _, _, job in decoded.checksums]
+        else:
+            results = [None] * len(decoded.checksums)
+        return self._finish_record(header, data, decoded, results)
+
+    def parse_records(self, records: Iterable[tuple[RecordHeader, bytes]]) -> list[Packet]:
+        """Parse pcap records into custom packets, like parse_record.
+
+        The checksums of all packets decoded without Scapy and selected by the checksum policy
+        are verified in one batch.
+
+        Args:
+            records (Iterable[tuple[RecordHeader, bytes]]): record headers and packet data
+
+        Returns:
+            list[Packet]: custom packets in the same order
+        """
+        records = list(records)
+        decoded_packets = [self.limit.decode(header, data) if self.fast_path else None
+                           for header, data in records]
+        checked = [decoded is not None and self._checks_packet(header.packet_number)
+                   for (header, _), decoded in zip(records, decoded_packets)]
+        results = iter(checksum.verify_many(
+            [job for decoded, check in zip(decoded_packets, checked) if check
+             for _, _, job in decoded.checksums]).tolist())
+
+        parsed_packets = []
+        for (header, data), decoded, check in zip(records, decoded_packets, checked):
+            if decoded is None:
+                parsed_packets.append(self.parse_packet(
+                    header.packet_number, self.limit.dissect(header, data), header.capture_id))
+            else:
+                parsed_packets.append(self._finish_record(header, data, decoded, [
+                    next(results) if check else None for _ in decoded.checksums]))
+        return parsed_packets
+
+    def _finish_record(self, header: RecordHeader, data: bytes, decoded: DecodedPacket,
+                       results: list[bool | None]) -> Packet:
+        parsed_packet = Packet(
+            header.timestamp_ns, len(data), header.packet_number, header.capture_id)
+        parsed_packet.layers = decoded.layers
+        failures = []
+        for (layer_level, layer_class, _), checksum_valid in zip(decoded.checksums, results):
+            decoded.layers[layer_level].data["checksum_valid"] = checksum_valid
+            if checksum_valid is False:
+                failures.append((layer_level, layer_class))
+        if failures:
+            # failures are rare, so the summary is taken from a full dissection
+            packet = dissect_record(header, data)
+            for layer_level, layer_class in failures:
+                layer = packet[layer_class]
+                self.checksum_log.write(
+                    (layer_level, "InvalidChecksum", layer.name),
+                    f"Packet {header.packet_number}: Checksum verification failed for "
+                    f"{layer.summary()}")
+        return parsed_packet
+
+    def parse_packet(self, packet_number: int, packet: ScapyPacket,
+                     capture_id: int = 0) -> Packet:
+        """Parse a single Scapy packet into a custom packet.
+
+        Args:
+            packet_number (int): Number of the packet
+            packet (Packet): Scapy packet
+            capture_id (int, optional): id of the capture, see Packet. Defaults to 0.
+
+        Returns:
+            Packet: custom packet
+        """
+        # the time of a dissected record is exact, see dissect_record
+        parsed_packet = Packet(
+            round(packet.time * 1_000_000_000), len(packet), packet_number, capture_id)
+
+        for layer_level, found in zip(LayerLevel, classify(packet, len(LayerLevel))):
+            try:
+                layer = self.parse_layer(packet_number, layer_level, packet, found)
+                parsed_packet.layers[layer_level] = layer
+            except ParsingError as e:
+                parsed_packet.layers[layer_level] = Layer(
+                    layers.RAW(layer_level), len(packet), len(
+                        packet.payload))
+                self._log_parsing_error(layer_level, e)
+            finally:
+                packet = packet.payload
+        return parsed_packet
+
+    def _log_parsing_error(self, layer_level: LayerLevel, error: ParsingError) -> None:
+        # unsupported layers go to the support log, the packet dump is rendered lazily
+        error.verbose = False
+        key = (layer_level, type(error.__cause__).__name__, error.packet.name)
+        if isinstance(error.__cause__, UnsupportedLayerError):
+            self.support_log.write(
+                key, str(error), lambda: f"PAYLOAD: {error.packet.payload.show(dump=True)}")
+        else:
+            self.error_log.write(key, str(error), lambda: error.packet.show(dump=True))
+
+    def write_logs(self) -> None:
+        """Flush the checksum, error and support logs, and write the summary of their entries
+        next to them."""
+        for log in self._logs():
+            log.close()
+        if self.log_dir is not None:
+            Path(self.log_dir).mkdir(parents=True, exist_ok=True)
+            Path(self.log_dir, "summary.log").write_text(
+                format_summary(
+                    sum((log.counts for log in self._logs()), Counter())), encoding="utf-8")
+
     def parse_ether(self, ether_layer: Ether) -> tuple[layers.Ethernet, int, int]:
         """Parse an Ethernet layer.
 
@@ -264,20 +605,17 @@ class PcapParser:
         return layers.ICMP(properties.ICMPVersion.ICMPV4, icmp_type, icmp_code, seq, identifier,
                            checksum_valid), len(icmp_layer), len(icmp_layer.payload)
 
-    def parse_icmpv6(self, packet_number: int, packet: ScapyPacket) -> tuple[layers.ICMP, int, int]:
+    def parse_icmpv6(self, packet_number: int,
+                     icmp_layer: _ICMPv6) -> tuple[layers.ICMP, int, int]:
         """Parse an ICMPv6 layer.
 
         Args:
             packet_number (int): Number of the packet
-            packet (Packet): Scapy ICMPv6 packet
+            icmp_layer (_ICMPv6): any Scapy ICMPv6 message layer
 
         Returns:
             tuple[ICMP, int, int]: parsed ICMPv6 layer, total size, payload size in bytes
         """
-        for layer in packet:
-            if isinstance(layer, (_ICMPv6, _ICMPv6NDGuessPayload)):
-                icmp_layer = layer
-                break
         icmp_type = properties.ICMPv6Type(icmp_layer.type)
         icmp_code = properties.ICMPv6Code((icmp_type, getattr(icmp_layer, "code", None)))
         identifier = getattr(icmp_layer, "id", None)
@@ -286,110 +624,55 @@ class PcapParser:
         return layers.ICMP(properties.ICMPVersion.ICMPV6, icmp_type, icmp_code, seq, identifier,
                            checksum_valid), len(icmp_layer), len(icmp_layer.payload)
 
-    def parse_link(self, packet_number: int, packet: ScapyPacket) -> Layer:
-        """Parse a link layer.
+    def parse_layer(self, packet_number: int, layer_level: LayerLevel, packet: ScapyPacket,
+                    found: dict[type, ScapyPacket]) -> Layer:
+        """Parse a layer with the first parser of its level whose layer types were found.
 
         Args:
             packet_number (int): Number of the packet
-            packet (Packet): Scapy packet
-
-        Raises:
-            UnsupportedLayerError: Unsupported layer in the packet
-            ParsingError: Failed to parse the packet
-
-        Returns:
-            Layer: parsed link layer
-        """
-        try:
-            if Ether in packet:
-                return Layer(*self.parse_ether(packet[Ether]))
-            if CookedLinux in packet:
-                return Layer(*self.parse_sll(packet[CookedLinux]))
-            if isinstance(packet, (Raw, NoPayload, type(None))):
-                return Layer(layers.RAW(LayerLevel.LINK), len(packet), len(packet.payload))
-            raise UnsupportedLayerError(packet)
-        except Exception as e:
-            raise ParsingError(packet_number, "link", packet) from e
-
-    def parse_network(self, packet_number: int, packet: ScapyPacket) -> Layer:
-        """Parse a network layer.
-
-        Args:
-            packet_number (int): Number of the packet
-            packet (Packet): Scapy packet
-
-        Raises:
-            UnsupportedLayerError: Unsupported layer in the packet
-            ParsingError: Failed to parse the packet
-
-        Returns:
-            Layer: parsed network layer
-        """
-        try:
-            if IP in packet:
-                return Layer(*self.parse_ip(packet_number, packet[IP]))
-            if IPv6 in packet:
-                return Layer(*self.parse_ip(packet_number, packet[IPv6]))
-            if ARP in packet:
-                return Layer(*self.parse_arp(packet[ARP]))
-            if isinstance(packet, (Raw, NoPayload, type(None))):
-                return Layer(layers.RAW(LayerLevel.NETWORK), len(packet), len(packet.payload))
-            raise UnsupportedLayerError(packet)
-        except Exception as e:
-            raise ParsingError(packet_number, "network", packet) from e
-
-    def parse_transport(self, packet_number: int, packet: ScapyPacket) -> Layer:
-        """Parse a transport layer.
-
-        Args:
-            packet_number (int): Number of the packet
-            packet (Packet): Scapy packet
-
-        Raises:
-            UnsupportedLayerError: Unsupported layer in the packet
-            ParsingError: Failed to parse the packet
-
-        Returns:
-            Layer: parsed transport layer
-        """
-        try:
-            if TCP in packet:
-                return Layer(*self.parse_tcp(packet_number, packet[TCP]))
-            if UDP in packet:
-                return Layer(*self.parse_udp(packet_number, packet[UDP]))
-            if ICMP in packet:
-                return Layer(*self.parse_icmp(packet_number, packet[ICMP]))
-            if any(isinstance(layer, (_ICMPv6, _ICMPv6NDGuessPayload)) for layer in packet):
-                return Layer(*self.parse_icmpv6(packet_number, packet))
-            if isinstance(packet, (Raw, NoPayload, type(None))):
-                return Layer(layers.RAW(LayerLevel.TRANSPORT), len(packet), len(packet.payload))
-            raise UnsupportedLayerError(packet)
-        except Exception as e:
-            raise ParsingError(packet_number, "transport", packet) from e
-
-    def parse_application(self, packet_number: int, packet: ScapyPacket) -> Layer:
-        """Parse an application layer.
-
-        Args:
-            packet_number (int): Number of the packet
-            packet (Packet): Scapy packet
+            layer_level (LayerLevel): level of the layer
+            packet (Packet): Scapy packet, starting at the layer
+            found (dict[type, Packet]): layers at or below the layer, from classify
 
         Raises:
             UnsupportedLayerError: Unsupported layer in the packet
             ParsingError: Failed to parse the packet
 
         Returns:
-            Layer: parsed application layer
+            Layer: parsed layer
         """
         try:
-            if DNS in packet:
-                return Layer(*parsers.DNSParser.parse_dns(packet[DNS]))
-            if DHCP in packet and BOOTP in packet:
-                dhcp_layer = packet[DHCP]
-                bootp_layer = packet[BOOTP]
-                return Layer(*parsers.DHCPParser.parse_dhcp(bootp_layer, dhcp_layer))
-            if isinstance(packet, (Raw, NoPayload, type(None))):
-                return Layer(layers.RAW(LayerLevel.APPLICATION), len(packet), len(packet.payload))
+            for layer_types, layer_parser in self.layer_parsers[layer_level].items():
+                layers_found = [found.get(layer_type) for layer_type in layer_types]
+                if all(layer is not None for layer in layers_found):
+                    return Layer(*layer_parser(self, packet_number, *layers_found))
+            if isinstance(packet, (Raw, NoPayload)):
+                return Layer(layers.RAW(layer_level), len(packet), len(packet.payload))
             raise UnsupportedLayerError(packet)
         except Exception as e:
-            raise ParsingError(packet_number, "application", packet) from e
+            raise ParsingError(packet_number, layer_level, packet) from e
+
+    # type-keyed dispatch table, per level the first entry whose layer types are all found at or
+    # below the layer is parsed
+    layer_parsers = {
+        LayerLevel.LINK: {
+            (Ether,): lambda self, _, ether_layer: self.parse_ether(ether_layer),
+            (CookedLinux,): lambda self, _, sll_layer: self.parse_sll(sll_layer)
+        },
+        LayerLevel.NETWORK: {
+            (IP,): parse_ip,
+            (IPv6,): parse_ip,
+            (ARP,): lambda self, _, arp_layer: self.parse_arp(arp_layer)
+        },
+        LayerLevel.TRANSPORT: {
+            (TCP,): parse_tcp,
+            (UDP,): parse_udp,
+            (ICMP,): parse_icmp,
+            (_ICMPv6,): parse_icmpv6
+        },
+        LayerLevel.APPLICATION: {
+            (DNS,): lambda _, __, dns_layer: parsers.DNSParser.parse_dns(dns_layer),
+            (DHCP, BOOTP): lambda _, __, dhcp_layer, bootp_layer: parsers.DHCPParser.parse_dhcp(
+                bootp_layer, dhcp_layer)
+        }
+    }
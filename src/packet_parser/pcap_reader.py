@@ -0,0 +1,416 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import struct
+from typing import BinaryIO, Callable, Iterator, NamedTuple
+
+from scapy.config import conf
+from scapy.packet import Packet as ScapyPacket
+from scapy.utils import EDecimal
+
+from config import FILESIZE_LIMIT_BYTES
+
+
+PCAP_MAGICS = {
+    b"\xa1\xb2\xc3\xd4": (">", 1_000_000),  # big endian, microseconds
+    b"\xd4\xc3\xb2\xa1": ("<", 1_000_000),  # little endian, microseconds
+    b"\xa1\xb2\x3c\x4d": (">", 1_000_000_000),  # big endian, nanoseconds
+    b"\x4d\x3c\xb2\xa1": ("<", 1_000_000_000)  # little endian, nanoseconds
+}
+PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+PCAPNG_BYTE_ORDER = {
+    b"\x1a\x2b\x3c\x4d": ">",
+    b"\x4d\x3c\x2b\x1a": "<"
+}
+PCAPNG_IDB = 1
+PCAPNG_PB = 2
+PCAPNG_SPB = 3
+PCAPNG_EPB = 6
+DEFAULT_TSRESOL = 1_000_000
+COMPRESSION_MAGICS = {
+    b"\x1f\x8b": gzip.open,
+    b"\xfd7zXZ\x00": lzma.open,
+    b"BZh": bz2.open
+}
+
+
+class PcapFormatError(Exception):
+    """The file is not a valid pcap or pcapng capture."""
+
+
+class CaptureSizeError(Exception):
+    """The capture decompresses to more bytes than allowed."""
+
+
+class LimitedStream:
+    """Read-only stream that raises CaptureSizeError as soon as more than limit bytes have been
+    read from it."""
+
+    def __init__(self, stream: BinaryIO, limit: int) -> None:
+        self.stream = stream
+        self.limit = limit
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Read at most size bytes, all the rest if size is negative.
+
+        Args:
+            size (int, optional): maximum number of bytes. Defaults to -1.
+
+        Raises:
+            CaptureSizeError: if the limit is exceeded
+
+        Returns:
+            bytes: data read, empty at the end of the stream
+        """
+        data = self.stream.read(size if size < 0 else min(size, self.limit - self.position + 1))
+        self.position += len(data)
+        if self.position > self.limit:
+            raise CaptureSizeError(f"Capture exceeds the limit of {self.limit} bytes")
+        return data
+
+    def close(self) -> None:
+        """Close the underlying stream."""
+        self.stream.close()
+
+    def __enter__(self) -> "LimitedStream":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def _decompressor(filename: str) -> Callable | None:
+    with open(filename, "rb") as file:
+        magic = file.read(6)
+    for prefix, opener in COMPRESSION_MAGICS.items():
+        if magic.startswith(prefix):
+            return opener
+    return None
+
+
+def is_compressed(filename: str) -> bool:
+    """Check whether a capture file is gzip, xz or bz2 compressed, by its first bytes.
+
+    Args:
+        filename (str): path to the file
+
+    Returns:
+        bool: True if the file is compressed
+    """
+    return _decompressor(filename) is not None
+
+
+def open_capture(filename: str, limit_bytes: int = FILESIZE_LIMIT_BYTES) -> BinaryIO:
+    """Open a capture file for sequential reading.
+
+    gzip, xz and bz2 files are decompressed as they are read, so they are never expanded on
+    disk or in memory, and reading fails once more than limit_bytes have been decompressed.
+    Other files are opened as they are.
+
+    Args:
+        filename (str): path to the capture file
+        limit_bytes (int, optional): maximum decompressed size, 0 for none. Defaults to
+            FILESIZE_LIMIT_BYTES from config.
+
+    Returns:
+        BinaryIO: binary stream positioned at the start of the capture
+    """
+    opener = _decompressor(filename)
+    if opener is None:
+        return open(filename, "rb")  # pylint: disable=consider-using-with
+    if not limit_bytes:
+        return opener(filename, "rb")
+    return LimitedStream(opener(filename, "rb"), limit_bytes)
+
+
+class RecordHeader(NamedTuple):
+    """Location and metadata of a single packet record in a capture file."""
+
+    packet_number: int
+    offset: int  # file offset of the first byte of packet data
+    caplen: int
+    wirelen: int
+    timestamp_ns: int
+    linktype: int
+    capture_id: int = 0  # tells apart the files of a CaptureFollower, see Packet
+
+
+class RecordReader:
+    """Reads packet records from a pcap or pcapng stream one at a time, without dissecting them.
+
+    Packet data that is not read is skipped with a seek if the stream is a seekable file, and
+    read past otherwise, so the stream does not need to be seekable. Reading stops
+    quietly at a truncated record, leaving offset at the start of it, so reading can be resumed
+    once the rest of the file has been written.
+    """
+
+    def __init__(self, stream: BinaryIO, read_data: bool = True) -> None:
+        """Initializes the reader and consumes the file header.
+
+        Args:
+            stream (BinaryIO): binary stream positioned at the start of the capture
+            read_data (bool, optional): if False, packet data is skipped and None is returned in
+                its place. Defaults to True.
+
+        Raises:
+            PcapFormatError: if the stream is not a pcap or pcapng capture
+        """
+        self.stream = stream
+        self.read_data = read_data
+        self.offset = 0
+        self.packet_number = 0
+        self.endian = "<"
+        # (linktype, snaplen, tsresol) per interface, pcap files have exactly one
+        self.interfaces = []
+        # end of the file as last seen, None if skipping has to read, see _skip
+        self.end = 0 if _can_seek(stream) else None
+        magic = self._read(4)
+        if magic in PCAP_MAGICS:
+            self.pcapng = False
+            self._read_pcap_header(magic)
+        elif magic == PCAPNG_MAGIC:
+            self.pcapng = True
+            if not self._read_section_header(self._read(4)):
+                raise PcapFormatError("Invalid pcapng file (bad section header)")
+        else:
+            raise PcapFormatError(f"Not a pcap or pcapng file (bad magic: {magic!r})")
+
+    def __iter__(self) -> Iterator[tuple[RecordHeader, bytes | None]]:
+        """Iterate over the remaining records.
+
+        Yields:
+            tuple[RecordHeader, bytes | None]: record header, packet data
+        """
+        read_record = self._read_pcapng_record if self.pcapng else self._read_pcap_record
+        while (record := read_record()) is not None:
+            yield record
+
+    def resume(self, stream: BinaryIO) -> None:
+        """Continue reading from a new stream on the same file, from where reading stopped.
+
+        Args:
+            stream (BinaryIO): seekable binary stream of the file
+        """
+        stream.seek(self.offset)
+        self.stream = stream
+        self.end = 0 if _can_seek(stream) else None
+
+    def _read(self, size: int) -> bytes:
+        data = self.stream.read(size)
+        self.offset += len(data)
+        return data
+
+    def _skip(self, size: int) -> bool:
+        if size <= 0:
+            return True
+        if self.end is None:
+            return len(self._read(size)) == size
+        # seeking past the end does not fail, the end is looked up again as the file may grow
+        target = self.offset + size
+        if target > self.end:
+            self.stream.seek(0, os.SEEK_END)
+            self.end = self.stream.tell()
+        self.offset = min(target, self.end)
+        self.stream.seek(self.offset)
+        return target <= self.end
+
+    def _next_header(self, offset: int, caplen: int, wirelen: int, timestamp_ns: int,
+                     linktype: int) -> RecordHeader:
+        self.packet_number += 1
+        return RecordHeader(self.packet_number, offset, caplen, wirelen, timestamp_ns, linktype)
+
+    def _read_payload(self, caplen: int) -> tuple[bool, bytes | None]:
+        if self.read_data:
+            data = self._read(caplen)
+            return len(data) == caplen, data
+        return self._skip(caplen), None
+
+    def _read_pcap_header(self, magic: bytes) -> None:
+        self.endian, tsresol = PCAP_MAGICS[magic]
+        header = self._read(20)
+        if len(header) < 20:
+            raise PcapFormatError("Invalid pcap file (too short)")
+        _, _, _, _, snaplen, linktype = struct.unpack(self.endian + "HHIIII", header)
+        self.interfaces.append((linktype, snaplen, tsresol))
+
+    def _read_pcap_record(self) -> tuple[RecordHeader, bytes | None] | None:
+        start = self.offset
+        header = self._read(16)
+        if len(header) < 16:
+            self.offset = start
+            return None
+        sec, frac, caplen, wirelen = struct.unpack(self.endian + "IIII", header)
+        complete, data = self._read_payload(caplen)
+        if not complete:
+            self.offset = start
+            return None
+        linktype, _, tsresol = self.interfaces[0]
+        timestamp_ns = (sec * tsresol + frac) * 1_000_000_000 // tsresol
+        return self._next_header(start + 16, caplen, wirelen, timestamp_ns, linktype), data
+
+    def _read_section_header(self, raw_length: bytes) -> bool:
+        byte_order = self._read(4)
+        if len(raw_length) < 4 or byte_order not in PCAPNG_BYTE_ORDER:
+            return False
+        self.endian = PCAPNG_BYTE_ORDER[byte_order]
+        self.interfaces = []
+        block_length = struct.unpack(self.endian + "I", raw_length)[0]
+        return self._skip(block_length - 12)
+
+    def _read_pcapng_record(self) -> tuple[RecordHeader, bytes | None] | None:
+        while True:
+            start = self.offset
+            block_header = self._read(8)
+            if len(block_header) < 8:
+                break
+            if block_header[:4] == PCAPNG_MAGIC:
+                if not self._read_section_header(block_header[4:]):
+                    break
+                continue
+            block_type, block_length = struct.unpack(self.endian + "II", block_header)
+            if block_length < 12:
+                break
+            record = self._read_pcapng_block(block_type, block_length - 12)
+            if record is False:
+                break
+            if record is not None:
+                return record
+        self.offset = start
+        return None
+
+    def _read_pcapng_block(self, block_type: int, body_length: int):
+        """Read the body and trailer of one pcapng block.
+
+        Returns:
+            the record for packet blocks, None for other blocks and False if the block is truncated
+        """
+        block_readers = {
+            PCAPNG_IDB: self._read_interface_block,
+            PCAPNG_PB: self._read_enhanced_block,
+            PCAPNG_EPB: self._read_enhanced_block,
+            PCAPNG_SPB: self._read_simple_block
+        }
+        if block_type in block_readers:
+            return block_readers[block_type](block_type, body_length)
+        return None if self._skip(body_length + 4) else False
+
+    def _read_interface_block(self, _: int, body_length: int):
+        body = self._read(body_length)
+        if len(body) < body_length or len(body) < 8 or not self._skip(4):
+            return False
+        linktype, snaplen = struct.unpack(self.endian + "HxxI", body[:8])
+        self.interfaces.append((linktype, snaplen, self._read_tsresol(body[8:])))
+        return None
+
+    def _read_enhanced_block(self, block_type: int, body_length: int):
+        fixed = self._read(20)
+        if len(fixed) < 20:
+            return False
+        if block_type == PCAPNG_EPB:
+            interface_id, ts_high, ts_low, caplen, wirelen = struct.unpack(
+                self.endian + "5I", fixed)
+        else:  # obsolete Packet Block
+            interface_id, _, ts_high, ts_low, caplen, wirelen = struct.unpack(
+                self.endian + "HH4I", fixed)
+        return self._read_packet_block(
+            interface_id, (ts_high << 32) + ts_low, caplen, wirelen, body_length - 20)
+
+    def _read_simple_block(self, _: int, body_length: int):
+        fixed = self._read(4)
+        if len(fixed) < 4 or not self.interfaces:
+            return False
+        wirelen = struct.unpack(self.endian + "I", fixed)[0]
+        caplen = min(wirelen, self.interfaces[0][1] or wirelen)
+        return self._read_packet_block(0, None, caplen, wirelen, body_length - 4)
+
+    def _read_packet_block(self, interface_id: int, timestamp: int | None, caplen: int,
+                           wirelen: int, remaining: int):
+        if interface_id >= len(self.interfaces) or caplen > remaining:
+            return False
+        linktype, _, tsresol = self.interfaces[interface_id]
+        offset = self.offset
+        complete, data = self._read_payload(caplen)
+        if not complete or not self._skip(remaining - caplen + 4):
+            return False
+        # Simple Packet Blocks carry no timestamp
+        timestamp_ns = 0 if timestamp is None else timestamp * 1_000_000_000 // tsresol
+        return self._next_header(offset, caplen, wirelen, timestamp_ns, linktype), data
+
+    def _read_tsresol(self, options: bytes) -> int:
+        while len(options) >= 4:
+            code, length = struct.unpack(self.endian + "HH", options[:4])
+            if code == 0:
+                break
+            if code == 9 and length == 1 and len(options) >= 5:
+                tsresol = options[4]
+                return (2 if tsresol & 128 else 10) ** (tsresol & 127)
+            options = options[4 + length + (-length % 4):]
+        return DEFAULT_TSRESOL
+
+
+def _can_seek(stream: BinaryIO | mmap.mmap) -> bool:
+    # compressed streams seek by decompressing everything before the position, memory maps
+    # seek but do not say so
+    if isinstance(stream, (LimitedStream, gzip.GzipFile, bz2.BZ2File, lzma.LZMAFile)):
+        return False
+    return isinstance(stream, mmap.mmap) or stream.seekable()
+
+
+def index_records(filename: str) -> list[RecordHeader]:
+    """Find the location and metadata of every packet record in a capture file.
+
+    Packet data is skipped with seeks, so the index can be built without reading the packets.
+
+    Args:
+        filename (str): path to the pcap or pcapng file
+
+    Returns:
+        list[RecordHeader]: record headers in capture order
+    """
+    with open(filename, "rb") as file:
+        return [header for header, _ in RecordReader(file, read_data=False)]
+
+
+def read_records(filename: str,
+                 headers: list[RecordHeader]) -> Iterator[tuple[RecordHeader, bytes]]:
+    """Read the packet data of the given records.
+
+    Args:
+        filename (str): path to the pcap or pcapng file
+        headers (list[RecordHeader]): records to read, as returned by index_records
+
+    Yields:
+        tuple[RecordHeader, bytes]: record header, packet data
+    """
+    with open(filename, "rb") as file:
+        for header in headers:
+            file.seek(header.offset)
+            yield header, file.read(header.caplen)
+
+
+def dissect_record(header: RecordHeader, data: bytes,
+                   dissector: Callable[[type, bytes], ScapyPacket] | None = None) -> ScapyPacket:
+    """Dissect packet data with Scapy, the same way Scapy's own pcap readers do.
+
+    Args:
+        header (RecordHeader): record header
+        data (bytes): packet data
+        dissector (Callable[[type, bytes], Packet] | None, optional): builds the packet from the
+            link layer class and the data instead of the class itself, see DissectionLimit.
+            Defaults to None.
+
+    Returns:
+        Packet: Scapy packet with time and wirelen set from the record header
+    """
+    try:
+        layer_class = conf.l2types.num2layer[header.linktype]
+        packet = layer_class(data) if dissector is None else dissector(layer_class, data)
+    except Exception:  # pylint: disable=broad-exception-caught
+        # same fallback as Scapy: unknown link types and dissector crashes become Raw
+        packet = conf.raw_layer(data)
+    packet.time = EDecimal(header.timestamp_ns) / 1_000_000_000
+    packet.wirelen = header.wirelen
+    return packet
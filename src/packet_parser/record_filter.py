@@ -0,0 +1,259 @@
+import ipaddress
+import socket
+import struct
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, NamedTuple
+
+from packet_parser.pcap_reader import RecordHeader
+from packet_parser.header_decoder import (
+    LINKTYPE_ETHERNET, LINKTYPE_LINUX_SLL, ETHERTYPE_IPV4, ETHERTYPE_IPV6)
+
+
+LINKTYPE_RAW = 101
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+IPV6_EXTENSION_HEADERS = (0, 43, 60)  # hop-by-hop, routing, destination options
+IPPROTO_FRAGMENT = 44
+IPPROTO_AH = 51
+PORT_PROTOCOLS = (socket.IPPROTO_TCP, socket.IPPROTO_UDP, socket.IPPROTO_SCTP)
+
+
+class HeaderFields(NamedTuple):
+    """Header fields of a packet read by read_fields, None where the headers end too early or
+    the protocol does not have the field."""
+    ethertype: int | None = None
+    protocol: int | None = None
+    src_addr: bytes | None = None
+    dst_addr: bytes | None = None
+    src_port: int | None = None
+    dst_port: int | None = None
+
+
+def read_fields(linktype: int, data: bytes) -> HeaderFields:
+    """Read the ethertype, IP protocol, addresses and ports straight from the packet data.
+
+    VLAN tags and the common IPv6 extension headers are skipped. Ports are read only from the
+    first fragment of a fragmented packet.
+
+    Args:
+        linktype (int): link type of the record
+        data (bytes): packet data, the first hundred bytes or so are enough
+
+    Returns:
+        HeaderFields: header fields of the packet
+    """
+    ethertype, offset = _read_link(linktype, data)
+    if ethertype == ETHERTYPE_IPV4 and len(data) >= offset + 10:
+        if len(data) < offset + 20:
+            return HeaderFields(ethertype, data[offset + 9])
+        ihl = (data[offset] & 0x0F) * 4
+        protocol = data[offset + 9]
+        src_addr, dst_addr = data[offset + 12:offset + 16], data[offset + 16:offset + 20]
+        first_fragment = not struct.unpack_from("!H", data, offset + 6)[0] & 0x1FFF
+        transport = offset + ihl if first_fragment else None
+    elif ethertype == ETHERTYPE_IPV6 and len(data) >= offset + 40:
+        src_addr, dst_addr = data[offset + 8:offset + 24], data[offset + 24:offset + 40]
+        protocol, transport = _skip_extension_headers(data, data[offset + 6], offset + 40)
+    else:
+        return HeaderFields(ethertype)
+    ports = []
+    if protocol in PORT_PROTOCOLS and transport is not None:
+        # a segment cut short may still have the source port
+        ports = [struct.unpack_from("!H", data, port_offset)[0]
+                 for port_offset in (transport, transport + 2) if len(data) >= port_offset + 2]
+    return HeaderFields(ethertype, protocol, bytes(src_addr), bytes(dst_addr), *ports)
+
+
+def _read_link(linktype: int, data: bytes) -> tuple[int | None, int]:
+    # returns the ethertype and the offset of the network header
+    if linktype == LINKTYPE_ETHERNET and len(data) >= 14:
+        offset = 12
+        ethertype = struct.unpack_from("!H", data, offset)[0]
+        while ethertype in VLAN_ETHERTYPES and len(data) >= offset + 6:
+            offset += 4
+            ethertype = struct.unpack_from("!H", data, offset)[0]
+        return ethertype, offset + 2
+    if linktype == LINKTYPE_LINUX_SLL and len(data) >= 16:
+        return struct.unpack_from("!H", data, 14)[0], 16
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6) and data:
+        return {4: ETHERTYPE_IPV4, 6: ETHERTYPE_IPV6}.get(data[0] >> 4), 0
+    return None, 0
+
+
+def _skip_extension_headers(data: bytes, next_header: int,
+                            offset: int) -> tuple[int, int | None]:
+    # returns the upper layer protocol and its offset, None for the offset of a later fragment
+    while len(data) >= offset + 8:
+        if next_header in IPV6_EXTENSION_HEADERS:
+            next_header, offset = data[offset], offset + (data[offset + 1] + 1) * 8
+        elif next_header == IPPROTO_AH:
+            next_header, offset = data[offset], offset + (data[offset + 1] + 2) * 4
+        elif next_header == IPPROTO_FRAGMENT:
+            if struct.unpack_from("!H", data, offset + 2)[0] & 0xFFF8:
+                return data[offset], None
+            next_header, offset = data[offset], offset + 8
+        else:
+            break
+    return next_header, offset
+
+
+class RecordFilter:
+    """Selects packet records by their time and header fields before they are dissected.
+
+    A criterion left as None matches every packet, and a packet must match all the given
+    criteria. The address and port criteria match either the source or the destination. An
+    address can also be a network, matched by its prefix like analyzer.addresses.in_network
+    matches the parsed packets. A packet without the field a criterion needs, like an ARP packet
+    for an address or a later IP fragment for a port, does not match it.
+    """
+
+    def __init__(self, start: datetime | None = None, end: datetime | None = None,
+                 ethertypes: Iterable[int] | None = None, protocols: Iterable[int] | None = None,
+                 addresses: Iterable[str] | None = None,
+                 ports: Iterable[int] | None = None) -> None:
+        """Initializes the filter.
+
+        Args:
+            start (datetime | None, optional): earliest packet time, UTC if naive.
+                Defaults to None.
+            end (datetime | None, optional): latest packet time, UTC if naive.
+                Defaults to None.
+            ethertypes (Iterable[int] | None, optional): ethertypes, like 0x0800 for IPv4.
+                Defaults to None.
+            protocols (Iterable[int] | None, optional): IP protocol numbers, like 6 for TCP.
+                Defaults to None.
+            addresses (Iterable[str] | None, optional): IPv4 or IPv6 addresses or networks, like
+                "10.0.0.0/8". Defaults to None.
+            ports (Iterable[int] | None, optional): TCP, UDP or SCTP ports. Defaults to None.
+
+        Raises:
+            ValueError: if an address is not a valid IP address or network
+        """
+        self.start_ns = None if start is None else _to_ns(start)
+        self.end_ns = None if end is None else _to_ns(end)
+        self.ethertypes = None if ethertypes is None else frozenset(ethertypes)
+        self.protocols = None if protocols is None else frozenset(protocols)
+        networks = None if addresses is None else [
+            ipaddress.ip_network(address) for address in addresses]
+        self.addresses = None if networks is None else frozenset(
+            network.network_address.packed for network in networks
+            if network.prefixlen == network.max_prefixlen)
+        # netmask, network address and address length in bytes of each network
+        self.networks = () if networks is None else tuple(
+            (int(network.netmask), int(network.network_address), network.max_prefixlen // 8)
+            for network in networks if network.prefixlen < network.max_prefixlen)
+        self.ports = None if ports is None else frozenset(ports)
+
+    def matches_time(self, header: RecordHeader) -> bool:
+        """Check whether the time of a packet record is within the filter's time range.
+
+        Args:
+            header (RecordHeader): record header
+
+        Returns:
+            bool: True if the packet is not too early or too late
+        """
+        return (self.start_ns is None or header.timestamp_ns >= self.start_ns) \
+            and (self.end_ns is None or header.timestamp_ns <= self.end_ns)
+
+    def matches(self, header: RecordHeader, data: bytes) -> bool:
+        """Check whether a packet record passes the filter.
+
+        Args:
+            header (RecordHeader): record header
+            data (bytes): packet data
+
+        Returns:
+            bool: True if the packet matches all the criteria
+        """
+        if not self.matches_time(header):
+            return False
+        if self.ethertypes is None and self.protocols is None and self.addresses is None \
+                and self.ports is None:
+            return True
+        fields = read_fields(header.linktype, data)
+        return (self.ethertypes is None or fields.ethertype in self.ethertypes) \
+            and (self.protocols is None or fields.protocol in self.protocols) \
+            and (self.addresses is None or self._matches_address(fields.src_addr)
+                 or self._matches_address(fields.dst_addr)) \
+            and (self.ports is None or fields.src_port in self.ports
+                 or fields.dst_port in self.ports)
+
+    def _matches_address(self, address: bytes | None) -> bool:
+        if address is None:
+            return False
+        if address in self.addresses:
+            return True
+        value = int.from_bytes(address)
+        return any(len(address) == size and value & netmask == network_address
+                   for netmask, network_address, size in self.networks)
+
+    def select(self, records: Iterable[tuple[RecordHeader, bytes]]
+               ) -> Iterator[tuple[RecordHeader, bytes]]:
+        """Drop the records that do not pass the filter.
+
+        Args:
+            records (Iterable[tuple[RecordHeader, bytes]]): record headers and packet data
+
+        Yields:
+            tuple[RecordHeader, bytes]: matching records, packet numbers are left as they are
+        """
+        for header, data in records:
+            if self.matches(header, data):
+                yield header, data
+
+
+def _to_ns(time: datetime) -> int:
+    # naive times are UTC, like the packet times
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    # whole seconds and microseconds separately, a float would lose the nanosecond precision
+    return int(time.replace(microsecond=0).timestamp()) * 1_000_000_000 + time.microsecond * 1000
+
+
+def parse_filter(start: str = "", end: str = "", ethertypes: str = "", protocols: str = "",
+                 addresses: str = "", ports: str = "") -> RecordFilter | None:
+    """Build a filter from text, like the fields of the open dialog. Empty fields match every
+    packet, and lists are separated by commas or whitespace.
+
+    Args:
+        start (str, optional): earliest time in ISO format, UTC unless it has an
+            offset, like "2024-04-01 12:00". Defaults to "".
+        end (str, optional): latest time in ISO format, UTC unless it has an offset.
+            Defaults to "".
+        ethertypes (str, optional): numbers, like "0x0800, 0x86dd". Defaults to "".
+        protocols (str, optional): numbers or names, like "tcp, 17". Defaults to "".
+        addresses (str, optional): IPv4 or IPv6 addresses or networks, like "10.0.0.0/8, ::1".
+            Defaults to "".
+        ports (str, optional): port numbers. Defaults to "".
+
+    Raises:
+        ValueError: if a field cannot be read
+
+    Returns:
+        RecordFilter | None: the filter, None if every field is empty
+    """
+    if not any(field.strip() for field in (start, end, ethertypes, protocols, addresses, ports)):
+        return None
+    return RecordFilter(
+        datetime.fromisoformat(start.strip()) if start.strip() else None,
+        datetime.fromisoformat(end.strip()) if end.strip() else None,
+        _split(ethertypes, lambda value: int(value, 0)),
+        _split(protocols, _protocol_number),
+        _split(addresses, str),
+        _split(ports, int))
+
+
+def _split(field: str, convert) -> list | None:
+    values = field.replace(",", " ").split()
+    return [convert(value) for value in values] if values else None
+
+
+def _protocol_number(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    try:
+        return getattr(socket, f"IPPROTO_{value.upper()}")
+    except AttributeError as e:
+        raise ValueError(f"Unknown IP protocol: {value}") from e
@@ -0,0 +1,133 @@
+import mmap
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+from scapy.packet import Packet as ScapyPacket
+# registers the same dissectors as the parser, so lazily dissected packets match the parsed ones
+from scapy.layers import l2, inet, inet6, dns, dhcp  # pylint: disable=unused-import
+
+from packet_parser.pcap_reader import PcapFormatError, RecordHeader, RecordReader, dissect_record
+
+
+class RecordIndex:
+    """Random access by packet number to the records of a pcap or pcapng file.
+
+    The file is memory-mapped and scanned once. Offsets, lengths and metadata of the records are
+    kept in NumPy arrays, 26 bytes per packet. Packet data is returned as views of the map,
+    without copying, and dissected only on request.
+
+    Views returned by data and records must be released before the index is closed.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """Maps the file and indexes its records.
+
+        Args:
+            filename (str): path to the pcap or pcapng file
+
+        Raises:
+            PcapFormatError: if the file is not a pcap or pcapng capture
+        """
+        if Path(filename).stat().st_size == 0:
+            raise PcapFormatError("Not a pcap or pcapng file (empty)")
+        with open(filename, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # offset, caplen, wirelen, timestamp_ns, linktype
+        columns = [array("q"), array("I"), array("I"), array("q"), array("H")]
+        try:
+            for header, _ in RecordReader(self._map, read_data=False):
+                for column, value in zip(columns, header[1:]):
+                    column.append(value)
+        except PcapFormatError:
+            self._map.close()
+            raise
+        self.offsets, self.caplens, self.wirelens, self.timestamps_ns, self.linktypes = (
+            np.frombuffer(column, dtype=column.typecode) for column in columns)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __enter__(self) -> "RecordIndex":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def header(self, packet_number: int) -> RecordHeader:
+        """Get the header of a record.
+
+        Args:
+            packet_number (int): number of the packet, starting from 1
+
+        Raises:
+            IndexError: if the capture has no such packet
+
+        Returns:
+            RecordHeader: record header
+        """
+        if not 1 <= packet_number <= len(self):
+            raise IndexError(f"No packet {packet_number} in the capture")
+        i = packet_number - 1
+        return RecordHeader(packet_number, int(self.offsets[i]), int(self.caplens[i]),
+                            int(self.wirelens[i]), int(self.timestamps_ns[i]),
+                            int(self.linktypes[i]))
+
+    def data(self, packet_number: int) -> memoryview:
+        """Get the packet data of a record without copying it.
+
+        Args:
+            packet_number (int): number of the packet, starting from 1
+
+        Raises:
+            IndexError: if the capture has no such packet
+
+        Returns:
+            memoryview: read-only view of the packet data in the map
+        """
+        header = self.header(packet_number)
+        return memoryview(self._map)[header.offset:header.offset + header.caplen]
+
+    def dissect(self, packet_number: int) -> ScapyPacket:
+        """Dissect a record with Scapy.
+
+        Args:
+            packet_number (int): number of the packet, starting from 1
+
+        Raises:
+            IndexError: if the capture has no such packet
+
+        Returns:
+            Packet: Scapy packet
+        """
+        header = self.header(packet_number)
+        return dissect_record(header, self._map[header.offset:header.offset + header.caplen])
+
+    def records(self, packet_numbers: Iterable[int] | None = None
+                ) -> Iterator[tuple[RecordHeader, memoryview]]:
+        """Iterate over records without copying their packet data.
+
+        Args:
+            packet_numbers (Iterable[int] | None, optional): packets to read, in the given
+                order. Defaults to None, which reads all packets in capture order.
+
+        Raises:
+            IndexError: if the capture has no such packet
+
+        Yields:
+            tuple[RecordHeader, memoryview]: record header, view of the packet data
+        """
+        if packet_numbers is None:
+            packet_numbers = range(1, len(self) + 1)
+        view = memoryview(self._map)
+        try:
+            for packet_number in packet_numbers:
+                header = self.header(packet_number)
+                yield header, view[header.offset:header.offset + header.caplen]
+        finally:
+            view.release()
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._map.close()
@@ -0,0 +1,116 @@
+import zlib
+
+from packet_parser.pcap_reader import RecordHeader
+from packet_parser.record_filter import RecordFilter, HeaderFields, read_fields
+
+
+SAMPLING_MODES = ("packet", "flow")
+
+
+class Sampler(RecordFilter):
+    """Keeps a sample of the packet records, before they are dissected.
+
+    In the "packet" mode, every rate-th packet of the capture is kept, starting from the first.
+    In the "flow" mode, a packet is kept if its flow hashes into one of rate buckets, so the
+    packets of a conversation are kept or dropped together, in both directions. Packets without
+    IP addresses, like ARP, have no flow and are sampled by packet number in both modes.
+
+    A filter given to the sampler is applied first, and the sample is taken from the packets
+    that pass it. Each kept packet stands for rate packets of the capture, see analyzer.sampling.
+    """
+
+    def __init__(self, rate: int, mode: str = "packet",
+                 record_filter: RecordFilter | None = None) -> None:
+        """Initializes the sampler.
+
+        Args:
+            rate (int): one packet or flow in rate is kept
+            mode (str, optional): "packet" or "flow". Defaults to "packet".
+            record_filter (RecordFilter | None, optional): filter to apply before sampling.
+                Defaults to None.
+
+        Raises:
+            ValueError: if the rate is not positive or the mode is unknown
+        """
+        if rate < 1:
+            raise ValueError(f"Sampling rate must be positive, not {rate}")
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {mode}")
+        super().__init__()
+        self.rate = rate
+        self.mode = mode
+        self.record_filter = record_filter
+
+    def matches_time(self, header: RecordHeader) -> bool:
+        """Check whether the time of a packet record passes the filter given to the sampler.
+
+        Args:
+            header (RecordHeader): record header
+
+        Returns:
+            bool: True if there is no filter or the time is within its range
+        """
+        return self.record_filter is None or self.record_filter.matches_time(header)
+
+    def matches(self, header: RecordHeader, data: bytes) -> bool:
+        """Check whether a packet record passes the filter and is in the sample.
+
+        Args:
+            header (RecordHeader): record header
+            data (bytes): packet data
+
+        Returns:
+            bool: True if the packet is kept
+        """
+        if self.record_filter is not None and not self.record_filter.matches(header, data):
+            return False
+        if self.mode == "flow":
+            key = flow_key(read_fields(header.linktype, data))
+            if key is not None:
+                return zlib.crc32(key) % self.rate == 0
+        return (header.packet_number - 1) % self.rate == 0
+
+
+def flow_key(fields: HeaderFields) -> bytes | None:
+    """Build a key that is the same for both directions of a flow.
+
+    The flow is identified by the IP protocol, and the address and port of both ends. Ports are
+    left out of later fragments and protocols without ports, see read_fields.
+
+    Args:
+        fields (HeaderFields): header fields of a packet
+
+    Returns:
+        bytes | None: key of the flow, None if the packet has no IP addresses
+    """
+    if fields.src_addr is None:
+        return None
+    ends = sorted((
+        fields.src_addr + (fields.src_port or 0).to_bytes(2, "big"),
+        fields.dst_addr + (fields.dst_port or 0).to_bytes(2, "big")))
+    return bytes([fields.protocol]) + ends[0] + ends[1]
+
+
+def parse_sampling(rate: str = "", mode: str = "",
+                   record_filter: RecordFilter | None = None) -> RecordFilter | None:
+    """Build a sampler from text, like the fields of the open dialog.
+
+    Args:
+        rate (str, optional): one packet or flow in rate is kept, empty or 1 keeps all of them.
+            Defaults to "".
+        mode (str, optional): "packet" or "flow", empty for "packet". Defaults to "".
+        record_filter (RecordFilter | None, optional): filter to apply before sampling.
+            Defaults to None.
+
+    Raises:
+        ValueError: if a field cannot be read
+
+    Returns:
+        RecordFilter | None: the sampler, or record_filter as it is if nothing is sampled
+    """
+    mode = mode.strip().lower() or SAMPLING_MODES[0]
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode: {mode}")
+    if not rate.strip() or int(rate) == 1:
+        return record_filter
+    return Sampler(int(rate), mode, record_filter)
@@ -0,0 +1,70 @@
+import pandas as pd
+
+from storage.database import DBStorage, concat_frames
+
+
+class Chunks:
+    """Packets kept as a list of DataFrames, one per appended file, set of files or poll.
+
+    A chunk is adjusted once as it is added, see DBStorage.adjust_dtypes, and not changed after
+    that, so adding one does not touch the packets already kept. The chunks are concatenated
+    when all the packets are needed, once after each change.
+    """
+
+    __slots__ = ("chunks", "_frame")
+
+    def __init__(self, frame: pd.DataFrame | None = None) -> None:
+        """Initializes the chunks.
+
+        Args:
+            frame (pd.DataFrame | None, optional): adjusted DataFrame to start with. Defaults to
+                None.
+        """
+        frame = pd.DataFrame() if frame is None else frame
+        self.chunks: list[pd.DataFrame] = [frame] if len(frame) else []
+        self._frame: pd.DataFrame | None = frame
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def append(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Adjust the rows and add them as a chunk.
+
+        Args:
+            df (pd.DataFrame): rows to add
+
+        Returns:
+            pd.DataFrame: the added chunk
+        """
+        chunk = DBStorage.adjust_dtypes(df)
+        self.chunks.append(chunk)
+        self._frame = None
+        return chunk
+
+    def frame(self) -> pd.DataFrame:
+        """Get all the packets, see DBStorage.concat_adjusted.
+
+        Returns:
+            pd.DataFrame: the chunks concatenated
+        """
+        if self._frame is None:
+            self._frame = DBStorage.concat_adjusted(self.chunks)
+        return self._frame
+
+    def rows(self, start: int, count: int) -> pd.DataFrame:
+        """Get some of the packets, concatenating only the chunks they are in.
+
+        Args:
+            start (int): position of the first packet
+            count (int): number of packets
+
+        Returns:
+            pd.DataFrame: the packets
+        """
+        rows = []
+        for chunk in self.chunks:
+            if count > 0 and start < len(chunk):
+                rows.append(chunk.iloc[start:start + count])
+                count -= len(rows[-1])
+            start = max(0, start - len(chunk))
+        return concat_frames(rows) if rows else pd.DataFrame()
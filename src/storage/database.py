@@ -1,16 +1,21 @@
 import sqlite3
 import json
-from uuid import UUID
 from pathlib import Path
 
 import pandas as pd
 import numpy as np
+from dateutil.tz import tzlocal
+from pandas.api.types import union_categoricals
 
-from layers.layers import LAYERS
+from layers.layer_level import LayerLevel
+from layers.layers import LAYERS, IP
+from layers.ip import PACKED_DTYPES
 from layers.properties import PROPERTIES
 from storage.storage import Storage
 
 
+# nullable booleans, NA means that the checksum was not checked (or IPv6, which has none) and is
+# kept apart from False, which means that it was checked and found invalid
 BOOLEAN_COLUMNS = [
     "NETWORK.IP.data.checksum_valid",
     "TRANSPORT.TCP.data.checksum_valid",
@@ -18,6 +23,21 @@ BOOLEAN_COLUMNS = [
     "TRANSPORT.ICMP.data.checksum_valid"
 ]
 
+# text columns that repeat a few values over and over, like the layer names and the addresses and
+# names declared as str or bytes fields, are dictionary encoded: pandas Categoricals store each
+# value once, and a code of the value for each row
+CATEGORY_COLUMNS = [f"{layer_level}.layer_name" for layer_level in LayerLevel] + [
+    f"{layer.layer_type}.{layer.layer_name}.data.{key}"
+    for layer in LAYERS for key, field_type in layer.fields.items() if field_type in (str, bytes)]
+
+# IP addresses as unsigned integers, see PACKED_DTYPES. SQLite integers are signed 64 bit, so the
+# UInt64 columns are saved as text.
+PACKED_COLUMNS = {f"{IP.layer_type}.{IP.layer_name}.data.{key}": dtype
+                  for key, dtype in PACKED_DTYPES.items()}
+
+# packet.time is kept in UTC with the nanoseconds of the capture, and saved as epoch nanoseconds
+TIME_DTYPE = "datetime64[ns, UTC]"
+
 
 class DBStorage(Storage):
     """SQLite database storage backend."""
@@ -29,7 +49,6 @@ class DBStorage(Storage):
         self.conn = sqlite3.connect(filename, detect_types=sqlite3.PARSE_DECLTYPES)
         self.dtype = self._build_dtypes()
         self._register_properties()
-        self._register_uuid()
         self._register_json()
         self._create_slot_table()
 
@@ -45,7 +64,9 @@ class DBStorage(Storage):
         """Adjusts the data types of the DataFrame.
 
         Because of the way the data is stored in the database, some columns need to be converted
-        to the correct data type.
+        to the correct data type. The columns of CATEGORY_COLUMNS become categoricals, whose
+        categories are left as they are, the columns of PACKED_COLUMNS get their dtypes, and
+        packet.time becomes TIME_DTYPE.
 
         Args:
             df (pd.DataFrame): DataFrame to adjust
@@ -56,7 +77,48 @@ class DBStorage(Storage):
         for col in BOOLEAN_COLUMNS:
             if col in df:
                 df[col] = df[col].astype("boolean")
-        return df.replace({"": pd.NA, None: pd.NA, np.nan: pd.NA}).convert_dtypes()
+        for col in CATEGORY_COLUMNS:
+            if col in df:
+                df[col] = _as_category(df[col])
+        for col, dtype in PACKED_COLUMNS.items():
+            if col in df:
+                df[col] = _as_packed(df[col], dtype)
+        if "packet.time" in df:
+            df["packet.time"] = _as_time(df["packet.time"])
+        kept = [col for col in df if isinstance(df[col].dtype, pd.CategoricalDtype)
+                or col in PACKED_COLUMNS or col == "packet.time"]
+        adjusted = df.drop(columns=kept).replace(
+            {"": pd.NA, None: pd.NA, np.nan: pd.NA}).convert_dtypes()
+        for col in kept:  # back to their places, in order
+            adjusted.insert(df.columns.get_loc(col), col, df[col])
+        return adjusted
+
+    @classmethod
+    def concat_adjusted(cls, frames: list[pd.DataFrame]) -> pd.DataFrame:
+        """Concatenate DataFrames that have already been adjusted.
+
+        Gives the same result as adjusting the concatenated DataFrame, but only adjusts the
+        columns that are missing from some of the frames, differ in type between them or are all
+        NA in some of them (concat fills those with NaN).
+
+        Args:
+            frames (list[pd.DataFrame]): adjusted DataFrames, at least one
+
+        Returns:
+            pd.DataFrame: adjusted DataFrame with the rows of all the frames
+        """
+        if len(frames) == 1:
+            return frames[0]
+        combined = concat_frames(frames)
+        dtypes = [frame.dtypes for frame in frames]
+        # all NA: no value to count
+        empty = set().union(*(frame.columns[frame.count().to_numpy() == 0] for frame in frames))
+        columns = [col for col in combined
+                   if col in empty or any(col not in types for types in dtypes)
+                   or len({types[col] for types in dtypes}) > 1]
+        if columns:
+            combined[columns] = cls.adjust_dtypes(combined[columns])
+        return combined
 
     def _create_slot_table(self) -> None:
         cursor = self.conn.cursor()
@@ -104,6 +166,11 @@ class DBStorage(Storage):
         if new and self.slot_exists(name):
             raise ValueError(f"Slot {name} already exists.")
         slot = self._get_slot_id(name)
+        dtypes = {col: "string" for col, dtype in PACKED_COLUMNS.items()
+                  if col in data and dtype == "UInt64"}
+        if "packet.time" in data:
+            dtypes["packet.time"] = "int64"
+        data = data.astype(dtypes)
         data.to_sql(slot, self.conn, if_exists="replace", dtype=self.dtype)
 
     def load(self, name: str) -> pd.DataFrame:
@@ -116,7 +183,13 @@ class DBStorage(Storage):
             pd.DataFrame: loaded DataFrame
         """
         slot = self._get_slot_id(name)
-        df = pd.read_sql(f"SELECT * FROM {slot};", self.conn, index_col="packet.uid")
+        df = pd.read_sql(f"SELECT * FROM {slot};", self.conn)
+        if "packet.uid" in df:
+            # saved before the packets had ids, they are numbered as one capture in saved order
+            df = df.drop(columns="packet.uid")
+            df["packet.id"] = range(1, len(df) + 1)
+        # details are rendered from the columns, see format_details
+        df = df.set_index("packet.id").drop(columns="packet.str", errors="ignore")
         return self.adjust_dtypes(df)
 
     def list_slots(self) -> list[str]:
@@ -141,25 +214,12 @@ class DBStorage(Storage):
         cursor.execute("DELETE FROM slots WHERE name = ?;", [name])
         self.conn.commit()
 
-    @classmethod
-    def _register_uuid(cls) -> None:
-        sqlite3.register_adapter(UUID, cls._adapt_uuid)
-        sqlite3.register_converter('uuid', cls._convert_uuid)
-
     @classmethod
     def _register_json(cls) -> None:
         sqlite3.register_adapter(list, cls._adapt_list)
         sqlite3.register_adapter(dict, cls._adapt_dict)
         sqlite3.register_converter('TEXT', cls._convert_text)
 
-    @staticmethod
-    def _adapt_uuid(uuid_obj: UUID) -> bytes:
-        return uuid_obj.bytes
-
-    @staticmethod
-    def _convert_uuid(b: bytes) -> UUID:
-        return UUID(bytes=b)
-
     @staticmethod
     def _adapt_list(list_obj) -> bytes:
         return json.dumps(list_obj).encode('utf-8')
@@ -182,10 +242,69 @@ class DBStorage(Storage):
         for layer in LAYERS:
             for key, value in layer.dtypes.items():
                 dtype[f"{layer.layer_type}.{layer.layer_name}.data.{key}"] = value.__name__
-        dtype["packet.uid"] = "uuid"
+        dtype["packet.id"] = "INTEGER"
         return dtype
 
     @staticmethod
     def _register_properties() -> None:
         for prop in PROPERTIES:
             prop.register()
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate DataFrames, keeping the categorical columns categorical.
+
+    pd.concat turns a categorical column into objects unless its categories are the same in every
+    frame, so each categorical column is given the union of the categories first.
+
+    Args:
+        frames (list[pd.DataFrame]): DataFrames to concatenate
+
+    Returns:
+        pd.DataFrame: concatenated DataFrame
+    """
+    frames = list(frames)
+    columns = dict.fromkeys(col for frame in frames for col, dtype in frame.dtypes.items()
+                            if isinstance(dtype, pd.CategoricalDtype))
+    for col in columns:
+        values = [frame[col] for frame in frames if col in frame]
+        if not all(isinstance(value.dtype, pd.CategoricalDtype) for value in values):
+            continue  # concat gives objects, adjust_dtypes makes them categorical again
+        categories = union_categoricals(values).categories
+        for i, frame in enumerate(frames):
+            if col in frame and not frame[col].cat.categories.equals(categories):
+                frames[i] = frame = frame.copy(deep=False)
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames)
+
+
+def _as_packed(values: pd.Series, dtype: str) -> pd.Series:
+    # the numbers may come back from the database as text, or as floats if some are missing
+    if values.dtype == dtype:
+        return values
+    if values.dtype == object:
+        return pd.Series(pd.array([pd.NA if pd.isna(value) else int(value) for value in values],
+                                  dtype=dtype), index=values.index, name=values.name)
+    return values.astype(dtype)
+
+
+def _as_time(values: pd.Series) -> pd.Series:
+    # saved as epoch nanoseconds, or as local time before the times were kept in UTC
+    if values.dtype == TIME_DTYPE:
+        return values
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return pd.Series(pd.array(values.to_numpy(dtype=np.int64), dtype=TIME_DTYPE),
+                         index=values.index, name=values.name)
+    # an hour repeated when daylight saving time ends is taken as standard time
+    local = pd.to_datetime(values).dt.tz_localize(
+        tzlocal(), ambiguous=np.zeros(len(values), dtype=bool), nonexistent="shift_forward")
+    return local.dt.tz_convert("UTC")
+
+
+def _as_category(values: pd.Series) -> pd.Series:
+    # empty values are missing, like in the other columns
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("object").where(values.notna(), None).astype("category")
+    if "" in values.cat.categories:
+        values = values.cat.remove_categories([""])
+    return values
@@ -0,0 +1,142 @@
+import hashlib
+import pickle
+from pathlib import Path
+
+import pandas as pd
+from scapy import VERSION as SCAPY_VERSION
+
+from config import (
+    CHECKSUM_POLICY, CHECKSUM_SAMPLE_RATE, PARSE_CACHE_DIR, PARSE_CACHE_LIMIT_BYTES,
+    PARSE_MAX_LAYER, PARSE_PROTOCOLS, SCAPY_LEAN
+)
+
+
+# packages under src whose code decides what a parsed capture looks like, storage for the
+# dtypes the frames are adjusted to
+PARSER_PACKAGES = ["packet_parser", "layers", "components", "utils", "storage"]
+
+
+def parser_version(src: Path | None = None) -> str:
+    """Fingerprint the parser: its source code, the layer configs, the Scapy version, and the
+    checksum, dissection limit and lean Scapy settings.
+
+    Any change to them gives a new version, which invalidates the cached captures.
+
+    Args:
+        src (Path | None, optional): directory of PARSER_PACKAGES. Defaults to the src directory
+            of this module.
+
+    Returns:
+        str: version string
+    """
+    src = src or Path(__file__).resolve().parents[1]
+    digest = hashlib.sha256(f"{SCAPY_VERSION}:{CHECKSUM_POLICY}:{CHECKSUM_SAMPLE_RATE}:"
+                            f"{PARSE_MAX_LAYER}:{PARSE_PROTOCOLS}:{SCAPY_LEAN}".encode())
+    for package in PARSER_PACKAGES:
+        for path in sorted((src / package).glob("*.py")):
+            digest.update(f"{package}/{path.name}".encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class ParseCache:
+    """On-disk cache of parsed captures, keyed by the content of the file and the parser version.
+
+    An entry is the flattened DataFrame that Context.append builds from a capture, pickled so
+    that the columns load back with their types. When the cache grows over its size limit, the
+    least recently used entries are evicted. Entries of other parser versions are removed
+    whenever a new entry is stored.
+    """
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR,
+                 limit_bytes: int = PARSE_CACHE_LIMIT_BYTES, version: str | None = None) -> None:
+        """Initializes the cache.
+
+        Args:
+            directory (str, optional): directory of the entries.
+                Defaults to PARSE_CACHE_DIR from config.
+            limit_bytes (int, optional): maximum total size of the entries, 0 disables the cache.
+                Defaults to PARSE_CACHE_LIMIT_BYTES from config.
+            version (str | None, optional): parser version. Defaults to parser_version().
+        """
+        self.directory = Path(directory)
+        self.limit_bytes = limit_bytes
+        self.version = version or parser_version()
+
+    @property
+    def enabled(self) -> bool:
+        """True if the cache stores entries."""
+        return self.limit_bytes > 0
+
+    def key(self, file_path: str) -> str:
+        """Compute the cache key of a capture file.
+
+        Args:
+            file_path (str): location of the pcap file
+
+        Returns:
+            str: hash of the file content and the parser version
+        """
+        with open(file_path, "rb") as file:
+            content = hashlib.file_digest(file, "sha256").hexdigest()
+        return f"{content}-{self.version}"
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """Load a cached capture and mark it as recently used.
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            pd.DataFrame | None: the cached DataFrame, or None if there is none
+        """
+        path = self._path(key)
+        if not self.enabled or not path.exists():
+            return None
+        try:
+            df = pd.read_pickle(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # unreadable entry, parse again
+            path.unlink(missing_ok=True)
+            return None
+        path.touch()
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """Store a parsed capture, then evict entries over the size limit.
+
+        Args:
+            key (str): cache key
+            df (pd.DataFrame): flattened packets of the capture
+        """
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        partial = path.with_suffix(".tmp")
+        df.to_pickle(partial)
+        partial.replace(path)
+        self._evict()
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for path in self.directory.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.glob("*.pkl"):
+            if not path.stem.endswith(f"-{self.version}"):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.limit_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
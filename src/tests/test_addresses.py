@@ -0,0 +1,42 @@
+import unittest
+
+from scapy.layers.inet import IP, TCP, UDP, ICMP
+from scapy.layers.inet6 import IPv6, ICMPv6EchoRequest
+from scapy.layers.l2 import Ether
+
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.batch_ingest import packets_to_frame
+from packet_parser.pcap_reader import RecordHeader
+from analyzer.addresses import format_ipv4, format_ipv6, in_network
+
+
+class TestAddresses(unittest.TestCase):
+
+    def test_packed_addresses(self) -> None:
+        packets = [
+            Ether() / IP(src="10.1.2.3", dst="192.168.0.1") / TCP(sport=1234, dport=443),
+            Ether() / IPv6(src="fe80::1", dst="2001:db8::8000:0:0:1") / UDP(sport=1, dport=2),
+            Ether() / IPv6(src="ffff::1", dst="::1") / ICMPv6EchoRequest(),  # parsed by Scapy
+            Ether() / IP(src="255.255.255.255", dst="10.0.0.1") / ICMP()
+        ]
+        parser = PcapParser(log_dir=None)
+        parsed = [parser.parse_record(RecordHeader(i, 0, len(data), len(data), 0, 1), data)
+                  for i, data in enumerate(map(bytes, packets), start=1)]
+        df = packets_to_frame([parsed])
+        ip = "NETWORK.IP.data"
+        self.assertEqual(str(df[f"{ip}.src_addr_v4"].dtype), "UInt32")
+        self.assertEqual(str(df[f"{ip}.src_addr_v6_hi"].dtype), "UInt64")
+        self.assertEqual(df[f"{ip}.src_addr_v4"].iloc[0], 0x0A010203)
+        self.assertEqual(df[f"{ip}.src_addr_v6_hi"].iloc[2], 0xFFFF << 48)
+        self.assertEqual(format_ipv4(df[f"{ip}.src_addr_v4"]).tolist(),
+                         ["10.1.2.3", None, None, "255.255.255.255"])
+        self.assertEqual(format_ipv6(df[f"{ip}.dst_addr_v6_hi"], df[f"{ip}.dst_addr_v6_lo"])
+                         .tolist(), [None, "2001:db8::8000:0:0:1", "::1", None])
+        self.assertEqual(in_network(df, "10.0.0.0/8").tolist(), [True, False, False, True])
+        self.assertEqual(in_network(df, "10.0.0.0/8", "src").tolist(),
+                         [True, False, False, False])
+        self.assertEqual(in_network(df, "::/0").tolist(), [False, True, True, False])
+        self.assertEqual(in_network(df, "2001:db8:0:0:8000::/65", "dst").tolist(),
+                         [False, True, False, False])
+        self.assertEqual(in_network(df, "2001:db8:0:0:4000::/66", "dst").tolist(),
+                         [False] * 4)
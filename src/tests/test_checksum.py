@@ -0,0 +1,63 @@
+import unittest
+
+from scapy.layers.inet import IP, TCP, UDP, ICMP
+from scapy.layers.inet6 import IPv6, ICMPv6EchoRequest
+from scapy.layers.l2 import Ether
+
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.pcap_reader import RecordHeader
+from packet_parser import checksum
+from layers.layer_level import LayerLevel
+
+
+class TestChecksum(unittest.TestCase):
+
+    def test_checksum(self) -> None:
+        packets = [
+            Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1234, dport=443) / b"odd",
+            Ether() / IP(src="10.0.0.1", dst="10.0.0.2", chksum=1) / UDP(sport=1, dport=2),
+            Ether() / IPv6(src="2001:db8::1", dst="::1") / UDP(sport=1, dport=2, chksum=0),
+            Ether() / IPv6(src="2001:db8::1", dst="::1") / ICMPv6EchoRequest(cksum=1),
+            Ether() / IPv6(src="2001:db8::1", dst="::1") / ICMPv6EchoRequest(data=b"ping"),
+            Ether() / IP() / ICMP(type=0, id=0, seq=0)
+        ]
+        layers = [layer for packet in packets for layer in Ether(bytes(packet)).iterpayloads()
+                  if isinstance(layer, (IP, TCP, UDP, ICMP, ICMPv6EchoRequest))]
+        expected = [True, True, False, True, False, False, True, True, True]
+        self.assertEqual([checksum.verify_layer(layer) for layer in layers], expected)
+
+        jobs = [checksum.ChecksumJob(bytes(Ether(bytes(packet))[IP])[:20], 10)
+                for packet in packets if IP in packet]
+        jobs.append(checksum.ChecksumJob(b"\x00\xff\xff", 0))
+        jobs.append(checksum.ChecksumJob(b"\x01", 0))
+        results = [checksum.verify(job) for job in jobs]
+        self.assertEqual(results, [True, False, True, True, False])
+        self.assertEqual(checksum.verify_many(jobs).tolist(), results)
+
+    def test_checksum_policy(self) -> None:
+        data = bytes(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(chksum=1))
+        records = [(RecordHeader(number, 0, len(data), len(data), 0, 1), data)
+                   for number in range(1, 5)]
+        for fast_path in (True, False):
+            parser = PcapParser(fast_path, checksum_policy="sampled", checksum_sample_rate=2,
+                                log_dir=None)
+            parsed_packets = parser.parse_records(records)
+            self.assertEqual(
+                [packet.layers[LayerLevel.TRANSPORT].data["checksum_valid"]
+                 for packet in parsed_packets],
+                [False, None, False, None])
+            self.assertEqual(
+                [packet.layers[LayerLevel.NETWORK].data["checksum_valid"]
+                 for packet in parsed_packets],
+                [True, None, True, None])
+            self.assertEqual(len(parser.checksum_log.entries), 2)
+            self.assertEqual(parser.checksum_log.counts,
+                             {(LayerLevel.TRANSPORT, "InvalidChecksum", "TCP"): 2})
+
+            parser = PcapParser(fast_path, checksum_policy="off", log_dir=None)
+            parsed_packet = parser.parse_record(*records[0])
+            self.assertIsNone(parsed_packet.layers[LayerLevel.TRANSPORT].data["checksum_valid"])
+            self.assertEqual(parser.checksum_log.entries, [])
+
+        self.assertRaises(ValueError, PcapParser, checksum_policy="some")
+        self.assertRaises(ValueError, PcapParser, checksum_sample_rate=0)
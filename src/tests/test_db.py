@@ -1,10 +1,21 @@
+import shutil
+import tempfile
 import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 
 from config import DB_PATH
 from main import Context
+from storage.parse_cache import ParseCache, PARSER_PACKAGES, parser_version
+from packet_parser.batch_ingest import find_captures, merge_by_time, parse_file
+from components.packet import split_packet_id
+from packet_parser.pcap_parser import PcapParser
 
 DB_PATH_TEST = "test_database.db"
 ASSET_PATH = "assets/dns.pcapng"
+SRC_PATH = Path(__file__).resolve().parents[1]
 
 
 class TestDB(unittest.TestCase):
@@ -41,3 +52,109 @@ class TestDB(unittest.TestCase):
         self.storage.save(self.df, "test4")
         self.storage.save(self.df, "test5")
         self.assertEqual(self.storage.list_slots(), ["test4", "test5"])
+
+    def test_packet_ids(self) -> None:
+        self.assertEqual(self.df.index.dtype, "int64")
+        self.assertEqual(list(self.df.index[:3]), [1, 2, 3])
+        self.storage.save(self.df, "test6")
+        self.context.reset()
+        self.context.load("test6")
+        self.context.append(ASSET_PATH)
+        capture_ids, packet_numbers = split_packet_id(self.context.df.index.to_numpy())
+        self.assertEqual(sorted(set(capture_ids)), [0, 1])
+        self.assertEqual(list(packet_numbers), 2 * list(range(1, len(self.df) + 1)))
+
+    def test_view(self) -> None:
+        view = self.context.view(["packet.time", "packet.size", "no.such.column"])
+        self.assertEqual(list(view), ["packet.time", "packet.size"])
+        self.assertTrue(np.shares_memory(view["packet.time"].array.asi8,
+                                         self.context.df["packet.time"].array.asi8))
+        view.loc[view.index[0], "packet.size"] = 0
+        self.assertEqual(self.context.df["packet.size"].iloc[0], self.df["packet.size"].iloc[0])
+        self.assertEqual(list(self.context.view()), list(self.df))
+
+    def test_details(self) -> None:
+        packets = PcapParser(log_dir=None).parse_pcap(ASSET_PATH)
+        self.assertEqual(self.context.details(0, 1), str(packets[0]))
+        details = self.context.details(24, 2)
+        self.assertEqual(details.count("### PACKET START ###"), 2)
+        self.assertIn('"rdata": "localhost."', details)
+        self.assertNotIn("packet.str", self.df)
+        self.assertEqual(self.df["NETWORK.IP.data.src_addr"].dtype, "category")
+
+    def test_chunks(self) -> None:
+        first = self.context.packets.chunks[0]
+        self.context.append(ASSET_PATH)
+        self.assertEqual(len(self.context.packets.chunks), 2)
+        self.assertIs(self.context.packets.chunks[0], first)
+        self.assertEqual(len(self.context), 2 * len(self.df))
+        df = self.context.df
+        self.assertIs(self.context.df, df)
+        self.assertEqual(list(df.dtypes), list(self.df.dtypes))
+        self.assertEqual(self.context.details(len(self.df) - 1, 2).count("PACKET START"), 2)
+        self.context.df = self.df
+        self.assertEqual(len(self.context.packets.chunks), 1)
+
+    def test_parse_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            self.context.parse_cache = ParseCache(directory, 10**9)
+            self.context.reset()
+            self.context.append(ASSET_PATH)
+            self.context.append(ASSET_PATH)
+            df = self.context.get_df()
+            self.assertEqual(len(list(self.context.parse_cache.directory.glob("*.pkl"))), 1)
+            pd.testing.assert_frame_equal(df.iloc[len(self.df):].reset_index(drop=True),
+                                          self.df.reset_index(drop=True))
+            self.assertTrue(df.index.is_unique)
+
+            self.context.parse_cache.limit_bytes = 1
+            self.context.parse_cache.put("other", self.df)
+            self.assertEqual(list(self.context.parse_cache.directory.glob("*.pkl")), [])
+            self.context.parse_cache = ParseCache(directory, 10**9, version="new")
+            self.assertIsNone(self.context.parse_cache.get(
+                self.context.parse_cache.key(ASSET_PATH)))
+
+    def test_parser_version(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            for package in PARSER_PACKAGES:
+                shutil.copytree(SRC_PATH / package, Path(directory, package))
+            self.assertEqual(parser_version(Path(directory)), parser_version())
+            # the cached frames have the dtypes of storage.database
+            with open(Path(directory, "storage", "database.py"), "a", encoding="utf-8") as file:
+                file.write("\n# changed\n")
+            self.assertNotEqual(parser_version(Path(directory)), parser_version())
+
+    def test_merge_by_time(self) -> None:
+        df = parse_file(ASSET_PATH, log_dir=None)
+        pd.testing.assert_frame_equal(merge_by_time([df.iloc[1::2], df.iloc[::2]]), df)
+        pd.testing.assert_frame_equal(merge_by_time([df.iloc[:10], df.iloc[10:]]), df)
+        # packets with the same time keep the order of the frames
+        merged = merge_by_time([df.assign(frame=0), df.assign(frame=1)])
+        self.assertEqual(list(merged.index), [i for i in df.index for _ in range(2)])
+        self.assertEqual(list(merged["frame"]), [0, 1] * len(df))
+        self.assertIsNone(merge_by_time([]))
+
+    def test_append_many(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy(ASSET_PATH, Path(directory, "a.pcapng"))
+            shutil.copy("assets/dhcp.pcapng", Path(directory, "b.pcapng1"))
+            Path(directory, "c.pcap").write_bytes(b"not a capture")
+            Path(directory, "notes.txt").write_text("not included")
+            file_paths = find_captures(directory)
+            self.assertEqual([Path(path).name for path in file_paths],
+                             ["a.pcapng", "b.pcapng1", "c.pcap"])
+
+            progress = []
+            self.context.reset()
+            results = self.context.append_many(
+                file_paths, 2, lambda result, done, total: progress.append((done, total)))
+            self.assertEqual(sorted(progress), [(1, 3), (2, 3), (3, 3)])
+            self.assertEqual(results[0].packets, len(self.df))
+            self.assertGreater(results[1].packets, 0)
+            self.assertIsNone(results[1].error)
+            self.assertTrue(results[2].error.startswith("PcapFormatError"))
+
+            df = self.context.get_df()
+            self.assertEqual(len(df), results[0].packets + results[1].packets)
+            self.assertTrue(df["packet.time"].is_monotonic_increasing)
+            self.assertTrue(df.index.is_unique)
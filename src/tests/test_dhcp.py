@@ -1,5 +1,7 @@
 import unittest
 
+import pandas as pd
+
 from packet_parser.pcap_parser import PcapParser
 from analyzer.dhcp_analyzer import DHCPAnalyzer
 from layers.layer_level import LayerLevel
@@ -33,6 +35,16 @@ class TestDHCP(unittest.TestCase):
         self.assertEqual(domain_counts["webernetz.net"], 1)
         self.assertEqual(domain_counts["weberlab.de"], 2)
 
+    def test_dhcp_domain_order(self) -> None:
+        # categories are in the order first seen, the domains are listed in the order of the value
+        numbers = [7, 3, 11, 0, 9, 5, 1, 10, 4, 8, 2, 6]
+        domains = [f"domain{number:02}.example" for number in numbers]
+        acks = self.analyzer.acks.iloc[[0] * len(domains)].assign(**{
+            f"{LayerLevel.APPLICATION}.DHCP.data.domain": pd.Categorical(domains, domains)})
+        analyzer = DHCPAnalyzer(acks)
+        self.assertEqual(list(analyzer.most_common_domains(5)), sorted(domains)[:5])
+        self.assertEqual(list(analyzer.most_common_domains_error(5)), sorted(domains)[:5])
+
     def test_dhcp_discover(self) -> None:
         dhcp_layer = self.parsed_packets[0].layers[LayerLevel.APPLICATION]
         self.assertEqual(dhcp_layer.data, {
@@ -15,15 +15,23 @@ class TestDNS(unittest.TestCase):
     def setUp(self) -> None:
         parser = PcapParser()
         self.parsed_packets = parser.parse_pcap(ASSET_PATH)
-        context = Context()
-        context.append(ASSET_PATH)
-        self.analyzer = DNSAnalyzer(context.get_df())
+        self.context = Context()
+        self.context.append(ASSET_PATH)
+        self.analyzer = DNSAnalyzer(self.context.get_df())
 
     def test_count_dns_domains(self) -> None:
         domain_counts = self.analyzer.most_queried_domains()
         self.assertEqual(domain_counts["google.com"], 10)
         self.assertEqual(domain_counts["isc.org"], 4)
 
+    def test_view(self) -> None:
+        analyzer = DNSAnalyzer(self.context.view(DNSAnalyzer.columns))
+        self.assertEqual(analyzer.most_queried_domains(), self.analyzer.most_queried_domains())
+        self.assertEqual(analyzer.most_common_servers(), self.analyzer.most_common_servers())
+        self.assertEqual(analyzer.domains.loc[analyzer.packets.index[0]], "google.com")
+        self.assertNotIn(f"{LayerLevel.APPLICATION}.DNS.data.2LD", self.context.df)
+        self.assertNotIn(f"{LayerLevel.APPLICATION}.DNS.data.2LD", analyzer.packets)
+
     def test_count_dns_servers(self) -> None:
         server_counts = self.analyzer.most_common_servers()
         self.assertEqual(server_counts["217.13.4.24"], 5)
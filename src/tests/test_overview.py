@@ -1,9 +1,13 @@
 import unittest
 
+import pandas as pd
 from pandas import Timestamp, Timedelta
 
 from main import Context
 from analyzer.base_analyzer import BaseAnalyzer
+from analyzer.dns_analyzer import DNSAnalyzer
+from analyzer.summary import DNSSummary
+from packet_parser.sampler import Sampler
 
 
 ASSET_PATH = "assets/dns.pcapng"
@@ -29,28 +33,90 @@ class TestOverview(unittest.TestCase):
 
     def test_time_stats(self) -> None:
         self.assertEqual(self.base_analyzer.time_range_and_duration(), (
-            Timestamp('2023-02-06 20:16:07'),
-            Timestamp('2023-02-06 20:16:59.999999'),
+            Timestamp('2023-02-06 18:16:07', tz='UTC'),
+            Timestamp('2023-02-06 18:16:59.999999', tz='UTC'),
             Timedelta('0 days 00:00:52.999999')
         ))
 
     def test_speed_series(self) -> None:
         bps, bps_max = self.base_analyzer.time_series_speed(interval_count_target=5)
         expected_bps = {
-            Timestamp('2023-02-06 20:16:00'): 67.6,
-            Timestamp('2023-02-06 20:16:10'): 21.4,
-            Timestamp('2023-02-06 20:16:20'): 34.0,
-            Timestamp('2023-02-06 20:16:30'): 17.6,
-            Timestamp('2023-02-06 20:16:40'): 32.0,
-            Timestamp('2023-02-06 20:16:50'): 198.0
+            Timestamp('2023-02-06 18:16:00', tz='UTC'): 67.6,
+            Timestamp('2023-02-06 18:16:10', tz='UTC'): 21.4,
+            Timestamp('2023-02-06 18:16:20', tz='UTC'): 34.0,
+            Timestamp('2023-02-06 18:16:30', tz='UTC'): 17.6,
+            Timestamp('2023-02-06 18:16:40', tz='UTC'): 32.0,
+            Timestamp('2023-02-06 18:16:50', tz='UTC'): 198.0
         }
         expected_bps_max = {
-            Timestamp('2023-02-06 20:16:00'): 536,
-            Timestamp('2023-02-06 20:16:10'): 214,
-            Timestamp('2023-02-06 20:16:20'): 176,
-            Timestamp('2023-02-06 20:16:30'): 176,
-            Timestamp('2023-02-06 20:16:40'): 168,
-            Timestamp('2023-02-06 20:16:50'): 1506
+            Timestamp('2023-02-06 18:16:00', tz='UTC'): 536,
+            Timestamp('2023-02-06 18:16:10', tz='UTC'): 214,
+            Timestamp('2023-02-06 18:16:20', tz='UTC'): 176,
+            Timestamp('2023-02-06 18:16:30', tz='UTC'): 176,
+            Timestamp('2023-02-06 18:16:40', tz='UTC'): 168,
+            Timestamp('2023-02-06 18:16:50', tz='UTC'): 1506
         }
         self.assertEqual(bps.to_dict(), expected_bps)
         self.assertEqual(bps_max.to_dict(), expected_bps_max)
+
+    def test_checksum_summary(self) -> None:
+        summary = self.base_analyzer.checksum_summary()
+        self.assertEqual(summary["IP"], {"valid": 38, "invalid": 0, "unchecked": 0})
+        self.assertEqual(summary["UDP"], {"valid": 38, "invalid": 0, "unchecked": 0})
+        self.assertEqual(summary["TCP"], {"valid": 0, "invalid": 0, "unchecked": 0})
+
+        column = "TRANSPORT.UDP.data.checksum_valid"
+        self.df.loc[self.df.index[:3], column] = [pd.NA, pd.NA, False]
+        summary = BaseAnalyzer(self.df).checksum_summary()
+        self.assertEqual(summary["UDP"], {"valid": 35, "invalid": 1, "unchecked": 2})
+
+    def test_sampled_estimates(self) -> None:
+        self.assertEqual(self.base_analyzer.total_size_error(), 0)
+        self.context.reset()
+        self.context.append(ASSET_PATH, Sampler(2))
+        sampled = BaseAnalyzer(self.context.get_df())
+        self.assertEqual(sampled.packet_count(), 38)
+        self.assertEqual(sampled.total_size(), 2 * self.df["packet.size"].iloc[::2].sum())
+        self.assertGreater(sampled.total_size_error(), 0)
+        self.assertEqual(sampled.protocol_distribution()["TRANSPORT"].to_dict(), {"UDP": 38})
+        bps, _ = sampled.time_series_speed(interval_count_target=5)
+        self.assertAlmostEqual(bps.sum() * 10, sampled.total_size())
+        self.assertEqual(list(sampled.time_series_speed_error(5).index), list(bps.index))
+        domains = DNSAnalyzer(self.context.get_df())
+        self.assertEqual(sum(domains.most_queried_domains().values()), 38)
+        self.assertEqual(domains.most_queried_domains().keys(),
+                         domains.most_queried_domains_error().keys())
+
+    def test_summary(self) -> None:
+        summary = self.context.summary()
+        self.assertEqual(summary.packet_count(), 38)
+        self.assertEqual(summary.total_size(), 3706)
+        self.assertEqual(summary.time_range_and_duration(),
+                         self.base_analyzer.time_range_and_duration())
+        for series, expected in zip(summary.time_series_speed(5),
+                                    self.base_analyzer.time_series_speed(5)):
+            self.assertEqual(series.to_dict(), expected.to_dict())
+
+        self.context.append(ASSET_PATH)
+        merged = self.context.summary()
+        self.assertIs(self.context.summary(), merged)
+        self.assertEqual(merged.packet_count(), 76)
+        self.assertEqual(merged.checksum_summary()["UDP"]["valid"], 76)
+        self.assertEqual(merged.protocol_distribution()["TRANSPORT"].to_dict(), {"UDP": 76})
+        # the order is compared too, equal counts are in the order of the domain
+        domains, expected = DNSSummary(merged), DNSAnalyzer(self.context.get_df())
+        self.assertEqual(list(domains.most_queried_domains().items()),
+                         list(expected.most_queried_domains().items()))
+        self.assertEqual(list(domains.most_queried_domains_error().items()),
+                         list(expected.most_queried_domains_error().items()))
+
+    def test_summary_sampled(self) -> None:
+        self.context.reset()
+        self.context.append(ASSET_PATH, Sampler(2))
+        summary = self.context.summary()
+        sampled = BaseAnalyzer(self.context.get_df())
+        self.assertEqual(summary.sampling(), sampled.sampling())
+        self.assertEqual(summary.total_size(), sampled.total_size())
+        self.assertAlmostEqual(summary.total_size_error(), sampled.total_size_error())
+        self.context.append(ASSET_PATH, Sampler(2, "flow"))
+        self.assertIsNone(self.context.summary())
@@ -1,9 +1,12 @@
 import unittest
-from datetime import datetime
 
+import pandas as pd
 
 from packet_parser.pcap_parser import PcapParser
+from packet_parser.frame_builder import FrameBuilder
 from layers.layer_level import LayerLevel
+from layers.dns import DNS, DNSDir, DNSQType, DNSRCode
+from utils.utils import preprocess_data
 
 
 ASSET_PATH = "assets/dns.pcapng"
@@ -18,10 +21,48 @@ class TestPacket(unittest.TestCase):
     def test_packet(self) -> None:
         packet = self.parsed_packets[0]
         self.assertEqual(packet.size, 70)
-        self.assertEqual(packet.time, datetime(2023, 2, 6, 20, 16, 7))
+        self.assertEqual(packet.time, pd.Timestamp("2023-02-06 18:16:07", tz="UTC").value)
+        self.assertEqual(packet.packet_id, 1)
+        self.assertFalse(hasattr(packet, "__dict__"))
+        self.assertFalse(hasattr(packet.layers[LayerLevel.LINK], "__dict__"))
 
     def test_layer(self) -> None:
         layer = self.parsed_packets[0].layers[LayerLevel.APPLICATION]
         self.assertEqual(layer.size_total, 28)
         self.assertEqual(layer.size_payload, 0)
         self.assertEqual(layer.layer_name, "DNS")
+
+    def test_batches(self) -> None:
+        batches = list(PcapParser().iter_batches(ASSET_PATH, batch_size=10))
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 10, 8])
+        streamed = [packet for batch in batches for packet in batch]
+        self.assertEqual(streamed, self.parsed_packets)
+
+    def test_field_converter(self) -> None:
+        data = {
+            "transaction_id": 1.0,  # not the declared type
+            "direction": DNSDir.RESPONSE,
+            "opcode": None,
+            "qtype": DNSQType.A,
+            "rcode": DNSRCode.NOERROR,
+            "qname": b"example.com.\x00",
+            "answers": [{"rrname": b"example.com.", "ttl": 60, "rdata": [b"\xff", "x"]}],
+            "extra": 2.5
+        }
+        converted = DNS.converter(data)
+        self.assertEqual(converted, preprocess_data(data))
+        self.assertEqual(list(converted), list(data))
+        self.assertIs(type(converted["transaction_id"]), int)
+        self.assertEqual(converted["answers"][0]["rdata"], ["ff", "x"])
+
+    def test_frame_builder(self) -> None:
+        # the columns match a DataFrame of flattened rows, also when packets differ in fields
+        for asset in ["assets/dns.pcapng", "assets/dhcp.pcapng", "assets/example.pcapng"]:
+            parsed_packets = PcapParser(log_dir=None).parse_pcap(asset)
+            builder = FrameBuilder()
+            for packet in parsed_packets:
+                builder.append(packet)
+            self.assertEqual(len(builder), len(parsed_packets))
+            expected = pd.DataFrame([packet.flatten() for packet in parsed_packets])
+            pd.testing.assert_frame_equal(builder.build(), expected.set_index("packet.id"))
+        self.assertIsNone(FrameBuilder().build())
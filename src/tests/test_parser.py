@@ -0,0 +1,140 @@
+import unittest
+from collections import Counter
+
+from scapy.layers.inet import IP, TCP, UDP, ICMP
+from scapy.layers.inet6 import IPv6, ICMPv6EchoRequest, _ICMPv6
+from scapy.layers.l2 import Ether, CookedLinux, GRE
+
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.pcap_reader import RecordHeader, RecordReader
+from packet_parser.parser_log import ParserLog, format_summary
+from packet_parser.layer_classifier import classify
+from packet_parser.dissection_limit import DissectionLimit
+from packet_parser import lean_scapy
+from layers.layer_level import LayerLevel
+
+
+ASSET_PATH = "assets/dns.pcapng"
+
+
+class TestParser(unittest.TestCase):
+
+    def test_parallel(self) -> None:
+        for asset in ["assets/dns.pcapng", "assets/dhcp.pcapng", "assets/example.pcapng"]:
+            serial = PcapParser(log_dir=None)
+            parallel = PcapParser(log_dir=None)
+            parallel.shard_size = 7
+            self.assertEqual(parallel.parse_pcap(asset, workers=2), serial.parse_pcap(asset))
+            self.assertEqual(
+                [packet.packet_number for packet in parallel.parsed_packets],
+                list(range(1, len(serial.parsed_packets) + 1)))
+            for parallel_log, serial_log in [(parallel.checksum_log, serial.checksum_log),
+                                             (parallel.error_log, serial.error_log),
+                                             (parallel.support_log, serial.support_log)]:
+                self.assertEqual(parallel_log.entries, serial_log.entries)
+                self.assertEqual(parallel_log.counts, serial_log.counts)
+
+    def test_parallel_verbose_limit(self) -> None:
+        serial = PcapParser(log_dir=None)
+        parallel = PcapParser(log_dir=None)
+        parallel.shard_size = 7
+        for parser in (serial, parallel):
+            parser.support_log.verbose_limit = 3
+        serial.parse_pcap("assets/example.pcapng")
+        # a reused parser starts its logs over
+        for _ in range(2):
+            parallel.parse_pcap("assets/example.pcapng", workers=2)
+            self.assertEqual(parallel.support_log.entries, serial.support_log.entries)
+            self.assertEqual(parallel.support_log.counts, serial.support_log.counts)
+        details = [details for _, details in parallel.support_log.entries if details]
+        self.assertEqual(len(details), 3)
+
+    def test_fast_path(self) -> None:
+        ether = Ether(src="00:11:22:33:44:55", dst="66:77:88:99:aa:bb")
+        frames = [
+            (1, bytes(ether / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1234, dport=443))),
+            (1, bytes(ether / IPv6(src="2001:db8::1", dst="::1") / UDP(sport=1, dport=2) / b"x")),
+            (1, bytes(ether / IP(src="10.0.0.1", dst="10.0.0.2", chksum=1) / UDP(sport=1, dport=2) / b"x")),
+            (113, bytes(CookedLinux(src=b"\x00\x11\x22\x33\x44\x55\x00\x00") /
+                        IP(src="10.0.0.1", dst="10.0.0.2") / TCP(chksum=1) / b"data"))
+        ]
+        for packet_number, (linktype, data) in enumerate(frames, start=1):
+            header = RecordHeader(packet_number, 0, len(data), len(data), 0, linktype)
+            fast = PcapParser(fast_path=True, log_dir=None)
+            slow = PcapParser(fast_path=False, log_dir=None)
+            self.assertEqual(fast.parse_record(header, data), slow.parse_record(header, data))
+            self.assertEqual(fast.checksum_log.entries, slow.checksum_log.entries)
+            self.assertEqual(fast.checksum_log.counts, slow.checksum_log.counts)
+
+    def test_classify(self) -> None:
+        packet = Ether() / IP() / ICMP() / IP() / TCP()
+        found = classify(packet, 4)
+        self.assertIs(found[0][IP], packet[IP])
+        self.assertIs(found[2][IP], packet[ICMP].payload)
+        self.assertNotIn(Ether, found[1])
+        self.assertEqual(set(found[3]), {IP, TCP})
+        self.assertEqual(len(classify(Ether(), 4)[1]), 0)
+
+        packet = Ether() / IPv6() / ICMPv6EchoRequest()
+        self.assertNotIn(_ICMPv6, classify(packet, 4)[1])
+        self.assertIs(classify(packet, 4)[2][_ICMPv6], packet[ICMPv6EchoRequest])
+
+    def test_dissection_limit(self) -> None:
+        expected = PcapParser(log_dir=None).parse_pcap(ASSET_PATH)[0]
+        with open("assets/dhcp.pcapng", "rb") as file:
+            records = list(RecordReader(file))
+        chain = DissectionLimit()._dissect_chain  # pylint: disable=protected-access
+        for header, data in records:
+            packet = DissectionLimit().dissect(header, data)
+            self.assertEqual(chain(type(packet), data).show(dump=True), packet.show(dump=True))
+
+        for fast_path in (True, False):
+            parser = PcapParser(fast_path, log_dir=None, max_layer="NETWORK")
+            packet = parser.parse_pcap(ASSET_PATH)[0]
+            self.assertEqual(packet.layers[LayerLevel.NETWORK], expected.layers[
+                LayerLevel.NETWORK])
+            self.assertEqual(packet.layers[LayerLevel.TRANSPORT].layer_name, "RAW")
+            self.assertEqual(packet.layers[LayerLevel.TRANSPORT].size_total, 36)
+            self.assertEqual(packet.layers[LayerLevel.APPLICATION].layer_name, "RAW")
+
+            parser = PcapParser(fast_path, log_dir=None, protocols=["Ethernet", "IP", "UDP"])
+            packet = parser.parse_pcap(ASSET_PATH)[0]
+            self.assertEqual(packet.layers[LayerLevel.TRANSPORT], expected.layers[
+                LayerLevel.TRANSPORT])
+            self.assertEqual(packet.layers[LayerLevel.APPLICATION].layer_name, "RAW")
+            self.assertEqual(packet.layers[LayerLevel.APPLICATION].size_total, 28)
+        self.assertRaises(ValueError, DissectionLimit, protocols=["HTTP"])
+
+    def test_lean_scapy(self) -> None:
+        bindings = list(Ether.payload_guess)
+        data = bytes(Ether() / IP() / GRE() / IP(src="10.0.0.1", dst="10.0.0.2") / UDP() / b"x")
+        header = RecordHeader(1, 0, len(data), len(data), 0, 1)
+        assets = ["assets/dns.pcapng", "assets/dhcp.pcapng"]
+        expected = [PcapParser(False, log_dir=None).parse_pcap(asset) for asset in assets]
+        lean_scapy.enable()
+        try:
+            self.assertTrue(all(lean_scapy.understood(payload_class)
+                                for _, payload_class in Ether.payload_guess))
+            self.assertEqual([PcapParser(False, log_dir=None).parse_pcap(asset)
+                              for asset in assets], expected)
+            packet = PcapParser(False, log_dir=None).parse_record(header, data)
+            self.assertEqual(packet.layers[LayerLevel.TRANSPORT].layer_name, "RAW")
+        finally:
+            lean_scapy.disable()
+        self.assertEqual(Ether.payload_guess, bindings)
+        packet = PcapParser(False, log_dir=None).parse_record(header, data)
+        self.assertEqual(packet.layers[LayerLevel.TRANSPORT].layer_name, "UDP")
+
+    def test_parser_log(self) -> None:
+        log = ParserLog(None, verbose_limit=2)
+        for number in range(3):
+            log.write(("link", "KeyError", "Ether"),
+                      f"error {number}", lambda n=number: f"dump {n}")
+        log.merge([("error 3", "dump 3")], Counter({("link", "KeyError", "Ether"): 1}))
+        self.assertEqual(log.entries, [("error 0", "dump 0"), ("error 1", "dump 1"),
+                                       ("error 2", None), ("error 3", None)])
+        self.assertEqual(log.remaining(), 0)
+        self.assertEqual(format_summary(log.counts),
+                         "       4  link         KeyError                 Ether\n")
+        log.open()
+        self.assertEqual((log.entries, log.counts, log.remaining()), ([], Counter(), 2))
@@ -0,0 +1,121 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tempfile
+import unittest
+
+from scapy.layers.inet import IP, UDP
+from scapy.layers.l2 import Ether
+from scapy.utils import wrpcap
+
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.pcap_reader import (
+    RecordReader, CaptureSizeError, LimitedStream, index_records, is_compressed, open_capture)
+from packet_parser.record_index import RecordIndex
+from packet_parser.follower import CaptureFollower
+from layers.layer_level import LayerLevel
+from utils.utils import check_file
+
+
+ASSET_PATH = "assets/dns.pcapng"
+
+
+class CountingStream(io.BytesIO):
+    """In-memory stream that counts the bytes read from it."""
+
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class TestReader(unittest.TestCase):
+
+    def test_compressed(self) -> None:
+        parsed_packets = PcapParser(log_dir=None).parse_pcap(ASSET_PATH)
+        with open(ASSET_PATH, "rb") as file:
+            data = file.read()
+        with tempfile.TemporaryDirectory() as directory:
+            for suffix, module in ((".gz", gzip), (".xz", lzma), (".bz2", bz2)):
+                path = os.path.join(directory, f"dns.pcapng{suffix}")
+                with module.open(path, "wb") as file:
+                    file.write(data)
+                check_file(path)
+                self.assertTrue(is_compressed(path))
+                self.assertEqual(PcapParser().parse_pcap(path, workers=2), parsed_packets)
+                for limit in (len(data), 0):
+                    with open_capture(path, limit) as stream:
+                        self.assertEqual(len(list(RecordReader(stream))), len(parsed_packets))
+                with self.assertRaises(CaptureSizeError), open_capture(path, len(data) - 1) as stream:
+                    list(RecordReader(stream))
+        self.assertFalse(is_compressed(ASSET_PATH))
+
+    def test_record_index(self) -> None:
+        expected = PcapParser(log_dir=None).parse_pcap(ASSET_PATH)[0]
+        with open(ASSET_PATH, "rb") as file:
+            records = list(RecordReader(file))
+        with RecordIndex(ASSET_PATH) as index:
+            self.assertEqual(len(index), len(records))
+            self.assertEqual(index.header(5), records[4][0])
+            view = index.data(5)
+            self.assertEqual(view, records[4][1])
+            view.release()
+            self.assertEqual([(header, bytes(data)) for header, data in index.records([3, 1])],
+                             [records[2], records[0]])
+            self.assertEqual(
+                PcapParser().parse_packet(1, index.dissect(1)), expected)
+            self.assertRaises(IndexError, index.header, 0)
+            self.assertRaises(IndexError, index.dissect, len(records) + 1)
+
+    def test_skip(self) -> None:
+        # skipped packet data is seeked past, not read, and a short file still ends the reading
+        with open(ASSET_PATH, "rb") as file:
+            data = file.read()
+        records = list(RecordReader(io.BytesIO(data)))
+        stream = CountingStream(data)
+        self.assertEqual([header for header, _ in RecordReader(stream, read_data=False)],
+                         [header for header, _ in records])
+        self.assertLess(stream.bytes_read, len(data) - sum(len(record) for _, record in records))
+        for size in (records[3][0].offset, records[3][0].offset + 5, len(data) - 1):
+            reader = RecordReader(io.BytesIO(data[:size]), read_data=False)
+            sequential = RecordReader(LimitedStream(io.BytesIO(data[:size]), size), False)
+            self.assertEqual(list(reader), list(sequential))
+            self.assertEqual(reader.offset, sequential.offset)
+        self.assertEqual(len(index_records(ASSET_PATH)), len(records))
+
+    def test_follow(self) -> None:
+        packets = [Ether() / IP(src="10.0.0.1", dst=f"10.0.0.{i}") / UDP() for i in range(5)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "capture.pcap")
+            wrpcap(path, packets)
+            with open(path, "rb") as file:
+                data = file.read()
+            record_size = (len(data) - 24) // len(packets)
+            with open(path, "wb") as file:
+                file.write(data[:24 + 2 * record_size + 10])
+            follower = CaptureFollower(os.path.join(directory, "capture.pcap*"))
+            parser = PcapParser(log_dir=None)
+            self.assertEqual([p.packet_number for p in parser.follow(follower)], [1, 2])
+            self.assertEqual(list(parser.follow(follower)), [])
+
+            # the rest of the file is written and tcpdump -C rotates to a new file
+            with open(path, "ab") as file:
+                file.write(data[24 + 2 * record_size + 10:])
+            wrpcap(path + "1", packets[:1])
+            os.utime(path + "1", (os.stat(path).st_mtime + 1,) * 2)
+            parsed = list(parser.follow(follower))
+            self.assertEqual([p.packet_number for p in parsed], [3, 4, 5, 1])
+            self.assertEqual([p.packet_id >> 32 for p in parsed], [0, 0, 0, 1])
+            self.assertEqual(parsed[0].layers[LayerLevel.NETWORK].data["dst_addr"], "10.0.0.2")
+
+            # the first file is replaced, like tcpdump -W does
+            os.remove(path)
+            wrpcap(path, packets[:2])
+            self.assertEqual([p.packet_id for p in parser.follow(follower)],
+                             [(2 << 32) + 1, (2 << 32) + 2])
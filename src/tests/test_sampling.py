@@ -0,0 +1,79 @@
+import unittest
+
+import pandas as pd
+
+from packet_parser.pcap_parser import PcapParser
+from packet_parser.record_filter import RecordFilter, parse_filter
+from packet_parser.sampler import Sampler, parse_sampling
+from packet_parser.batch_ingest import packets_to_frame
+from analyzer.addresses import in_network
+from layers.layer_level import LayerLevel
+
+
+ASSET_PATH = "assets/dns.pcapng"
+
+
+class TestSampling(unittest.TestCase):
+
+    def setUp(self) -> None:
+        parser = PcapParser()
+        self.parsed_packets = parser.parse_pcap(ASSET_PATH)
+
+    def test_record_filter(self) -> None:
+        address = "192.168.170.20"
+        expected = [packet for packet in self.parsed_packets
+                    if address in (packet.layers[LayerLevel.NETWORK].data["src_addr"],
+                                   packet.layers[LayerLevel.NETWORK].data["dst_addr"])
+                    and packet.time >= self.parsed_packets[10].time]
+        record_filter = RecordFilter(
+            start=pd.Timestamp(self.parsed_packets[10].time, tz="UTC").to_pydatetime(),
+            addresses=[address], ports=[53])
+        self.assertEqual(PcapParser().parse_pcap(ASSET_PATH, record_filter=record_filter),
+                         expected)
+        self.assertEqual(PcapParser(log_dir=None).parse_pcap(
+            ASSET_PATH, workers=2, record_filter=record_filter), expected)
+        self.assertEqual(
+            PcapParser().parse_pcap(ASSET_PATH, record_filter=parse_filter(protocols="tcp")), [])
+        self.assertIsNone(parse_filter(ports=" "))
+
+        # naive times are UTC, like the packet times, whatever the local time zone
+        time = self.parsed_packets[10].time
+        naive = pd.Timestamp(time).isoformat(sep=" ")
+        parsed = PcapParser().parse_pcap(ASSET_PATH, record_filter=parse_filter(naive, naive))
+        self.assertEqual(parsed, [packet for packet in self.parsed_packets if packet.time == time])
+
+        # networks select the same packets as in_network selects from the parsed ones
+        df = packets_to_frame([self.parsed_packets])
+        for network in ["192.168.170.16/28", "217.13.0.0/16", "10.0.0.0/8", "::/0"]:
+            parsed = PcapParser().parse_pcap(
+                ASSET_PATH, record_filter=parse_filter(addresses=f"{network}, 192.168.170.56"))
+            expected = in_network(df, network) | in_network(df, "192.168.170.56/32")
+            self.assertEqual([packet.packet_id for packet in parsed], list(df.index[expected]))
+        with self.assertRaises(ValueError):
+            parse_filter(protocols="nosuch")
+        with self.assertRaises(ValueError):
+            parse_filter(addresses="192.168.170.20/24")
+
+    def test_sampler(self) -> None:
+        sampled = PcapParser().parse_pcap(ASSET_PATH, record_filter=Sampler(10))
+        self.assertEqual([packet.packet_number for packet in sampled], [1, 11, 21, 31])
+        self.assertEqual(sampled[0].flatten()["packet.sample_rate"], 10)
+        self.assertNotIn("packet.sample_rate", self.parsed_packets[0].flatten())
+
+        # both directions of a flow are kept or dropped together
+        def flow(packet):
+            network = packet.layers[LayerLevel.NETWORK].data
+            transport = packet.layers[LayerLevel.TRANSPORT].data
+            return frozenset([(network["src_addr"], transport["src_port"]),
+                              (network["dst_addr"], transport["dst_port"])])
+        sampler = Sampler(2, "flow", RecordFilter(ports=[53]))
+        sampled = PcapParser(log_dir=None).parse_pcap(ASSET_PATH, workers=2, record_filter=sampler)
+        kept = {flow(packet) for packet in sampled}
+        self.assertTrue(0 < len(sampled) < len(self.parsed_packets))
+        self.assertEqual(
+            sampled, [packet for packet in self.parsed_packets if flow(packet) in kept])
+        self.assertEqual({packet.sample_mode for packet in sampled}, {"flow"})
+
+        self.assertIsNone(parse_sampling("1"))
+        with self.assertRaises(ValueError):
+            parse_sampling("10", "byte")
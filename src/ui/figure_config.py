@@ -1,5 +1,7 @@
 class FigureConfig:
     """Configuration for a matplotlib figure.
+
+    error1 holds the margins of error of data1, if it was estimated from sampled packets.
     """
 
     def __init__(
@@ -11,7 +13,8 @@ class FigureConfig:
             color1,
             data2=None,
             y2label=None,
-            color2=None) -> None:
+            color2=None,
+            error1=None) -> None:
         self.title = title
         self.data1 = data1
         self.xlabel = xlabel
@@ -20,3 +23,4 @@ class FigureConfig:
         self.data2 = data2
         self.y2label = y2label
         self.color2 = color2
+        self.error1 = error1
@@ -1,3 +1,5 @@
+import glob
+import os
 from threading import Thread
 from functools import wraps
 import tkinter as tk
@@ -16,7 +18,11 @@ import humanize
 from ui.figure_config import FigureConfig
 from utils.utils import check_file, start_timer
 from layers.layer_level import LayerLevel
-from config import TIMEOUT_SECONDS
+from packet_parser.pcap_reader import PcapFormatError, CaptureSizeError
+from packet_parser.batch_ingest import FileResult
+from packet_parser.record_filter import parse_filter
+from packet_parser.sampler import parse_sampling
+from config import TIMEOUT_SECONDS, FOLLOW_INTERVAL_SECONDS, DETAILS_PAGE_SIZE
 
 
 class StorageOverlay:
@@ -82,6 +88,100 @@ class StorageOverlay:
         return self.slot.get()
 
 
+class FilterOverlay:
+    FIELDS = [
+        ("start", "Start time, UTC (YYYY-MM-DD HH:MM:SS)"),
+        ("end", "End time, UTC (YYYY-MM-DD HH:MM:SS)"),
+        ("ethertypes", "Ethertypes (e.g. 0x0800, 0x86dd)"),
+        ("protocols", "IP protocols (e.g. tcp, udp, 1)"),
+        ("addresses", "IP addresses or networks (e.g. 10.0.0.0/8)"),
+        ("ports", "Ports"),
+        ("sample_rate", "Sample 1 in N packets or flows"),
+        ("sample_mode", "Sample by (packet or flow)")
+    ]
+
+    def __init__(self, parent, file_count) -> None:
+        self.overlay = ttk.Frame(parent)
+        self.overlay.place(x=1, y=1, relwidth=1, relheight=1)
+
+        self.inner_frame = ttk.Frame(self.overlay)
+        self.inner_frame.pack(expand=True)
+        ttk.Label(
+            self.inner_frame, text=f"Filter Packets ({file_count} files)",
+            font=('Helvetica', 16, "bold")).grid(row=0, column=0, columnspan=2, pady=10)
+        ttk.Label(
+            self.inner_frame, text="Leave empty to parse all packets").grid(
+                row=1, column=0, columnspan=2)
+
+        self.values = {}
+        for row, (name, label) in enumerate(self.FIELDS, start=2):
+            ttk.Label(self.inner_frame, text=label).grid(row=row, column=0, sticky=tk.W, padx=5)
+            self.values[name] = tk.StringVar()
+            ttk.Entry(self.inner_frame, textvariable=self.values[name], width=40).grid(
+                row=row, column=1, pady=2)
+
+        self.confirmed = False
+        ttk.Button(self.inner_frame, text="Open", command=self._on_open).grid(
+            row=len(self.FIELDS) + 2, column=0, columnspan=2, sticky=tk.EW)
+        ttk.Button(self.inner_frame, text="Cancel", command=self.overlay.destroy).grid(
+            row=len(self.FIELDS) + 3, column=0, columnspan=2, sticky=tk.EW)
+
+    def _on_open(self):
+        self.confirmed = True
+        self.overlay.destroy()
+
+    def ask_filter(self):
+        # None if cancelled
+        self.overlay.wait_window()
+        if not self.confirmed:
+            return None
+        return {name: value.get() for name, value in self.values.items()}
+
+
+class FollowOverlay:
+    def __init__(self, parent, file_path) -> None:
+        self.overlay = ttk.Frame(parent)
+        self.overlay.place(x=1, y=1, relwidth=1, relheight=1)
+
+        self.inner_frame = ttk.Frame(self.overlay)
+        self.inner_frame.pack(expand=True)
+        ttk.Label(
+            self.inner_frame, text="Follow Capture",
+            font=('Helvetica', 16, "bold")).grid(row=0, column=0, pady=10)
+        help_text = ("Glob pattern of the capture files, rotated files included.\n"
+                     "The default matches tcpdump -C rotation (file.pcap, file.pcap1, ...).\n"
+                     "For -G or -W names, match the directory, like /captures/*.pcap")
+        ttk.Label(self.inner_frame, text=help_text, justify=tk.LEFT).grid(
+            row=1, column=0, pady=5)
+
+        # files matched by the pattern are followed, including the chosen one
+        directory = glob.escape(os.path.dirname(file_path))
+        self.pattern = tk.StringVar(value=f"{glob.escape(file_path)}*")
+        ttk.Entry(self.inner_frame, textvariable=self.pattern, width=60).grid(
+            row=2, column=0, pady=2)
+
+        self.confirmed = False
+        ttk.Button(self.inner_frame, text="Follow", command=self._on_follow).grid(
+            row=3, column=0, sticky=tk.EW)
+        ttk.Button(
+            self.inner_frame, text="Whole Directory",
+            command=lambda: self.pattern.set(os.path.join(directory, "*"))).grid(
+                row=4, column=0, sticky=tk.EW)
+        ttk.Button(self.inner_frame, text="Cancel", command=self.overlay.destroy).grid(
+            row=5, column=0, sticky=tk.EW)
+
+    def _on_follow(self):
+        self.confirmed = True
+        self.overlay.destroy()
+
+    def ask_pattern(self):
+        # None if cancelled
+        self.overlay.wait_window()
+        if not self.confirmed:
+            return None
+        return self.pattern.get().strip()
+
+
 def with_loading_screen(func):
     "Generated with ChatGPT."
 
@@ -155,6 +255,9 @@ class PcapUi(tk.Tk):
             "indicator": 0
         }
         self.map = {}
+        self.follow_job = None
+        # packets shown on the details tab, their details are formatted a page at a time
+        self.details_shown = 0
 
         self._create_menu()
         self._initialize_ui()
@@ -165,6 +268,7 @@ class PcapUi(tk.Tk):
 
         menu_data = [
             ("Add New Capture...", "Ctrl+N", "<Control-n>", self.open_file),
+            ("Follow Capture...", "Ctrl+F", "<Control-f>", self.follow_file),
             ("Load Analysis..", "Ctrl+O", "<Control-o>", self.load),
             ("Save Analysis..", "Ctrl+S", "<Control-s>", self.save),
             ("Delete Analysis..", "Ctrl+D", "<Control-d>", self.delete),
@@ -194,6 +298,8 @@ class PcapUi(tk.Tk):
             group_left, "Delete...", self.delete)
         self.map["button.open"] = self.create_button(
             group_right, "Add New Capture...", self.open_file)
+        self.map["button.follow"] = self.create_button(
+            group_right, "Follow Capture...", self.follow_file)
         self.map["button.reset"] = self.create_button(
             group_right, "Reset", self.reset)
         self._set_storage_button_states()
@@ -233,11 +339,21 @@ class PcapUi(tk.Tk):
             indicators_frame, 0, "Start Time", 0, 3)
         self.map["indicator.endtime"] = self.create_indicator(
             indicators_frame, 0, "End Time", 0, 4)
+        self.map["indicator.checksum_invalid"] = self.create_indicator(
+            indicators_frame, 0, "Invalid Checksums", 1, 0)
+        self.map["indicator.checksum_unchecked"] = self.create_indicator(
+            indicators_frame, 0, "Unchecked Checksums", 1, 1)
+        self.map["indicator.sampling"] = self.create_indicator(
+            indicators_frame, 0, "Sampling", 1, 2)
         indicators_frame.pack()
         figure_id = self.create_figure_and_canvas(tab1)
         self.map["plot.speed"] = self.create_plot(figure_id, 111, dual=True)
 
     def _prepare_tab_2(self, tab2):
+        buttons_frame = ttk.Frame(tab2)
+        buttons_frame.pack(side=tk.BOTTOM, pady=(0, 10))
+        self.map["button.more_details"] = self.create_button(
+            buttons_frame, "Show More", self.show_more_details, state=tk.DISABLED)
         self.map["text_area.summary"] = self.create_scrollable_text_area(tab2)
 
     def _prepare_tab_3(self, tab3):
@@ -379,7 +495,39 @@ class PcapUi(tk.Tk):
 
     def open_file(self):
 
-        # Ask the user to select a file
+        # Ask the user to select one or more files
+        file_paths = filedialog.askopenfilenames()
+
+        if file_paths:  # files selected
+            try:
+                for file_path in file_paths:
+                    check_file(file_path)
+            except FileNotFoundError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            # packets outside the filter are skipped before they are dissected
+            fields = FilterOverlay(self, len(file_paths)).ask_filter()
+            if fields is None:  # cancelled
+                return
+            try:
+                sampling = (fields.pop("sample_rate"), fields.pop("sample_mode"))
+                record_filter = parse_sampling(*sampling, parse_filter(**fields))
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid filter: {e}")
+                return
+
+            failed = self.update(list(file_paths), record_filter=record_filter)
+            if failed:
+                messagebox.showerror("Error", "Could not parse:\n" + "\n".join(
+                    f"{result.path}: {result.error}" for result in failed))
+
+        else:  # no files selected
+            pass
+
+    def follow_file(self):
+
+        # Ask the user to select the capture, then the pattern of the rotated files
         file_path = filedialog.askopenfilename()
 
         if file_path:  # file selected
@@ -389,19 +537,69 @@ class PcapUi(tk.Tk):
                 messagebox.showerror("Error", str(e))
                 return
 
-            self.update(file_path)
+            pattern = FollowOverlay(self, file_path).ask_pattern()
+            if not pattern:  # cancelled
+                return
 
-        else:  # no file selected
-            pass
+            if self.follow_job is not None:
+                self.after_cancel(self.follow_job)
+            self.context.follow(pattern)
+            self.update(poll=True)
+            self.follow_job = self.after(int(FOLLOW_INTERVAL_SECONDS * 1000), self._poll_follow)
+
+    def _poll_follow(self):
+        self.follow_job = None
+        if self.context.follower is None:  # reset
+            return
+        try:
+            new_rows = self.context.poll()
+        except PcapFormatError as e:
+            self.context.unfollow()
+            messagebox.showerror("Error", str(e))
+            return
+
+        # the new packets are added to the details, if all the earlier ones are shown
+        if len(new_rows) > 0:
+            if self.details_shown == len(self.context) - len(new_rows):
+                self._show_results(self._next_details(), append=True)
+            else:
+                self._show_results(None)
+        self.follow_job = self.after(int(FOLLOW_INTERVAL_SECONDS * 1000), self._poll_follow)
 
     @with_loading_screen
-    def update(self, file_path=None):
+    def update(self, file_paths=(), poll=False, record_filter=None):
         self.reset(keep_context=True)
 
-        if file_path:
-            self.context.append(file_path)
-
-        details = self.context.df["packet.str"].str.cat(sep="\n")
+        failed = []
+        if len(file_paths) == 1:
+            try:
+                self.context.append(file_paths[0], record_filter)
+            except (PcapFormatError, CaptureSizeError) as e:
+                failed = [FileResult(file_paths[0], 0, str(e))]
+        elif file_paths:  # several files are parsed in parallel and merged by time
+            results = self.context.append_many(
+                file_paths, os.cpu_count(), record_filter=record_filter)
+            failed = [result for result in results if result.error]
+        if poll:
+            self.context.poll()
+
+        if len(self.context) > 0:  # every file may have failed
+            self._show_results(self._next_details())
+        return failed
+
+    def show_more_details(self):
+        self.display_text(
+            text_area_id=self.map["text_area.summary"], text=self._next_details(), append=True)
+
+    def _next_details(self):
+        details = self.context.details(self.details_shown, DETAILS_PAGE_SIZE)
+        self.details_shown = min(self.details_shown + DETAILS_PAGE_SIZE, len(self.context))
+        more_button = self.components["buttons"][self.map["button.more_details"]]
+        more_button.config(
+            state=tk.NORMAL if self.details_shown < len(self.context) else tk.DISABLED)
+        return details
+
+    def _show_results(self, details, append=False):
         result = self.analyze_function(self.context)
 
         bar_data = {
@@ -418,15 +616,27 @@ class PcapUi(tk.Tk):
             "plot.proto_link": result["protocol_distribution"][LayerLevel.LINK]
         }
         indicators = result["indicators"]
+        if indicators["sampling"]:  # estimates, shown with their margins of error
+            packet_count = f"≈ {indicators['packet_count']} ± {indicators['packet_count_error']:.0f}"
+            data_amount = f"≈ {humanize.naturalsize(indicators['data_amount'])} " \
+                f"± {humanize.naturalsize(indicators['data_amount_error'])}"
+        else:
+            packet_count = indicators["packet_count"]
+            data_amount = humanize.naturalsize(indicators["data_amount"])
         indicator_data = {
-            "indicator.packet_count": indicators["packet_count"],
-            "indicator.data_amount": humanize.naturalsize(indicators["data_amount"]),
+            "indicator.packet_count": packet_count,
+            "indicator.data_amount": data_amount,
             "indicator.duration": humanize.naturaldelta(indicators["duration"]),
             "indicator.starttime": indicators["start_time"],
-            "indicator.endtime": indicators["end_time"]
+            "indicator.endtime": indicators["end_time"],
+            "indicator.checksum_invalid": indicators["checksum_invalid"],
+            "indicator.checksum_unchecked": indicators["checksum_unchecked"],
+            "indicator.sampling": indicators["sampling"] or "Off"
         }
 
-        self.display_text(text_area_id=self.map["text_area.summary"], text=details)
+        if details is not None:
+            self.display_text(
+                text_area_id=self.map["text_area.summary"], text=details, append=append)
         self.display_timeseries_dual(self.map["plot.speed"], result["speed_config"])
         self._display_bar_graphs(bar_data)
         self._display_pie_charts(pie_data)
@@ -484,7 +694,7 @@ class PcapUi(tk.Tk):
     def display_indicator(self, indicator_id, value):
         self.components["indicators"][indicator_id].set(value)
 
-    def display_text(self, text_area_id, text):
+    def display_text(self, text_area_id, text, append=False):
 
         # Fetch the text area
         text_area = self.components["text_areas"][text_area_id]
@@ -492,8 +702,11 @@ class PcapUi(tk.Tk):
         # Make it read-write
         text_area.config(state=tk.NORMAL)
 
-        # Resetting
-        text_area.delete('1.0', tk.END)
+        # Resetting, unless appending
+        if append:
+            text = f"\n{text}"
+        else:
+            text_area.delete('1.0', tk.END)
 
         # Displaying
         text_area.insert(tk.END, text)
@@ -596,6 +809,10 @@ class PcapUi(tk.Tk):
             return
 
         self._setup_plot_1(plot, data1, color1, title, xlabel, y1label)
+        if speed_config.error1 is not None:
+            error = speed_config.error1.reindex(data1.index, fill_value=0)
+            plot.fill_between(data1.index, (data1 - error).clip(lower=0), data1 + error,
+                              color=color1, alpha=0.2, hatch="//")
         self._setup_plot_2(plot2, data2, color2, y2label)
         self._sync_axes(data1, plot, plot2)
         self._add_freq_info(plot, data1)
@@ -630,10 +847,16 @@ class PcapUi(tk.Tk):
 
         plot.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
 
+        # Estimated counts get their margins of error in the legend
+        labels = data.index
+        if config.error1 is not None and config.error1.any():
+            labels = [f"{protocol} (≈ {count} ± {error:.0f})"
+                      for protocol, count, error in zip(data.index, data, config.error1)]
+
         # Add a legend with a title, locates it on the left
         plot.legend(
             wedges,
-            data.index,
+            labels,
             title="Protocols",
             loc="center left",
             bbox_to_anchor=(
@@ -662,7 +885,10 @@ class PcapUi(tk.Tk):
 
         # Creating the horizontal bar graph
         keys, values = data.keys(), data.values()
-        bars = plot.barh(range(len(keys)), values, color=color, alpha=0.7)
+        errors = None
+        if config.error1 and any(config.error1.values()):
+            errors = [config.error1[key] for key in keys]
+        bars = plot.barh(range(len(keys)), values, xerr=errors, color=color, alpha=0.7)
 
         # Adding keys as labels on each bar
         for element, key in zip(bars, keys):
@@ -700,6 +926,8 @@ class PcapUi(tk.Tk):
             save_button.config(state=tk.DISABLED)
 
         # Resetting the text areas
+        self.details_shown = 0
+        self.components["buttons"][self.map["button.more_details"]].config(state=tk.DISABLED)
         for text_area in self.components["text_areas"].values():
             text_area.config(state=tk.NORMAL)
             text_area.delete('1.0', tk.END)
@@ -11,6 +11,8 @@ import pandas as pd
 import humanize
 from config import FILESIZE_LIMIT_BYTES
 
+COMPRESSED_SUFFIXES = (".gz", ".xz", ".bz2")
+
 
 def preprocess_bytes(data: bytes) -> str:
     """Strip null bytes and decode to UTF-8 string, or return hex representation if decoding fails.
@@ -75,6 +77,89 @@ def preprocess_data(data):
     return data
 
 
+def convert_value(value):
+    """Convert a value like preprocess_data does, choosing the conversion by the exact type of the
+    value, and of each item of lists and dicts. Types without a conversion of their own, like
+    floats, go through preprocess_data.
+
+    Args:
+        value: value to convert
+
+    Returns:
+        Converted value
+    """
+    convert = _VALUE_CONVERTERS.get(value.__class__)
+    return preprocess_data(value) if convert is None else convert(value)
+
+
+_VALUE_CONVERTERS = {
+    str: lambda value: value,
+    int: lambda value: value,
+    bool: lambda value: value,
+    type(None): lambda value: value,
+    bytes: preprocess_bytes,
+    list: lambda value: [convert_value(item) for item in value],
+    dict: lambda value: {convert_value(key): convert_value(item) for key, item in value.items()}
+}
+
+
+def _exact(field_type: type) -> Callable:
+    # values of the declared type, and None, are kept as they are
+    def convert(value):
+        if value is None or value.__class__ is field_type:
+            return value
+        return preprocess_data(value)
+    return convert
+
+
+def _decode(value):
+    if value.__class__ is bytes:
+        return preprocess_bytes(value)
+    if value is None or value.__class__ is str:
+        return value
+    return preprocess_data(value)
+
+
+class FieldConverter:
+    """Converts the data of a layer like preprocess_data, with a conversion chosen beforehand for
+    each field from its declared type.
+
+    str, int and bool fields and enum fields are kept as they are, bytes fields are decoded, and
+    list fields and fields of any other type, like object, are converted by convert_value. A value
+    that does not have its declared type, or a field that is not declared, goes through
+    preprocess_data, so the result is always the same.
+    """
+
+    def __init__(self, fields: dict[str, type]) -> None:
+        """Initializes the converter.
+
+        Args:
+            fields (dict[str, type]): declared type of each field
+        """
+        self.converters = {key: _field_converter(field_type)
+                           for key, field_type in fields.items()}
+
+    def __call__(self, data: dict) -> dict:
+        """Convert the data of a layer.
+
+        Args:
+            data (dict): fields of the layer
+
+        Returns:
+            dict: converted fields, in the same order
+        """
+        converters = self.converters
+        return {key: converters.get(key, convert_value)(value) for key, value in data.items()}
+
+
+def _field_converter(field_type: type) -> Callable:
+    if field_type is bytes:
+        return _decode
+    if field_type in (str, int, bool) or issubclass(field_type, Enum):
+        return _exact(field_type)
+    return convert_value
+
+
 def extract_2ld(fqdn: str):
     """Generated with ChatGPT.
 
@@ -104,6 +189,7 @@ def extract_2ld(fqdn: str):
 class JSONEncoder(json.JSONEncoder):
     """Custom JSON encoder that converts Enum values to their names and tuple keys to strings.
     """
+
     def default(self, o):
         if isinstance(o, Enum):
             return o.name
@@ -168,7 +254,7 @@ def flatten_dict(d: dict, parent_key="", sep=".") -> dict:
 
     Nested dictionaries are flattened into a single level dictionary with dot-separated keys
     representing the hierarchy of the original keys.
-    
+
     Lists are flattened into separate keys with the list index as the key.
 
     Args:
@@ -199,6 +285,10 @@ def convert_mac(mac: bytes) -> str:
     return ":".join([f"{int(byte):02x}" for byte in mac.strip(b"\x00")])
 
 
+# divisors of the units used by scale_bits
+BIT_UNITS = {"bits": 1, "Kbits": 1e3, "Mbits": 1e6}
+
+
 def scale_bits(bits: pd.Series | Number) -> tuple[pd.Series | Number, str]:
     """Scale bits to Kbits or Mbits if necessary.
 
@@ -257,7 +347,11 @@ def custom_round(x: int | float) -> int:
 
 
 def check_file(filename: str):
-    """Check if the file exists, is a PCAP file, and is within the size limit.
+    """Check if the file exists, is a PCAP file, and is within the size limit, if
+    FILESIZE_LIMIT_BYTES sets one.
+
+    PCAP files compressed with gzip, xz or bz2 (.pcap.gz, .pcapng.xz, ...) are accepted too.
+    Their size on disk is checked here, the decompressed size is checked as they are parsed.
 
     Args:
         filename (str): Path to the file
@@ -268,6 +362,8 @@ def check_file(filename: str):
     file = Path(filename)
     size = file.stat().st_size
     suffix = file.suffix
+    if suffix in COMPRESSED_SUFFIXES:
+        suffix = Path(file.stem).suffix
 
     if not (file.exists() and file.is_file()):
         raise FileNotFoundError(f"File not found: {filename}")
@@ -275,7 +371,7 @@ def check_file(filename: str):
     if suffix not in (".pcap", ".pcapng"):
         raise FileNotFoundError(f"File must be a PCAP file, not '{suffix}'")
 
-    if size > FILESIZE_LIMIT_BYTES:
+    if FILESIZE_LIMIT_BYTES and size > FILESIZE_LIMIT_BYTES:
         raise FileNotFoundError(
             f"File size exceeds the limit of {humanize.naturalsize(FILESIZE_LIMIT_BYTES)}")
 
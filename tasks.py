@@ -16,10 +16,23 @@ def coverage(ctx):
 def coverage_report(ctx):
     ctx.run("coverage html")
 
+@task
+def benchmark(ctx):
+    for benchmark_module in ("parse_rate", "classifier"):
+        ctx.run(f"python3 -m benchmarks.{benchmark_module} assets/dns.pcapng assets/dhcp.pcapng "
+                "assets/example.pcapng", env={"PYTHONPATH": "src"})
+
 @task
 def lint(ctx):
     ctx.run("pylint src")
 
 @task
 def format(ctx):
-    ctx.run("autopep8 src")
\ No newline at end of file
+    ctx.run("autopep8 src")
+
+@task
+def ingest(ctx, source, slot, workers=None, sample=None, sample_by=None):
+    ctx.run(f"python3 src/ingest.py \"{source}\" --slot \"{slot}\""
+            + (f" --workers {workers}" if workers else "")
+            + (f" --sample {sample}" if sample else "")
+            + (f" --sample-by {sample_by}" if sample_by else ""))